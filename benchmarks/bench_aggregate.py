@@ -0,0 +1,81 @@
+'''
+    Windowed sums with the monoid augmentation (aggregate(lo, hi), O(log n)) against adding up the
+    values of the window through the range iterator (O(k)) and against a prefix-sum array, which
+    answers in O(log n) too but has to be rebuilt after every write.
+
+    The keys are timestamps 0, 10, 20, ... and the measured amount is derived from the key, so that
+    the trees can be bulk loaded with from_sorted.
+
+    usage: python bench_aggregate.py [n] [queries]
+'''
+
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+from monoid import Monoid
+
+
+def amount(key, value):
+    return key % 997
+
+
+AMOUNT_SUM = Monoid(lambda a, b: a + b, 0, amount)
+
+
+def timed(fn):
+    start = time.time()
+    result = fn()
+    return time.time() - start, result
+
+
+def prefix_sums(keys):
+    sums = [0]
+    for k in keys:
+        sums.append(sums[-1] + amount(k, None))
+    return sums
+
+
+def window_by_prefix(keys, sums, lo, hi):
+    return sums[bisect.bisect_left(keys, hi)] - sums[bisect.bisect_left(keys, lo)]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    random.seed(13)
+    keys = list(range(0, 10 * n, 10))
+
+    for name, cls in (('clrs', rb_tree.Rb_tree), ('llrb', ll_rb_tree.Rb_tree)):
+        t_build, tree = timed(lambda: cls.from_sorted(keys, monoid=AMOUNT_SUM))
+        print('%s  n = %d  from_sorted with sums = %.1fs' % (name, n, t_build))
+        for width in (100, 10000, 1000000):
+            if width >= n:
+                continue
+            windows = [random.randrange(10 * (n - width)) for i in range(n_queries)]
+            t_agg, total = timed(lambda: sum(tree.aggregate(lo, lo + 10 * width) for lo in windows))
+            # iterating a window is O(width), fewer queries are enough to time it
+            few = windows[:max(1, n_queries * 100 // width // 10)]
+            t_scan, scanned = timed(lambda: sum(amount(k, None) for lo in few for k in tree.keys(lo, lo + 10 * width)))
+            assert scanned == sum(tree.aggregate(lo, lo + 10 * width) for lo in few)
+            print('%s  window = %7d keys  aggregate = %9.0f queries/s  iterate = %9.1f queries/s'
+                  % (name, width, n_queries / t_agg, len(few) / t_scan))
+
+        # writes between the queries: the tree refreshes its sums, the prefix array is rebuilt
+        updates = [10 * random.randrange(n) + 5 for i in range(n_queries)]
+        t_mixed, _ = timed(lambda: [(tree.upsert(k, None), tree.aggregate(k - 10000, k + 10000)) for k in updates])
+        print('%s  insert + windowed sum = %9.0f pairs/s' % (name, n_queries / t_mixed))
+        del tree
+
+    t_prefix, sums = timed(lambda: prefix_sums(keys))
+    width = min(n - 1, 10000)
+    windows = [random.randrange(10 * (n - width)) for i in range(n_queries)]
+    t_query, _ = timed(lambda: [window_by_prefix(keys, sums, lo, lo + 10 * width) for lo in windows])
+    print('prefix sums  rebuild = %.2fs  query = %9.0f queries/s  insert + query = %9.2f pairs/s'
+          % (t_prefix, n_queries / t_query, 1 / (t_prefix + t_query / n_queries)))
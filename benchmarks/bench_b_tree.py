@@ -0,0 +1,109 @@
+'''
+    B-tree (b_tree.py) of a few orders against the CLRS and LLRB red-black trees as n grows:
+    mean lookup latency (get of present keys in random order), insert rate, height and, when
+    tracemalloc is there (python 3), the memory held by the tree. Every tree is built by inserting
+    the same n random keys; the memory is traced while building it, so the insert rate is measured
+    on a second build.
+
+    usage: python bench_b_tree.py [lookups] [n ...]
+'''
+
+import gc
+import os
+import random
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+import b_tree
+
+
+def clrs_height(tree):
+    best = 0
+    stack = [(tree.root, 1)] if tree.root != tree.dummy else []
+    while stack:
+        node, depth = stack.pop()
+        best = max(best, depth)
+        for child in (node.left, node.right):
+            if child != tree.dummy:
+                stack.append((child, depth + 1))
+    return best
+
+
+def llrb_height(tree):
+    best = 0
+    stack = [(tree.root, 1)] if tree.root is not None else []
+    while stack:
+        node, depth = stack.pop()
+        best = max(best, depth)
+        for child in (node.left, node.right):
+            if child is not None:
+                stack.append((child, depth + 1))
+    return best
+
+
+def build_clrs(keys):
+    tree = rb_tree.Rb_tree()
+    for k in keys:
+        tree.insert(tree.create_node(k, k))
+    return tree
+
+
+def build_llrb(keys):
+    tree = ll_rb_tree.Rb_tree()
+    for k in keys:
+        tree.insert(k, k)
+    return tree
+
+
+def b_tree_builder(order):
+    def build(keys):
+        tree = b_tree.B_tree(order)
+        for k in keys:
+            tree.insert(k, k)
+        return tree
+    return build
+
+
+def measure(build, height, keys, queries):
+    memory = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        tree = build(keys)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tree
+    gc.disable()
+    start = time.time()
+    tree = build(keys)
+    t_insert = time.time() - start
+    get = tree.get
+    start = time.time()
+    for k in queries:
+        get(k)
+    t_get = time.time() - start
+    gc.enable()
+    return 1e9 * t_get / len(queries), len(keys) / t_insert, height(tree), memory
+
+
+if __name__ == "__main__":
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    sizes = [int(arg) for arg in sys.argv[2:]] or [10000, 100000, 1000000]
+    engines = [('clrs', build_clrs, clrs_height), ('llrb', build_llrb, llrb_height)]
+    engines += [('b_tree %d' % order, b_tree_builder(order), b_tree.B_tree.height) for order in (8, 32, 128)]
+    for n in sizes:
+        random.seed(n)
+        keys = random.sample(range(10 * n), n)
+        queries = [random.choice(keys) for i in range(m)]
+        for name, build, height in engines:
+            lookup, insert, h, memory = measure(build, height, keys, queries)
+            print('n = %8d  %-11s get = %5.0f ns  insert = %7.0f/s  height = %2d  memory = %s'
+                  % (n, name, lookup, insert, h, '%6.1f MB' % (memory / 1e6) if memory is not None else 'n/a'))
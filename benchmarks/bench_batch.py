@@ -0,0 +1,79 @@
+'''
+    insert_many / find_many / delete_many against one call per key, and finger search against the
+    merge-and-rebuild path, for growing batch sizes. The batch/tree ratio where rebuilding starts
+    to win is what Rb_tree.rebuild_ratio is set to.
+
+    usage: python bench_batch.py [n]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+
+def timed(fn):
+    start = time.time()
+    fn()
+    return time.time() - start
+
+
+def clrs_tree(keys):
+    return rb_tree.Rb_tree.from_sorted(sorted(keys))
+
+
+def llrb_tree(keys):
+    return ll_rb_tree.Rb_tree.from_sorted(sorted(keys))
+
+
+def clrs_one_by_one(tree, batch):
+    for v in batch:
+        tree.insert(tree.create_node(v))
+
+
+def llrb_one_by_one(tree, batch):
+    for v in batch:
+        tree.insert(v)
+
+
+def with_ratio(tree, ratio, method, batch):
+    # force the finger (ratio = inf) or the rebuild (ratio = 0) path
+    tree.rebuild_ratio = ratio
+    return timed(lambda: method(batch))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(7)
+    universe = random.sample(range(4 * n), 2 * n)
+    base, extra = universe[:n], universe[n:]
+
+    print('%-5s %8s %8s | %10s %10s %10s | %10s %10s' % ('tree', 'batch', 'ratio', 'one-by-one', 'finger', 'rebuild',
+                                                        'find', 'find_many'))
+    for name, build, one_by_one in (('clrs', clrs_tree, clrs_one_by_one), ('llrb', llrb_tree, llrb_one_by_one)):
+        m = max(1, n // 1024)
+        while m <= n:
+            batch = extra[:m]
+            tree = build(base)
+            t_single = timed(lambda: one_by_one(tree, batch))
+            tree = build(base)
+            t_finger = with_ratio(tree, float('inf'), tree.insert_many, batch)
+            tree = build(base)
+            t_rebuild = with_ratio(tree, 0, tree.insert_many, batch)
+
+            tree = build(base)
+            lookups = random.sample(base, m)
+            if name == 'clrs':
+                t_find = timed(lambda: [tree.find(tree.root, v) for v in lookups])
+            else:
+                t_find = timed(lambda: [tree.find(v) for v in lookups])
+            t_find_many = timed(lambda: tree.find_many(lookups))
+
+            print('%-5s %8d %8.4f | %10.4f %10.4f %10.4f | %10.4f %10.4f'
+                  % (name, m, float(m) / n, t_single, t_finger, t_rebuild, t_find, t_find_many))
+            m *= 4
@@ -0,0 +1,48 @@
+'''
+    Rb_tree.from_sorted vs one insert per key, for the CLRS (rb_tree.py) and LLRB (ll_rb_tree.py) trees.
+
+    usage: python bench_bulk_load.py [n]
+'''
+
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+
+def clrs_insert(keys):
+    tree = rb_tree.Rb_tree()
+    for v in keys:
+        tree.insert(tree.create_node(v))
+    return tree
+
+
+def llrb_insert(keys):
+    tree = ll_rb_tree.Rb_tree()
+    for v in keys:
+        tree.insert(v)
+    return tree
+
+
+def timed(build, keys):
+    gc.collect()
+    start = time.time()
+    build(keys)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    keys = list(range(n))
+
+    for name, insert, bulk in (('clrs', clrs_insert, rb_tree.Rb_tree.from_sorted),
+                               ('llrb', llrb_insert, ll_rb_tree.Rb_tree.from_sorted)):
+        t_insert = timed(insert, keys)
+        t_bulk = timed(bulk, keys)
+        print('%s n = %d  insert = %.3fs  from_sorted = %.3fs  speedup = %.1fx'
+              % (name, n, t_insert, t_bulk, t_insert / t_bulk))
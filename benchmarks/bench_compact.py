@@ -0,0 +1,83 @@
+'''
+    Object-based CLRS Rb_tree (rb_tree.py) vs the column-based one (compact_rb_tree.py).
+
+    Reports bytes per key and insert/delete throughput.
+    usage: python bench_compact.py [n]
+'''
+
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import compact_rb_tree
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def object_tree_bytes(tree):
+    # Fallback when tracemalloc is not available: instance + its __dict__ (+ a boxed key)
+    total = 0
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        if node != tree.dummy:
+            total += sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.key)
+            stack.append(node.left)
+            stack.append(node.right)
+    return total
+
+
+def build(module, keys):
+    tree = module.Rb_tree()
+    for v in keys:
+        tree.insert(tree.create_node(v))
+    return tree
+
+
+def measure_memory(module, keys):
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        tree = build(module, keys)
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return tree, used
+    tree = build(module, keys)
+    if module is compact_rb_tree:
+        return tree, tree.memory_usage()
+    return tree, object_tree_bytes(tree)
+
+
+def measure_throughput(module, keys):
+    gc.collect()
+    start = time.time()
+    tree = build(module, keys)
+    insert_time = time.time() - start
+
+    start = time.time()
+    for v in keys:
+        tree.delete(tree.find(tree.root, v))
+    delete_time = time.time() - start
+    assert tree.root == tree.dummy
+    return len(keys) / insert_time, len(keys) / delete_time
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(42)
+    keys = random.sample(range(1, 10 * n), n)
+
+    for name, module in (('object', rb_tree), ('compact', compact_rb_tree)):
+        tree, used = measure_memory(module, keys)
+        del tree
+        inserts, deletes = measure_throughput(module, keys)
+        print('%-8s n = %d  bytes/key = %.1f  insert = %.0f ops/s  delete = %.0f ops/s'
+              % (name, n, float(used) / n, inserts, deletes))
@@ -0,0 +1,78 @@
+'''
+    Read and write throughput of LockedTree and SnapshotTree with 1, 4 and 16 reader threads
+    doing lookups while one writer thread keeps updating, for a few batch sizes. CPython runs one
+    thread at a time, so this measures the cost of the synchronization and how the readers and
+    the writer share the interpreter, not parallel speedup.
+
+    usage: python bench_concurrent.py [n] [seconds]
+'''
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+from concurrent_tree import LockedTree, SnapshotTree
+
+
+def reader(tree, n, seed, go, stop, counts, i):
+    rng = random.Random(seed)
+    done = 0
+    go.wait()
+    while not stop.is_set():
+        for j in range(100):
+            tree.get(rng.randrange(n))
+        done += 100
+    counts[i] = done
+
+
+def writer(tree, n, go, stop, counts, i):
+    rng = random.Random(0)
+    done = 0
+    go.wait()
+    while not stop.is_set():
+        for j in range(100):
+            tree.upsert(rng.randrange(n), j)
+        done += 100
+    tree.commit()
+    counts[i] = done
+
+
+def run(make, n, n_readers, seconds):
+    tree = make()
+    for key in random.Random(1).sample(range(n), n):
+        tree.upsert(key, key)
+    tree.commit()
+    go = threading.Event()
+    stop = threading.Event()
+    counts = [0] * (n_readers + 1)
+    threads = [threading.Thread(target=reader, args=(tree, n, i, go, stop, counts, i)) for i in range(n_readers)]
+    threads.append(threading.Thread(target=writer, args=(tree, n, go, stop, counts, n_readers)))
+    # start them all before any runs: once busy threads hold the interpreter, starting one more
+    # waits for its turn behind all of them
+    for thread in threads:
+        thread.start()
+    start = time.time()
+    go.set()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    # the threads finish their current round after stop, count that time too
+    elapsed = time.time() - start
+    return sum(counts[:n_readers]) / elapsed, counts[n_readers] / elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    for name, cls in (('LockedTree', LockedTree), ('SnapshotTree', SnapshotTree)):
+        for batch_size in (1, 64, 1024):
+            for n_readers in (1, 4, 16):
+                reads, writes = run(lambda: cls(batch_size), n, n_readers, seconds)
+                print('%-12s batch = %4d  readers = %2d  reads = %9.0f/s  writes = %9.0f/s'
+                      % (name, batch_size, n_readers, reads, writes))
@@ -0,0 +1,149 @@
+'''
+    The trees as double-ended priority queues (peek_min, peek_max, pop_min, pop_max) against
+    heapq and a two-heap DEPQ: a min-heap and a max-heap of the same entries, where an entry
+    popped from one heap is only marked dead for the other one and skipped when it reaches its
+    top (lazy deletion).
+
+    Keys are (priority, sequence number) pairs, as in a scheduler queue, so that they are unique.
+    After n pushes, m operations:
+        fifo    push, pop_min (heapq only does this one)
+        mixed   push 50%, pop_min 25%, pop_max 25%
+        peek    push 25%, pop_min 25%, peek_min and peek_max 50%
+
+    usage: python bench_depq.py [n] [m]
+'''
+
+import heapq
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+
+class Heap():
+    # min only
+    def __init__(self):
+        self.heap = []
+
+    def push(self, key):
+        heapq.heappush(self.heap, key)
+
+    def pop_min(self):
+        return heapq.heappop(self.heap)
+
+
+class TwoHeaps():
+    def __init__(self):
+        self.min_heap = []
+        self.max_heap = []
+        # sequence numbers of the entries popped from one heap but still in the other
+        self.dead = set()
+
+    def push(self, key):
+        priority, seq = key
+        heapq.heappush(self.min_heap, key)
+        heapq.heappush(self.max_heap, (-priority, -seq))
+
+    def __clean(self):
+        # drop the entries already popped from the other heap off the tops
+        while self.min_heap[0][1] in self.dead:
+            self.dead.remove(heapq.heappop(self.min_heap)[1])
+        while -self.max_heap[0][1] in self.dead:
+            self.dead.remove(-heapq.heappop(self.max_heap)[1])
+
+    def peek_min(self):
+        self.__clean()
+        return self.min_heap[0]
+
+    def peek_max(self):
+        self.__clean()
+        priority, seq = self.max_heap[0]
+        return -priority, -seq
+
+    def pop_min(self):
+        self.__clean()
+        key = heapq.heappop(self.min_heap)
+        self.dead.add(key[1])
+        return key
+
+    def pop_max(self):
+        self.__clean()
+        priority, seq = heapq.heappop(self.max_heap)
+        self.dead.add(-seq)
+        return -priority, -seq
+
+
+class Clrs():
+    def __init__(self):
+        self.tree = rb_tree.Rb_tree()
+
+    def push(self, key):
+        self.tree.insert(self.tree.create_node(key))
+
+    def peek_min(self):
+        return self.tree.peek_min()[0]
+
+    def peek_max(self):
+        return self.tree.peek_max()[0]
+
+    def pop_min(self):
+        return self.tree.pop_min()[0]
+
+    def pop_max(self):
+        return self.tree.pop_max()[0]
+
+
+class Llrb(Clrs):
+    def __init__(self):
+        self.tree = ll_rb_tree.Rb_tree()
+
+    def push(self, key):
+        self.tree.insert(key)
+
+
+def operations(workload, m, seed):
+    random.seed(seed)
+    if workload == 'fifo':
+        return ['push', 'pop_min'] * (m // 2)
+    if workload == 'mixed':
+        return [random.choice(('push', 'push', 'pop_min', 'pop_max')) for i in range(m)]
+    return [random.choice(('push', 'pop_min', 'peek_min', 'peek_max')) for i in range(m)]
+
+
+def run(cls, n, ops, seed):
+    random.seed(seed)
+    seq = itertools.count()
+    queue = cls()
+    for i in range(n):
+        queue.push((random.random(), next(seq)))
+    keys = [(random.random(), next(seq)) for op in ops]
+    pops = []
+    start = time.time()
+    for op, key in zip(ops, keys):
+        if op == 'push':
+            queue.push(key)
+        else:
+            pops.append(getattr(queue, op)())
+    return len(ops) / (time.time() - start), pops
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    for workload in ('fifo', 'mixed', 'peek'):
+        ops = operations(workload, m, 1)
+        results = []
+        for name, cls in (('heapq', Heap), ('two heaps', TwoHeaps), ('clrs', Clrs), ('llrb', Llrb)):
+            if cls is Heap and workload != 'fifo':
+                continue
+            rate, pops = run(cls, n, ops, 2)
+            results.append((name, rate, pops))
+        # all of them pop the same keys
+        assert all(pops == results[0][2] for name, rate, pops in results)
+        print('%-6s ' % workload + '  '.join('%s = %8.0f ops/s' % (name, rate) for name, rate, pops in results))
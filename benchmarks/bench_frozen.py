@@ -0,0 +1,59 @@
+'''
+    Batch lookups of int64 keys: one find per key and the finger search of find_many on the live
+    trees, against find_many and rank_many on their frozen snapshots (frozen_tree.py, sorted and
+    Eytzinger layouts), for a batch of m queries (half of them present) in random order. Also
+    the cost of freeze(): the first one walks the tree, the next ones after w writes only merge
+    the keys written into the previous snapshot. Needs numpy.
+
+    usage: python bench_frozen.py [n] [m] [w]
+'''
+
+import os
+import random
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+
+def rate(f, m):
+    start = time.time()
+    f()
+    return m / (time.time() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    w = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    random.seed(23)
+    keys = list(range(0, 2 * n, 2))
+    queries = numpy.array([random.randrange(2 * n) for i in range(m)], dtype=numpy.int64)
+    query_list = queries.tolist()
+
+    for name, cls in (('clrs', rb_tree.Rb_tree), ('llrb', ll_rb_tree.Rb_tree)):
+        tree = cls.from_sorted(keys)
+        if name == 'clrs':
+            find = lambda k: tree.find(tree.root, k)
+        else:
+            find = tree.find
+        print('%s  find = %8.0f/s  find_many = %8.0f/s' % (name, rate(lambda: [find(k) for k in query_list], m),
+                                                         rate(lambda: tree.find_many(query_list), m)))
+        for layout in ('sorted', 'eytzinger'):
+            start = time.time()
+            frozen = tree.freeze(layout)
+            t_full = time.time() - start
+            for k in random.sample(range(2 * n), w):
+                tree.upsert(k, k)
+            start = time.time()
+            frozen = tree.freeze(layout)
+            t_incremental = time.time() - start
+            print('      %-9s  find_many = %10.0f/s  rank_many = %10.0f/s  freeze: %.3f s, after %d writes %.3f s'
+                  % (layout, rate(lambda: frozen.find_many(queries), m), rate(lambda: frozen.rank_many(queries), m),
+                     t_full, w, t_incremental))
+        del tree
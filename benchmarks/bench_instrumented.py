@@ -0,0 +1,49 @@
+'''
+    Price of the counters: the same inserts, lookups and deletes on the plain trees and on their
+    instrumented versions (instrumented_rb_tree.py, instrumented_ll_rb_tree.py). The plain trees
+    have no counter, only an empty count_case call per fixup case; the instrumented ones pay for
+    every increment. Also prints the fixup counters of sorted against random inserts.
+
+    usage: python bench_instrumented.py [n]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+import instrumented_rb_tree
+import instrumented_ll_rb_tree
+
+
+def workload(cls, keys):
+    tree = cls()
+    start = time.time()
+    for k in keys:
+        tree.upsert(k, k)
+    for k in keys:
+        tree.get(k)
+    for k in keys[::2]:
+        tree.pop(k)
+    return 2.5 * len(keys) / (time.time() - start), tree
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    random.seed(17)
+    orders = (('random', random.sample(range(n), n)), ('sorted', list(range(n))))
+
+    for name, plain, instrumented in (('clrs', rb_tree.Rb_tree, instrumented_rb_tree.Rb_tree),
+                                      ('llrb', ll_rb_tree.Rb_tree, instrumented_ll_rb_tree.Rb_tree)):
+        for order, keys in orders:
+            plain_rate, _ = workload(plain, keys)
+            counted_rate, tree = workload(instrumented, keys)
+            stats = tree.stats()
+            print('%s  %-6s  plain = %8.0f ops/s  instrumented = %8.0f ops/s (%+.0f%%)  height = %d'
+                  % (name, order, plain_rate, counted_rate, 100.0 * (counted_rate / plain_rate - 1), stats['height']))
+            print('      ' + '  '.join('%s = %d' % (key, stats[key]) for key in sorted(stats)
+                                        if 'case' in key or 'rotations' in key or key == 'flips'))
@@ -0,0 +1,62 @@
+'''
+    Interval tree overlap and stabbing queries against filtering a full in-order walk of the
+    plain CLRS Rb_tree, and the time to the first result of a query with a large result set.
+
+    usage: python bench_interval.py [n] [queries]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import interval_tree
+
+
+def scan(tree, lo, hi):
+    # the plain tree only knows the low endpoint, the high one is the value
+    return [(low, high) for low, high in tree.items() if low <= hi and high >= lo]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    random.seed(12)
+    span = 100 * n
+    intervals = []
+    for i in range(n):
+        low = random.randrange(span)
+        intervals.append((low, low + random.randrange(1000)))
+    intervals.sort()
+
+    start = time.time()
+    tree = interval_tree.Rb_tree()
+    for low, high in intervals:
+        tree.insert(tree.create_node(low, None, high))
+    print('n = %d  build by insert = %.2fs' % (n, time.time() - start))
+    plain = rb_tree.Rb_tree()
+    for low, high in intervals:
+        plain.insert(plain.create_node(low, high))
+
+    for width in (0, 1000, 100000):
+        queries = [random.randrange(span) for i in range(n_queries)]
+        start = time.time()
+        found = sum(1 for lo in queries for x_node in tree.overlap(lo, lo + width))
+        t_tree = time.time() - start
+        start = time.time()
+        for lo in queries[:10]:
+            scan(plain, lo, lo + width)
+        t_scan = (time.time() - start) / 10 * n_queries
+        print('width = %6d  avg results = %7.1f  interval tree = %10.0f queries/s  full scan = %8.1f queries/s'
+              % (width, float(found) / n_queries, n_queries / t_tree, n_queries / t_scan))
+
+    # large result set: the iterator hands out the first interval right away
+    start = time.time()
+    first = next(tree.overlap(0, span))
+    t_first = time.time() - start
+    start = time.time()
+    total = sum(1 for x_node in tree.overlap(0, span))
+    print('overlap(everything): first result after %.6fs, all %d after %.2fs' % (t_first, total, time.time() - start))
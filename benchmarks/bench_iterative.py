@@ -0,0 +1,53 @@
+'''
+    LLRB insert and delete: the loops over an explicit path (default) against the recursive
+    insert_fixup / delete_fixup / delete_min (Rb_tree.recursive = True), on the same tree of n keys.
+    Both build the same trees; this measures m inserts of new keys and m deletes of them. The
+    garbage collector is off while timing: with millions of nodes alive, a full collection takes
+    long enough to swamp whichever round it falls in.
+
+    usage: python bench_iterative.py [m] [n ...]
+'''
+
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import ll_rb_tree
+
+
+def rates(tree, keys):
+    gc.disable()
+    start = time.time()
+    for k in keys:
+        tree.insert(k)
+    t_insert = time.time() - start
+    start = time.time()
+    for k in keys:
+        tree.delete(k)
+    t_delete = time.time() - start
+    gc.enable()
+    return len(keys) / t_insert, len(keys) / t_delete
+
+
+if __name__ == "__main__":
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sizes = [int(arg) for arg in sys.argv[2:]] or [100000, 1000000, 10000000]
+    for n in sizes:
+        random.seed(n)
+        # even keys in the tree, odd keys inserted and deleted again
+        tree = ll_rb_tree.Rb_tree.from_sorted(range(0, 2 * n, 2))
+        keys = [2 * k + 1 for k in random.sample(range(n), min(m, n))]
+        results = {}
+        # twice each, alternating, the second round is the one kept
+        for recursive in (True, False, True, False):
+            tree.recursive = recursive
+            results[recursive] = rates(tree, keys)
+        tree.validate()
+        (rec_ins, rec_del), (it_ins, it_del) = results[True], results[False]
+        print('n = %8d  insert: recursive = %7.0f/s  loop = %7.0f/s (x%.2f)   delete: recursive = %7.0f/s  loop = %7.0f/s (x%.2f)'
+              % (n, rec_ins, it_ins, it_ins / rec_ins, rec_del, it_del, it_del / rec_del))
+        del tree
@@ -0,0 +1,69 @@
+'''
+    insert / find / delete ops/s of both trees in debug mode (validate() after every insert and
+    delete) and in fast mode. Debug mode is O(n) per operation, so it runs on a smaller tree;
+    fast mode runs on that size and on the full one.
+
+    usage: python bench_micro.py [n] [n_debug]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+
+def clrs(keys, lookups, debug):
+    tree = rb_tree.Rb_tree()
+    tree.debug = debug
+    start = time.time()
+    for k in keys:
+        tree.insert(tree.create_node(k))
+    t_insert = time.time() - start
+    start = time.time()
+    for k in lookups:
+        tree.find(tree.root, k)
+    t_find = time.time() - start
+    start = time.time()
+    for k in keys:
+        tree.delete(tree.find(tree.root, k))
+    t_delete = time.time() - start
+    return t_insert, t_find, t_delete
+
+
+def llrb(keys, lookups, debug):
+    tree = ll_rb_tree.Rb_tree()
+    tree.debug = debug
+    start = time.time()
+    for k in keys:
+        tree.insert(k)
+    t_insert = time.time() - start
+    start = time.time()
+    for k in lookups:
+        tree.find(k)
+    t_find = time.time() - start
+    start = time.time()
+    for k in keys:
+        tree.delete(k)
+    t_delete = time.time() - start
+    return t_insert, t_find, t_delete
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_debug = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    sys.setrecursionlimit(10000)
+
+    print('%-5s %-6s %8s | %12s %12s %12s' % ('tree', 'mode', 'n', 'insert/s', 'find/s', 'delete/s'))
+    for name, run in (('clrs', clrs), ('llrb', llrb)):
+        for mode, debug, size in (('debug', True, n_debug), ('fast', False, n_debug), ('fast', False, n)):
+            random.seed(9)
+            keys = random.sample(range(10 * size), size)
+            lookups = [random.choice(keys) for i in range(size)]
+            t_insert, t_find, t_delete = run(keys, lookups, debug)
+            print('%-5s %-6s %8d | %12.0f %12.0f %12.0f'
+                  % (name, mode, size, size / t_insert, size / t_find, size / t_delete))
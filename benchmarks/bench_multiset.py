@@ -0,0 +1,120 @@
+'''
+    SortedMultiset (sorted_multiset.py, LLRB and CLRS engines) against the CLRS tree with one node
+    per copy, on skewed event data: n events over d distinct keys with Zipf (s = 1.2) popularity,
+    so that a few keys repeat a lot. Measures the inserts, count() of every distinct key (for the
+    plain tree: count_range(key, key + 1), which needs order_statistics), a full iteration, the
+    nodes, the height and, when tracemalloc is there (python 3), the memory held by the structure
+    (traced during the inserts, which slows all of them alike).
+
+    usage: python bench_multiset.py [n] [d]
+'''
+
+import bisect
+import os
+import random
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+from sorted_multiset import SortedMultiset
+
+
+def zipf_keys(n, d, s=1.2):
+    cumulative = []
+    total = 0.0
+    for rank in range(1, d + 1):
+        total += 1.0 / rank ** s
+        cumulative.append(total)
+    names = random.sample(range(10 * d), d)
+    return [names[bisect.bisect_left(cumulative, random.random() * total)] for i in range(n)]
+
+
+def height(root, none):
+    best = 0
+    stack = [(root, 1)] if root is not none else []
+    while stack:
+        node, depth = stack.pop()
+        best = max(best, depth)
+        for child in (node.left, node.right):
+            if child is not none:
+                stack.append((child, depth + 1))
+    return best
+
+
+class Multiset():
+    def __init__(self, engine):
+        self.s = SortedMultiset(engine=engine)
+        self.tree = self.s.tree
+        self.none = None if engine is ll_rb_tree.Rb_tree else self.tree.dummy
+
+    def add(self, key):
+        self.s.add(key)
+
+    def count(self, key):
+        return self.s.count(key)
+
+    def __iter__(self):
+        return iter(self.s)
+
+
+class Copies():
+    def __init__(self):
+        self.tree = rb_tree.Rb_tree(order_statistics=True)
+        self.none = self.tree.dummy
+
+    def add(self, key):
+        self.tree.insert(self.tree.create_node(key))
+
+    def count(self, key):
+        return self.tree.count_range(key, key + 1)
+
+    def __iter__(self):
+        return self.tree.keys()
+
+
+def run(make, events, distinct):
+    if tracemalloc is not None:
+        tracemalloc.start()
+    start = time.time()
+    s = make()
+    for key in events:
+        s.add(key)
+    t_add = time.time() - start
+    memory = tracemalloc.get_traced_memory()[0] if tracemalloc is not None else None
+    if tracemalloc is not None:
+        tracemalloc.stop()
+    start = time.time()
+    counts = [s.count(key) for key in distinct]
+    t_count = time.time() - start
+    start = time.time()
+    n_iterated = sum(1 for key in s)
+    t_iter = time.time() - start
+    assert n_iterated == len(events) and sum(counts) == len(events)
+    return (len(events) / t_add, len(distinct) / t_count, n_iterated / t_iter,
+            len(s.tree), height(s.tree.root, s.none), memory)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    d = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    random.seed(21)
+    events = zipf_keys(n, d)
+    occurrences = {}
+    for key in events:
+        occurrences[key] = occurrences.get(key, 0) + 1
+    distinct = sorted(occurrences)
+    print('n = %d events, %d distinct keys, the top one %d times' % (n, len(distinct), max(occurrences.values())))
+    for name, make in (('multiset llrb', lambda: Multiset(ll_rb_tree.Rb_tree)),
+                       ('multiset clrs', lambda: Multiset(rb_tree.Rb_tree)),
+                       ('clrs copies', Copies)):
+        add, count, iterate, nodes, h, memory = run(make, events, distinct)
+        print('%-14s add = %8.0f/s  count = %8.0f/s  iterate = %9.0f/s  nodes = %8d  height = %3d  memory = %s'
+              % (name, add, count, iterate, nodes, h, '%.1f MB' % (memory / 1e6) if memory is not None else 'n/a'))
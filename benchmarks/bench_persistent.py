@@ -0,0 +1,83 @@
+'''
+    Persistent LLRB against the mutating one: insert/delete throughput with no snapshots, with a
+    snapshot every k operations and with one after every operation (full path copying), and the
+    nodes two versions share after a batch of updates.
+
+    usage: python bench_persistent.py [n] [ops]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import ll_rb_tree
+import persistent_ll_rb_tree
+
+
+def nodes(tree):
+    seen = set()
+    stack = [tree.root] if tree.root != None else []
+    while stack:
+        h = stack.pop()
+        seen.add(id(h))
+        for child in (h.left, h.right):
+            if child != None:
+                stack.append(child)
+    return seen
+
+
+def run(tree, ops, every):
+    snapshots = []
+    start = time.time()
+    for i, (op, key) in enumerate(ops):
+        if op == 'insert':
+            tree.insert(key)
+        else:
+            tree.delete(key)
+        if every and i % every == 0:
+            snapshots.append(tree.snapshot())
+    return len(ops) / (time.time() - start), snapshots
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    random.seed(8)
+    keys = random.sample(range(4 * n), n)
+    present = list(keys)
+    in_tree = set(keys)
+    ops = []
+    for i in range(n_ops):
+        if i % 2 == 0:
+            key = random.randrange(4 * n)
+            ops.append(('insert', key))
+            if key not in in_tree:
+                in_tree.add(key)
+                present.append(key)
+        else:
+            j = random.randrange(len(present))
+            present[j], present[-1] = present[-1], present[j]
+            key = present.pop()
+            in_tree.discard(key)
+            ops.append(('delete', key))
+
+    base = sorted(keys)
+    rate, _ = run(ll_rb_tree.Rb_tree.from_sorted(base), ops, 0)
+    print('%-28s n = %d  %10.0f ops/s' % ('mutating', n, rate))
+    for label, every in (('persistent, no snapshot', 0), ('persistent, snapshot/1000', 1000),
+                         ('persistent, snapshot/10', 10), ('persistent, snapshot/1', 1)):
+        rate, snapshots = run(persistent_ll_rb_tree.Rb_tree.from_sorted(base), ops, every)
+        print('%-28s n = %d  %10.0f ops/s  versions = %d' % (label, n, rate, len(snapshots)))
+
+    tree = persistent_ll_rb_tree.Rb_tree.from_sorted(base)
+    old = tree.snapshot()
+    for m in (1, 10, 100, 1000):
+        for key in random.sample(range(4 * n), m):
+            tree.insert(key)
+        a, b = nodes(old), nodes(tree)
+        print('after %5d inserts: old = %d nodes, new = %d nodes, shared = %d (%.1f%%), copied = %d'
+              % (m, len(a), len(b), len(a & b), 100.0 * len(a & b) / len(b), len(b - a)))
+        old = tree.snapshot()
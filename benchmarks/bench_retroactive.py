@@ -0,0 +1,147 @@
+'''
+    PartialRetroactiveQueue (red-black tree time index) against a port of the linked list walk of
+    retroactive/partial/partial_retroactive_queue.c, on a queue of n enqueues with half of them
+    dequeued, for random retroactive insert_enqueue / delete_enqueue followed by front().
+
+    usage: python bench_retroactive.py [n] [ops] [linear_ops]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+from retroactive import PartialRetroactiveQueue
+
+
+class ListNode():
+    __slots__ = ('next', 'prev', 'time', 'val')
+
+    def __init__(self, time, val):
+        self.next = None
+        self.prev = None
+        self.time = time
+        self.val = val
+
+
+class LinearQueue():
+    '''
+        The C version: a doubly linked list in time order, f is the front and every retroactive
+        operation walks from it, O(n). (With the C unlinking bugs fixed.)
+    '''
+    def __init__(self, time_step=100):
+        self.time_step = time_step
+        self.f = None
+        self.b = None
+        self.now = 0
+
+    def enqueue(self, value):
+        self.now += self.time_step
+        node = ListNode(self.now, value)
+        node.prev = self.b
+        if self.b != None:
+            self.b.next = node
+        self.b = node
+        if self.f == None:
+            self.f = node
+        return self.now
+
+    def dequeue(self):
+        value = self.f.val
+        self.f = self.f.next
+        return value
+
+    def __unlink(self, n):
+        if n.next != None:
+            n.next.prev = n.prev
+        else:
+            self.b = n.prev
+        if n.prev != None:
+            n.prev.next = n.next
+
+    def insert_enqueue(self, t, value):
+        new_node = ListNode(t, value)
+        n = self.f
+        if n.time > t:
+            # move backwards, the new enqueue happened before the front: the front moves back
+            while n.prev != None and n.prev.time > t:
+                n = n.prev
+            new_node.prev = n.prev
+            new_node.next = n
+            if n.prev != None:
+                n.prev.next = new_node
+            n.prev = new_node
+            self.f = self.f.prev
+        else:
+            # move forwards
+            while n.next != None and t > n.next.time:
+                n = n.next
+            new_node.prev = n
+            new_node.next = n.next
+            if n.next != None:
+                n.next.prev = new_node
+            else:
+                self.b = new_node
+            n.next = new_node
+
+    def delete_enqueue(self, t):
+        n = self.f
+        if n.time < t:
+            while n.time != t:
+                n = n.next
+            self.__unlink(n)
+        else:
+            while n.time != t:
+                n = n.prev
+            # the enqueue was already dequeued: the front moves forward
+            self.f = self.f.next
+            self.__unlink(n)
+
+    def front(self):
+        return self.f.val
+
+
+def run(queue, n, ops):
+    start = time.time()
+    for i in range(n):
+        queue.enqueue(i)
+    for i in range(n // 2):
+        queue.dequeue()
+    t_build = time.time() - start
+
+    start = time.time()
+    for kind, t in ops:
+        if kind == 'insert':
+            queue.insert_enqueue(t, -t)
+        else:
+            queue.delete_enqueue(t)
+        queue.front()
+    return t_build, len(ops) / (time.time() - start)
+
+
+def retro_ops(n, m, seed):
+    # alternate inserting an enqueue at a fresh time (not a multiple of 100) and deleting it again
+    rng = random.Random(seed)
+    ops = []
+    for i in range(m // 2):
+        t = rng.randrange(1, 100 * n)
+        while t % 100 == 0:
+            t = rng.randrange(1, 100 * n)
+        ops.append(('insert', t))
+        ops.append(('delete', t))
+    return ops
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    n_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    n_linear = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    tree_ops, linear_ops = retro_ops(n, n_ops, 3), retro_ops(n, n_linear, 3)
+    t_build, rate = run(PartialRetroactiveQueue(), n, tree_ops)
+    print('n = %d  rb tree      build = %.2fs  retroactive ops = %10.0f ops/s  (%d ops)' % (n, t_build, rate, len(tree_ops)))
+    t_build, rate = run(LinearQueue(), n, linear_ops)
+    print('n = %d  linear walk  build = %.2fs  retroactive ops = %10.0f ops/s  (%d ops)' % (n, t_build, rate, len(linear_ops)))
@@ -0,0 +1,66 @@
+'''
+    Restarting with a tree of n keys: rebuilding it by inserting every key, loading it from a file
+    written by dump() (O(n), no comparisons) and opening that file with mmap (O(1)), plus the
+    lookup speed of the loaded tree against the mapped one, which decodes its keys from the buffer.
+
+    usage: python bench_serialize.py [n ...]
+'''
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+
+def timed(fn):
+    start = time.time()
+    result = fn()
+    return time.time() - start, result
+
+
+def lookups(tree, keys):
+    get = tree.get
+    start = time.time()
+    for k in keys:
+        get(k)
+    return len(keys) / (time.time() - start)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'tree.rbt')
+    try:
+        for n in sizes:
+            rng = random.Random(n)
+            keys = rng.sample(range(10 * n), n)
+            probes = [rng.randrange(10 * n) for i in range(100000)]
+            for name, cls in (('clrs', rb_tree.Rb_tree), ('llrb', ll_rb_tree.Rb_tree)):
+                def build():
+                    tree = cls()
+                    for k in keys:
+                        tree.upsert(k, k)
+                    return tree
+                t_build, tree = timed(build)
+                t_dump, _ = timed(lambda: tree.dump(path))
+                t_load, loaded = timed(lambda: cls.load(path))
+                assert len(loaded) == n
+                t_open, mapped = timed(lambda: cls.load(path, mmap=True))
+                t_first, _ = timed(lambda: mapped.get(keys[0]))
+                print('%s  n = %8d  inserts = %7.2fs  dump = %6.2fs  load = %6.2fs  mmap open = %7.1fus'
+                      '  first get = %6.1fus  file = %6.1f MB'
+                      % (name, n, t_build, t_dump, t_load, t_open * 1e6, t_first * 1e6,
+                         os.path.getsize(path) / 1e6))
+                print('%s  n = %8d  get: loaded tree = %9.0f/s  mapped = %9.0f/s'
+                      % (name, n, lookups(loaded, probes), lookups(mapped, probes)))
+                mapped.close()
+                del tree, loaded
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,60 @@
+'''
+    ShardedTree (sharded_tree.py) against one Rb_tree in the same process: batched upserts, get_many
+    and a full scan of n uniform keys, with 1, 2, 4... shards cut at the quantiles of the keys. The
+    shards only run in parallel with as many cores as shards: on one core this measures the price
+    of the pipes and of the pickling.
+
+    usage: python bench_sharded.py [n] [max shards]
+'''
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import sharded_tree
+
+
+def workload(tree, keys, queries):
+    start = time.time()
+    for k in keys:
+        tree.upsert(k, k)
+    if hasattr(tree, 'flush'):
+        tree.flush()
+    t_upsert = time.time() - start
+    start = time.time()
+    if hasattr(tree, 'get_many'):
+        tree.get_many(queries)
+    else:
+        [tree.get(k) for k in queries]
+    t_get = time.time() - start
+    start = time.time()
+    n_items = sum(1 for item in tree.items())
+    t_scan = time.time() - start
+    assert n_items == len(keys)
+    return len(keys) / t_upsert, len(queries) / t_get, n_items / t_scan
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    max_shards = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, multiprocessing.cpu_count())
+    random.seed(19)
+    keys = random.sample(range(10 * n), n)
+    queries = random.sample(keys, n // 2)
+    ordered = sorted(keys)
+
+    print('cores = %d' % multiprocessing.cpu_count())
+    upsert, get, scan = workload(rb_tree.Rb_tree(), keys, queries)
+    print('one Rb_tree  upsert = %8.0f/s  get = %8.0f/s  scan = %8.0f/s' % (upsert, get, scan))
+    p = 1
+    while p <= max_shards:
+        bounds = [ordered[i * n // p] for i in range(1, p)]
+        with sharded_tree.ShardedTree(bounds) as tree:
+            s_upsert, s_get, s_scan = workload(tree, keys, queries)
+        print('%2d shards    upsert = %8.0f/s  get = %8.0f/s  scan = %8.0f/s  (x%.2f x%.2f x%.2f)'
+              % (p, s_upsert, s_get, s_scan, s_upsert / upsert, s_get / get, s_scan / scan))
+        p *= 2
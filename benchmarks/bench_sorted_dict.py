@@ -0,0 +1,136 @@
+'''
+    SortedDict (LLRB and CLRS engines) against a dict sorted on demand and a pair of bisect-ed
+    lists, for read-heavy, mixed and write-heavy workloads. Every workload also runs a small
+    ordered range scan (10 keys) once every 100 operations.
+
+    usage: python bench_sorted_dict.py [n] [ops]
+'''
+
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+from sorted_dict import SortedDict
+
+
+class TreeMap():
+    def __init__(self, engine):
+        self.d = SortedDict(engine=engine)
+
+    def get(self, key):
+        return self.d.get(key)
+
+    def set(self, key, value):
+        self.d[key] = value
+
+    def delete(self, key):
+        self.d.pop(key, None)
+
+    def scan(self, lo, count):
+        out = []
+        for item in self.d.irange_items(lo):
+            if len(out) == count:
+                break
+            out.append(item)
+        return out
+
+
+class DictSorted():
+    def __init__(self):
+        self.d = {}
+
+    def get(self, key):
+        return self.d.get(key)
+
+    def set(self, key, value):
+        self.d[key] = value
+
+    def delete(self, key):
+        self.d.pop(key, None)
+
+    def scan(self, lo, count):
+        keys = sorted(self.d)
+        i = bisect.bisect_left(keys, lo)
+        return [(k, self.d[k]) for k in keys[i:i + count]]
+
+
+class BisectList():
+    def __init__(self):
+        self.keys = []
+        self.values = []
+
+    def get(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return None
+
+    def set(self, key, value):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            self.values[i] = value
+        else:
+            self.keys.insert(i, key)
+            self.values.insert(i, value)
+
+    def delete(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+            del self.values[i]
+
+    def scan(self, lo, count):
+        i = bisect.bisect_left(self.keys, lo)
+        return list(zip(self.keys[i:i + count], self.values[i:i + count]))
+
+
+def workload(n, ops, read_fraction, seed):
+    rng = random.Random(seed)
+    out = []
+    for i in range(ops):
+        key = rng.randrange(2 * n)
+        if i % 100 == 99:
+            out.append(('scan', key))
+        elif rng.random() < read_fraction:
+            out.append(('get', key))
+        elif rng.random() < 0.5:
+            out.append(('set', key))
+        else:
+            out.append(('delete', key))
+    return out
+
+
+def run(impl, n, ops):
+    for key in random.Random(1).sample(range(2 * n), n):
+        impl.set(key, key)
+    start = time.time()
+    for op, key in ops:
+        if op == 'get':
+            impl.get(key)
+        elif op == 'set':
+            impl.set(key, key)
+        elif op == 'delete':
+            impl.delete(key)
+        else:
+            impl.scan(key, 10)
+    return len(ops) / (time.time() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    impls = (('SortedDict/llrb', lambda: TreeMap(ll_rb_tree.Rb_tree)),
+             ('SortedDict/clrs', lambda: TreeMap(rb_tree.Rb_tree)),
+             ('dict+sorted', DictSorted),
+             ('bisect list', BisectList))
+    for label, read_fraction in (('read-heavy', 0.9), ('mixed', 0.5), ('write-heavy', 0.1)):
+        ops = workload(n, n_ops, read_fraction, seed=2)
+        for name, make in impls:
+            print('%-12s n = %d  %-16s %10.0f ops/s' % (label, n, name, run(make(), n, ops)))
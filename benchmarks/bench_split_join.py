@@ -0,0 +1,92 @@
+'''
+    split/join of the CLRS Rb_tree against rebuilding the pieces by reinserting every key, join
+    of two trees built apart (relinked to one dummy first) against two siblings, and
+    union/intersection/difference of a big and a small tree against inserting (or looking up)
+    the keys of the small one into the big one.
+
+    usage: python bench_split_join.py [n] [m]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+
+
+def timed(fn):
+    start = time.time()
+    result = fn()
+    return time.time() - start, result
+
+
+def build(keys):
+    return rb_tree.Rb_tree.from_sorted(sorted(keys))
+
+
+def split_by_reinsert(tree, key):
+    left, right = rb_tree.Rb_tree(), rb_tree.Rb_tree()
+    for k in tree:
+        target = left if k < key else right
+        target.insert(target.create_node(k))
+    return left, right
+
+
+def union_by_insert(big, small):
+    for k in small:
+        if k not in big:
+            big.insert(big.create_node(k))
+    return big
+
+
+def intersection_by_find(big, small):
+    return build([k for k in small if k in big])
+
+
+def difference_by_delete(big, small):
+    for k in small:
+        x_node = big.find(big.root, k)
+        if x_node != big.dummy:
+            big.delete(x_node)
+    return big
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    random.seed(11)
+    keys = random.sample(range(4 * n), n)
+    small_keys = random.sample(range(4 * n), m)
+    key = random.choice(keys)
+
+    tree = build(keys)
+    t_split, (left, right) = timed(lambda: tree.split(key))
+    pivot = right.minimum(right.root)
+    right.delete(pivot)
+    pivot.left = pivot.right = right.dummy
+    t_join, _ = timed(lambda: rb_tree.Rb_tree.join(left, pivot, right))
+    tree = build(keys)
+    t_reinsert, _ = timed(lambda: split_by_reinsert(tree, key))
+    print('n = %d  split = %.6fs  join = %.6fs  split by reinserting = %.3fs' % (n, t_split, t_join, t_reinsert))
+
+    ordered = sorted(keys)
+    half = n // 2
+    left, right = build(ordered[:half]), build(ordered[half + 1:])
+    t_apart, _ = timed(lambda: rb_tree.Rb_tree.join(left, left.create_node(ordered[half]), right))
+    left = build(ordered[:half])
+    right = left.sibling()
+    right.insert_many(ordered[half + 1:])
+    t_siblings, _ = timed(lambda: rb_tree.Rb_tree.join(left, left.create_node(ordered[half]), right))
+    print('n = %d  join of trees built apart = %.6fs  join of siblings = %.6fs' % (n, t_apart, t_siblings))
+
+    for name, fast, slow in (('union', 'union', union_by_insert),
+                             ('intersection', 'intersection', intersection_by_find),
+                             ('difference', 'difference', difference_by_delete)):
+        big, small = build(keys), build(small_keys)
+        t_fast, _ = timed(lambda: getattr(big, fast)(small))
+        big, small = build(keys), build(small_keys)
+        t_slow, _ = timed(lambda: slow(big, small))
+        print('n = %d  m = %d  %-12s = %.4fs  by insert/find/delete = %.4fs' % (n, m, name, t_fast, t_slow))
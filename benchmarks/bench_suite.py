@@ -0,0 +1,321 @@
+'''
+    Seeded workloads against the CLRS and LLRB trees and the stdlib baselines, reported as JSON.
+
+    Workloads (n keys each):
+        random          insert n random keys, then n lookups of present keys
+        sorted          insert 0 .. n-1 in order, then n lookups
+        reverse         insert n-1 .. 0, then n lookups
+        zipf            n lookups with Zipf (s = 1.1) popularity on a tree of n random keys
+        delete_heavy    on a tree of n random keys, n operations: 3 deletes for every insert
+        sliding_window  window of n / 10 keys over a stream of n: insert the new key, delete
+                        the expired one, read the minimum
+
+    Implementations: clrs (rb_tree.py), llrb (ll_rb_tree.py), bisect (sorted list) and heapq. heapq
+    has no lookup, so it only runs sliding_window (with lazy deletion, the usual heapq idiom).
+
+    Every (implementation, workload, n) runs in its own process, so that the peak RSS (resource
+    module) belongs to that run only; setup_rss_kb is the peak before the timed part starts (keys and
+    untimed setup). Throughput counts the timed operations; p50/p99 latencies come from timing one
+    operation out of every --sample individually. Runs longer than --timeout are killed and
+    reported as such, which is what happens to the bisect list long before n = 1e7.
+
+    usage: python bench_suite.py [--sizes 1e3,1e4,1e5,1e6,1e7] [--impls clrs,llrb,bisect,heapq]
+                                 [--workloads random,...] [--seed 1] [--out results.json]
+                                 [--compare old_results.json]
+'''
+
+import argparse
+import bisect
+import heapq
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import ll_rb_tree
+
+clock = timeit.default_timer
+
+
+class Clrs():
+    ops = ('insert', 'find', 'delete', 'min')
+
+    def __init__(self):
+        self.tree = rb_tree.Rb_tree()
+
+    def insert(self, key):
+        self.tree.insert(self.tree.create_node(key))
+
+    def find(self, key):
+        return self.tree.find(self.tree.root, key)
+
+    def delete(self, key):
+        self.tree.delete(self.tree.find(self.tree.root, key))
+
+    def min(self, key):
+        return self.tree.minimum(self.tree.root).key
+
+
+class Llrb():
+    ops = ('insert', 'find', 'delete', 'min')
+
+    def __init__(self):
+        self.tree = ll_rb_tree.Rb_tree()
+
+    def insert(self, key):
+        self.tree.insert(key)
+
+    def find(self, key):
+        return self.tree.find(key)
+
+    def delete(self, key):
+        self.tree.delete(key)
+
+    def min(self, key):
+        return self.tree.minimum(self.tree.root).key
+
+
+class BisectList():
+    ops = ('insert', 'find', 'delete', 'min')
+
+    def __init__(self):
+        self.keys = []
+
+    def insert(self, key):
+        bisect.insort(self.keys, key)
+
+    def find(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def delete(self, key):
+        del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def min(self, key):
+        return self.keys[0]
+
+
+class Heap():
+    # lazy deletion: deleted keys stay in the heap until they reach the top, which only makes
+    # sense when the minimum is read as often as keys expire
+    ops = ('insert', 'delete', 'min')
+    workloads = ('sliding_window',)
+
+    def __init__(self):
+        self.heap = []
+        self.deleted = set()
+
+    def insert(self, key):
+        heapq.heappush(self.heap, key)
+
+    def delete(self, key):
+        self.deleted.add(key)
+
+    def min(self, key):
+        heap = self.heap
+        while heap[0] in self.deleted:
+            self.deleted.remove(heapq.heappop(heap))
+        return heap[0]
+
+
+IMPLS = {'clrs': Clrs, 'llrb': Llrb, 'bisect': BisectList, 'heapq': Heap}
+
+
+# A workload is a list of phases (timed, ops, keys): ops is an op name for the whole phase, or a
+# list with one op name per key. Untimed phases build the starting state.
+
+def zipf_sampler(rng, values, s):
+    cumulative = []
+    total = 0.0
+    for i in range(len(values)):
+        total += 1.0 / (i + 1) ** s
+        cumulative.append(total)
+    return lambda: values[bisect.bisect_left(cumulative, rng.random() * total)]
+
+
+def workload(name, n, seed):
+    rng = random.Random(seed)
+    if name in ('random', 'sorted', 'reverse'):
+        if name == 'random':
+            keys = rng.sample(range(10 * n), n)
+        else:
+            keys = list(range(n)) if name == 'sorted' else list(range(n - 1, -1, -1))
+        return [(True, 'insert', keys), (True, 'find', [rng.choice(keys) for i in range(n)])]
+    if name == 'zipf':
+        keys = rng.sample(range(10 * n), n)
+        sample = zipf_sampler(rng, keys, 1.1)
+        return [(False, 'insert', keys), (True, 'find', [sample() for i in range(n)])]
+    if name == 'delete_heavy':
+        keys = rng.sample(range(20 * n), 2 * n)
+        present, fresh = keys[:n], keys[n:]
+        ops, args = [], []
+        for i in range(n):
+            if i % 4 == 3:
+                key = fresh.pop()
+                ops.append('insert')
+                present.append(key)
+            else:
+                j = rng.randrange(len(present))
+                present[j], present[-1] = present[-1], present[j]
+                key = present.pop()
+                ops.append('delete')
+            args.append(key)
+        return [(False, 'insert', keys[:n]), (True, ops, args)]
+    if name == 'sliding_window':
+        w = max(1, n // 10)
+        stream = rng.sample(range(10 * (n + w)), n + w)
+        ops, args = [], []
+        for i in range(w, n + w):
+            ops.extend(('insert', 'delete', 'min'))
+            args.extend((stream[i], stream[i - w], None))
+        return [(False, 'insert', stream[:w]), (True, ops, args)]
+    raise ValueError('unknown workload ' + name)
+
+
+def needs(phases):
+    ops = set()
+    for timed, op, keys in phases:
+        ops.update([op] if isinstance(op, str) else op)
+    return ops
+
+
+def percentile(sorted_samples, p):
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(p * len(sorted_samples)))]
+
+
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_one(impl_name, workload_name, n, seed, sample):
+    phases = workload(workload_name, n, seed)
+    impl = IMPLS[impl_name]()
+    n_ops = 0
+    elapsed = 0.0
+    samples = []
+    setup_rss = None
+    for timed, op, keys in phases:
+        if timed and setup_rss is None:
+            setup_rss = peak_rss_kb()
+        if isinstance(op, str):
+            ops = None
+            fn = getattr(impl, op)
+        else:
+            ops = op
+            fns = dict((name, getattr(impl, name)) for name in set(ops))
+        start = clock()
+        for i in range(len(keys)):
+            if ops is not None:
+                fn = fns[ops[i]]
+            if timed and i % sample == 0:
+                t0 = clock()
+                fn(keys[i])
+                samples.append(clock() - t0)
+            else:
+                fn(keys[i])
+        if timed:
+            elapsed += clock() - start
+            n_ops += len(keys)
+    samples.sort()
+    return {'impl': impl_name, 'workload': workload_name, 'n': n, 'ops': n_ops,
+            'seconds': elapsed, 'throughput': n_ops / elapsed if elapsed > 0 else None,
+            'p50_us': percentile(samples, 0.50) * 1e6 if samples else None,
+            'p99_us': percentile(samples, 0.99) * 1e6 if samples else None,
+            'setup_rss_kb': setup_rss, 'peak_rss_kb': peak_rss_kb()}
+
+
+def run_isolated(impl_name, workload_name, n, args):
+    # a fresh process per run keeps ru_maxrss (a high-water mark) meaningful
+    command = [sys.executable, os.path.abspath(__file__), '--one', impl_name, workload_name, str(n),
+               '--seed', str(args.seed), '--sample', str(args.sample)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    deadline = time.time() + args.timeout
+    while process.poll() is None:
+        if time.time() > deadline:
+            process.kill()
+            process.wait()
+            return {'impl': impl_name, 'workload': workload_name, 'n': n, 'timeout': args.timeout}
+        time.sleep(0.05)
+    output = process.stdout.read()
+    if process.returncode != 0:
+        return {'impl': impl_name, 'workload': workload_name, 'n': n, 'error': process.returncode}
+    return json.loads(output.decode('utf-8'))
+
+
+def git_revision():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=os.path.dirname(os.path.abspath(__file__)))
+        return output.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_path):
+    with open(old_path) as f:
+        old = dict(((r['impl'], r['workload'], r['n']), r) for r in json.load(f)['results'])
+    for r in results:
+        before = old.get((r['impl'], r['workload'], r['n']))
+        if before and before.get('throughput') and r.get('throughput'):
+            sys.stderr.write('%-7s %-15s %9d  %10.0f -> %10.0f ops/s  (%+.1f%%)\n'
+                             % (r['impl'], r['workload'], r['n'], before['throughput'], r['throughput'],
+                                100.0 * (r['throughput'] / before['throughput'] - 1)))
+
+
+def sizes(text):
+    return [int(float(s)) for s in text.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Seeded tree benchmarks, JSON output')
+    parser.add_argument('--sizes', type=sizes, default=sizes('1e3,1e4,1e5'))
+    parser.add_argument('--impls', default='clrs,llrb,bisect,heapq')
+    parser.add_argument('--workloads', default='random,sorted,reverse,zipf,delete_heavy,sliding_window')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--sample', type=int, default=10, help='time one op out of every SAMPLE')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per run')
+    parser.add_argument('--out', help='write the JSON here instead of stdout')
+    parser.add_argument('--compare', help='JSON of an earlier run, throughput changes go to stderr')
+    parser.add_argument('--one', nargs=3, metavar=('IMPL', 'WORKLOAD', 'N'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sys.setrecursionlimit(10000)
+
+    if args.one:
+        impl_name, workload_name, n = args.one
+        sys.stdout.write(json.dumps(run_one(impl_name, workload_name, int(n), args.seed, args.sample)))
+        sys.exit(0)
+
+    results = []
+    for n in args.sizes:
+        for workload_name in args.workloads.split(','):
+            required = needs(workload(workload_name, 1, args.seed))
+            for impl_name in args.impls.split(','):
+                impl = IMPLS[impl_name]
+                if not required.issubset(impl.ops) or workload_name not in getattr(impl, 'workloads', [workload_name]):
+                    continue
+                result = run_isolated(impl_name, workload_name, n, args)
+                sys.stderr.write(json.dumps(result) + '\n')
+                results.append(result)
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'revision': git_revision(), 'seed': args.seed, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'results': results}
+    if args.compare:
+        compare(results, args.compare)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        sys.stdout.write(json.dumps(report, indent=1) + '\n')
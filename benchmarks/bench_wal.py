@@ -0,0 +1,96 @@
+'''
+    Cost of the write-ahead log of DurableTree: update throughput for several group commit sizes
+    (one fsync per group) against the bare tree and against pickling the whole tree, the time a
+    checkpoint stalls the updates (CLRS tree, dumped in place) or not (persistent LLRB, dumped in
+    the background), and recovery from a snapshot plus a log tail.
+
+    The directory is created in the current directory (not /tmp, often a tmpfs where fsync costs
+    nothing), pass another one as third argument.
+
+    usage: python bench_wal.py [n] [updates] [directory]
+'''
+
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+import persistent_ll_rb_tree
+from durable_tree import DurableTree
+
+
+def timed(fn):
+    start = time.time()
+    result = fn()
+    return time.time() - start, result
+
+
+def fresh(parent, engine, n):
+    # Directory holding a snapshot of n keys and no log
+    directory = tempfile.mkdtemp(dir=parent)
+    engine.from_sorted(range(0, 2 * n, 2)).dump(os.path.join(directory, 'snapshot.0.rbt'))
+    return directory
+
+
+def run(tree, updates):
+    # Updates per second and the longest single update
+    worst = 0
+    start = time.time()
+    for k in updates:
+        t = time.time()
+        tree.upsert(k, k)
+        t = time.time() - t
+        if t > worst:
+            worst = t
+    tree.commit()
+    return len(updates) / (time.time() - start), worst
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    parent = tempfile.mkdtemp(dir=sys.argv[3] if len(sys.argv) > 3 else '.')
+    rng = random.Random(16)
+    updates = [rng.randrange(2 * n) for i in range(m)]
+
+    try:
+        tree = rb_tree.Rb_tree.from_sorted(range(0, 2 * n, 2))
+        start = time.time()
+        for k in updates:
+            tree.upsert(k, k)
+        print('bare tree              updates = %9.0f/s' % (m / (time.time() - start)))
+        t_pickle, data = timed(lambda: pickle.dumps(list(tree.items()), pickle.HIGHEST_PROTOCOL))
+        print('pickle the whole tree  n = %d  %.2fs  %.1f MB' % (n, t_pickle, len(data) / 1e6))
+        del tree, data
+
+        for group_size in (1, 8, 64, 512, 4096):
+            directory = fresh(parent, rb_tree.Rb_tree, n)
+            tree = DurableTree(directory, group_size=group_size, checkpoint_every=None)
+            # a group of one fsyncs every update, fewer of them are enough
+            some = updates[:max(1000, m // 10)] if group_size == 1 else updates
+            rate, worst = run(tree, some)
+            tree.close()
+            print('logged, group = %4d   updates = %9.0f/s  log = %5.2f MB'
+                  % (group_size, rate, os.path.getsize(os.path.join(directory, 'wal.0')) / 1e6))
+            shutil.rmtree(directory)
+
+        # one checkpoint in the middle of the updates
+        for name, engine in (('clrs', rb_tree.Rb_tree), ('persistent llrb', persistent_ll_rb_tree.Rb_tree)):
+            directory = fresh(parent, engine, n)
+            tree = DurableTree(directory, engine, group_size=64, checkpoint_every=m // 2 + 1)
+            rate, worst = run(tree, updates)
+            tree.close()
+            print('checkpoint, %-15s updates = %9.0f/s  longest update = %6.3fs' % (name, rate, worst))
+
+            t_recover, tree = timed(lambda: DurableTree(directory, engine))
+            print('recovery, %-17s %.2fs  (snapshot + %d logged updates)' % (name, t_recover, tree.n_replayed))
+            tree.close()
+            shutil.rmtree(directory)
+    finally:
+        shutil.rmtree(parent)
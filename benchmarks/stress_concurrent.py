@@ -0,0 +1,112 @@
+'''
+    Stress test of LockedTree and SnapshotTree: one writer replaces keys (a delete and an insert
+    per pair, committed in whole pairs, so every committed version has exactly n keys and
+    value == key) while reader threads validate() the version they see, count its keys and check
+    random lookups. The unsynchronized CLRS tree is run too, as a control: its readers are
+    expected to see broken trees.
+
+    usage: python stress_concurrent.py [n] [pairs] [readers]
+'''
+
+import contextlib
+import os
+import random
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
+
+import rb_tree
+from concurrent_tree import LockedTree, SnapshotTree
+
+
+class UnsafeTree():
+    # no synchronization at all
+    def __init__(self, batch_size):
+        self.tree = rb_tree.Rb_tree()
+
+    def upsert(self, key, value):
+        self.tree.upsert(key, value)
+
+    def delete(self, key):
+        self.tree.pop(key, None)
+
+    def commit(self):
+        pass
+
+    @contextlib.contextmanager
+    def reading(self):
+        yield self.tree
+
+
+def writer(tree, n, pairs, seed, done):
+    rng = random.Random(seed)
+    present = list(range(n))
+    next_key = n
+    for i in range(pairs):
+        j = rng.randrange(len(present))
+        present[j], present[-1] = present[-1], present[j]
+        tree.delete(present.pop())
+        tree.upsert(next_key, next_key)
+        present.append(next_key)
+        next_key += 1
+    tree.commit()
+    done.set()
+
+
+def reader(tree, n, seed, done, errors, checks):
+    rng = random.Random(seed)
+    while not done.is_set():
+        try:
+            with tree.reading() as t:
+                t.validate()
+                count = sum(1 for key, value in t.items() if key == value)
+                if count != n or len(t) != n:
+                    raise AssertionError('saw ' + str(count) + ' keys, len ' + str(len(t)))
+                for i in range(10):
+                    key = rng.randrange(2 * n)
+                    value = t.get(key)
+                    if value is not None and value != key:
+                        raise AssertionError('wrong value for ' + str(key))
+            checks[0] += 1
+        except Exception as e:
+            errors.append(repr(e))
+
+
+def run(make, n, pairs, n_readers):
+    # an even batch size, so that commits fall between whole pairs
+    tree = make(32)
+    for key in range(n):
+        tree.upsert(key, key)
+    tree.commit()
+    done = threading.Event()
+    errors = []
+    checks = [0]
+    threads = [threading.Thread(target=reader, args=(tree, n, i, done, errors, checks)) for i in range(n_readers)]
+    threads.append(threading.Thread(target=writer, args=(tree, n, pairs, 99, done)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return checks[0], errors
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pairs = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    n_readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    # switch threads as often as possible to get more interleavings
+    if hasattr(sys, 'setswitchinterval'):
+        sys.setswitchinterval(1e-6)
+    else:
+        sys.setcheckinterval(1)
+
+    failed = False
+    for name, make in (('LockedTree', lambda batch: LockedTree(batch)),
+                       ('SnapshotTree', lambda batch: SnapshotTree(batch)),
+                       ('unsynchronized (control)', UnsafeTree)):
+        checks, errors = run(make, n, pairs, n_readers)
+        print('%-26s consistent reads = %6d  errors = %d %s' % (name, checks, len(errors), errors[:1]))
+        if errors and name != 'unsynchronized (control)':
+            failed = True
+    sys.exit(1 if failed else 0)
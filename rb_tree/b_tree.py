@@ -0,0 +1,477 @@
+'''
+    B-tree a la CLRS (chapter 18), as a storage engine with the mapping interface of the red-black
+    trees (insert, delete, find, get, upsert, pop, keys/values/items ranges...), so that SortedDict,
+    SortedMultiset or ShardedTree can run on it instead.
+
+    A red-black tree is a binary encoding of a 2-3-4 tree (the LLRB of a 2-3 tree): a lookup follows
+    about 2 log2(n) Python objects, each one a separate allocation. Here a node holds up to
+    order - 1 sorted keys in a plain list, searched with bisect (in C), and order children, so a
+    lookup visits log_order(n) nodes only and the keys of a node sit together in one array.
+    order = 4 is a 2-3-4 tree; the default 64 suits lists of Python objects.
+
+    Keys are unique, as in the LLRB: inserting a key that is there replaces its value. Insert and
+    delete go down the tree once, splitting full nodes (insert) or filling nodes at the minimum
+    (delete) before entering them, so they never have to come back up. There are no node objects
+    per key: find returns a (node, index) position instead of a node.
+'''
+
+import bisect
+import random
+
+class Node(object):
+    __slots__ = ('keys', 'values', 'children')
+
+    def __init__(self, keys, values, children=None):
+        self.keys = keys
+        self.values = values
+        # None for a leaf, else len(keys) + 1 subtrees
+        self.children = children
+
+class B_tree():
+    # check every invariant (validate) after each insert and delete
+    debug = False
+
+    def __init__(self, order=64):
+        '''
+            order: maximum number of children of a node (even, at least 4): nodes hold between
+                   order / 2 - 1 and order - 1 keys, the root between 0 and order - 1
+        '''
+        if order < 4 or order % 2:
+            raise ValueError('order must be even and at least 4, not ' + str(order))
+        self.order = order
+        # minimum degree of CLRS
+        self.t = order // 2
+        self.root = Node([], [])
+        self.n_keys = 0
+
+    def __len__(self):
+        return self.n_keys
+
+# Idea: bottom-up, as in the red-black trees. Choose the height as the smallest one whose full
+# tree holds the n keys, then give every node as few children as can hold its keys and spread the
+# keys evenly among them: every subtree is then at least half full, above the minimum of order / 2.
+    @classmethod
+    def from_sorted(cls, keys, **options):
+        '''
+            Build a tree from keys in increasing order in O(n). Keys without a len() are first
+            materialized in a list. Options are passed to the constructor.
+        '''
+        tree = cls(**options)
+        if not hasattr(keys, '__len__'):
+            keys = list(keys)
+        tree.__load_sorted(((key, None) for key in keys), len(keys))
+        return tree
+
+    def __load_sorted(self, items, n):
+        # Replace the content of the tree with the n (key, value) items, in key order
+        self.n_keys = n
+        height = 0
+        while self.__capacity(height) < n:
+            height += 1
+        self.root = self.__build_sorted(iter(items), n, height, [None])
+
+    def __capacity(self, height):
+        # keys in a full subtree of this height (0 for a leaf)
+        return self.order ** (height + 1) - 1
+
+    def __next_sorted(self, items, last):
+        key, value = next(items)
+        if last[0] is not None and key <= last[0]:
+            raise ValueError('keys are not strictly increasing: ' + str(key) + ' after ' + str(last[0]))
+        last[0] = key
+        return key, value
+
+    def __build_sorted(self, items, n, height, last):
+        if height == 0:
+            leaf = Node([], [])
+            for i in range(n):
+                key, value = self.__next_sorted(items, last)
+                leaf.keys.append(key)
+                leaf.values.append(value)
+            return leaf
+
+        below = self.__capacity(height - 1)
+        n_children = 2
+        while n_children - 1 + n_children * below < n:
+            n_children += 1
+        # the n - (n_children - 1) keys below, spread evenly
+        share, extra = divmod(n - n_children + 1, n_children)
+        node = Node([], [], [])
+        for i in range(n_children):
+            if i:
+                key, value = self.__next_sorted(items, last)
+                node.keys.append(key)
+                node.values.append(value)
+            node.children.append(self.__build_sorted(items, share + (1 if i < extra else 0), height - 1, last))
+        return node
+
+    def find(self, key):
+        '''
+            (node, index) of key, or None
+        '''
+        x = self.root
+        while True:
+            keys = x.keys
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return x, i
+            if x.children is None:
+                return None
+            x = x.children[i]
+
+    def minimum(self, x=None):
+        '''
+            Leftmost leaf of the subtree at x (of the tree by default): its first key is the smallest
+        '''
+        if x is None:
+            x = self.root
+        while x.children is not None:
+            x = x.children[0]
+        return x
+
+    def maximum(self, x=None):
+        '''
+            Rightmost leaf of the subtree at x (of the tree by default): its last key is the biggest
+        '''
+        if x is None:
+            x = self.root
+        while x.children is not None:
+            x = x.children[-1]
+        return x
+
+    def __split_child(self, x, i):
+        # x.children[i] is full: move its median key up into x, and its upper half to a new node
+        t = self.t
+        y = x.children[i]
+        z = Node(y.keys[t:], y.values[t:], y.children[t:] if y.children is not None else None)
+        x.keys.insert(i, y.keys[t - 1])
+        x.values.insert(i, y.values[t - 1])
+        x.children.insert(i + 1, z)
+        del y.keys[t - 1:], y.values[t - 1:]
+        if y.children is not None:
+            del y.children[t:]
+
+    def insert(self, key, value=None):
+        '''
+            Insert key, or replace its value if it is already in the tree
+        '''
+        full = self.order - 1
+        x = self.root
+        if len(x.keys) == full:
+            x = self.root = Node([], [], [x])
+            self.__split_child(x, 0)
+        while True:
+            keys = x.keys
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                x.values[i] = value
+                break
+            if x.children is None:
+                keys.insert(i, key)
+                x.values.insert(i, value)
+                self.n_keys += 1
+                break
+            if len(x.children[i].keys) == full:
+                self.__split_child(x, i)
+                if keys[i] == key:
+                    x.values[i] = value
+                    break
+                if keys[i] < key:
+                    i += 1
+            x = x.children[i]
+        if self.debug:
+            self.validate()
+
+    def __merge(self, x, i):
+        # x.children[i] and x.children[i + 1] have t - 1 keys: merge them with x.keys[i] between
+        y = x.children[i]
+        z = x.children.pop(i + 1)
+        y.keys.append(x.keys.pop(i))
+        y.values.append(x.values.pop(i))
+        y.keys.extend(z.keys)
+        y.values.extend(z.values)
+        if y.children is not None:
+            y.children.extend(z.children)
+        if not x.keys and x is self.root:
+            self.root = y
+        return y
+
+    def __fill(self, x, i):
+        # x.children[i] has t - 1 keys: give it one more, from a sibling or by merging with one.
+        # Returns the child that now covers the keys of x.children[i].
+        t = self.t
+        c = x.children[i]
+        if i > 0 and len(x.children[i - 1].keys) >= t:
+            # rotate right through x.keys[i - 1]
+            left = x.children[i - 1]
+            c.keys.insert(0, x.keys[i - 1])
+            c.values.insert(0, x.values[i - 1])
+            x.keys[i - 1] = left.keys.pop()
+            x.values[i - 1] = left.values.pop()
+            if c.children is not None:
+                c.children.insert(0, left.children.pop())
+            return c
+        if i < len(x.keys) and len(x.children[i + 1].keys) >= t:
+            # rotate left through x.keys[i]
+            right = x.children[i + 1]
+            c.keys.append(x.keys[i])
+            c.values.append(x.values[i])
+            x.keys[i] = right.keys.pop(0)
+            x.values[i] = right.values.pop(0)
+            if c.children is not None:
+                c.children.append(right.children.pop(0))
+            return c
+        if i < len(x.keys):
+            return self.__merge(x, i)
+        return self.__merge(x, i - 1)
+
+    def delete(self, key):
+        '''
+            Delete key, KeyError if it is not in the tree
+        '''
+        t = self.t
+        x = self.root
+        while True:
+            keys = x.keys
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                if x.children is None:
+                    del keys[i], x.values[i]
+                    break
+                y, z = x.children[i], x.children[i + 1]
+                if len(y.keys) >= t:
+                    # replace key by its predecessor, and go delete that one below
+                    leaf = self.maximum(y)
+                    key = keys[i] = leaf.keys[-1]
+                    x.values[i] = leaf.values[-1]
+                    x = y
+                elif len(z.keys) >= t:
+                    leaf = self.minimum(z)
+                    key = keys[i] = leaf.keys[0]
+                    x.values[i] = leaf.values[0]
+                    x = z
+                else:
+                    x = self.__merge(x, i)
+                continue
+            if x.children is None:
+                raise KeyError(key)
+            if len(x.children[i].keys) < t:
+                x = self.__fill(x, i)
+            else:
+                x = x.children[i]
+        self.n_keys -= 1
+        if self.debug:
+            self.validate()
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def get(self, key, default=None):
+        # find, without building the position
+        x = self.root
+        while True:
+            keys = x.keys
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return x.values[i]
+            if x.children is None:
+                return default
+            x = x.children[i]
+
+    def upsert(self, key, value):
+        '''
+            Set the value of key, inserting it if it is not in the tree yet
+        '''
+        self.insert(key, value)
+
+    def setdefault(self, key, default=None):
+        position = self.find(key)
+        if position is not None:
+            x, i = position
+            return x.values[i]
+        self.insert(key, default)
+        return default
+
+    def pop(self, key, *default):
+        '''
+            Delete key and return its value. Without a default, a missing key raises KeyError.
+        '''
+        position = self.find(key)
+        if position is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        x, i = position
+        value = x.values[i]
+        self.delete(key)
+        return value
+
+    def peek_min(self):
+        '''
+            (key, value) of the smallest key, KeyError on an empty tree
+        '''
+        if not self.n_keys:
+            raise KeyError('peek_min on an empty tree')
+        leaf = self.minimum()
+        return leaf.keys[0], leaf.values[0]
+
+    def peek_max(self):
+        '''
+            (key, value) of the biggest key, KeyError on an empty tree
+        '''
+        if not self.n_keys:
+            raise KeyError('peek_max on an empty tree')
+        leaf = self.maximum()
+        return leaf.keys[-1], leaf.values[-1]
+
+    def pop_min(self):
+        item = self.peek_min()
+        self.delete(item[0])
+        return item
+
+    def pop_max(self):
+        item = self.peek_max()
+        self.delete(item[0])
+        return item
+
+    def __positions(self, lo=None, hi=None):
+        # (node, index) of the keys in [lo, hi), in order. The stack holds (node, i) for the nodes
+        # whose child i is being walked.
+        stack = []
+        x = self.root
+        while x is not None:
+            i = 0 if lo is None else bisect.bisect_left(x.keys, lo)
+            stack.append((x, i))
+            x = x.children[i] if x.children is not None else None
+        while stack:
+            x, i = stack.pop()
+            keys = x.keys
+            if x.children is None:
+                end = len(keys) if hi is None else bisect.bisect_left(keys, hi, i)
+                for j in range(i, end):
+                    yield x, j
+                if end < len(keys):
+                    return
+            elif i < len(keys):
+                if hi is not None and not keys[i] < hi:
+                    return
+                yield x, i
+                stack.append((x, i + 1))
+                x = x.children[i + 1]
+                while x is not None:
+                    stack.append((x, 0))
+                    x = x.children[0] if x.children is not None else None
+
+    def keys(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi) in increasing order, generated lazily after an O(log n) seek.
+            None leaves that end of the range open.
+        '''
+        return (x.keys[i] for x, i in self.__positions(lo, hi))
+
+    def values(self, lo=None, hi=None):
+        '''
+            Values of the keys in [lo, hi), in key order
+        '''
+        return (x.values[i] for x, i in self.__positions(lo, hi))
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi), in key order
+        '''
+        return ((x.keys[i], x.values[i]) for x, i in self.__positions(lo, hi))
+
+    def __iter__(self):
+        return self.keys()
+
+    def __reversed_positions(self):
+        # as __positions from the right: (node, i) while child i is walked, key i - 1 comes next
+        stack = []
+        x = self.root
+        while x is not None:
+            stack.append((x, len(x.keys)))
+            x = x.children[-1] if x.children is not None else None
+        while stack:
+            x, i = stack.pop()
+            if x.children is None:
+                for j in range(i - 1, -1, -1):
+                    yield x, j
+            elif i > 0:
+                yield x, i - 1
+                stack.append((x, i - 1))
+                x = x.children[i - 1]
+                while x is not None:
+                    stack.append((x, len(x.keys)))
+                    x = x.children[-1] if x.children is not None else None
+
+    def __reversed__(self):
+        return (x.keys[i] for x, i in self.__reversed_positions())
+
+    def reversed_items(self):
+        '''
+            (key, value) pairs in decreasing key order, lazily
+        '''
+        return ((x.keys[i], x.values[i]) for x, i in self.__reversed_positions())
+
+    def height(self):
+        '''
+            Levels of nodes, the leaves included (all the leaves are at the same depth)
+        '''
+        height = 1
+        x = self.root
+        while x.children is not None:
+            height += 1
+            x = x.children[0]
+        return height
+
+    def validate(self):
+        '''
+            Check the number of keys and children of every node, the key order and that all the
+            leaves are at the same depth. Raises AssertionError (also under python -O) and
+            returns the height. O(n).
+        '''
+        height, size = self.__validate(self.root, None, None, True)
+        if size != self.n_keys:
+            raise AssertionError('len is ' + str(self.n_keys) + ' but there are ' + str(size) + ' keys')
+        return height
+
+    def __validate(self, x, lo, hi, is_root):
+        # (height, number of keys) of the subtree at x, keys must be in (lo, hi)
+        keys = x.keys
+        if len(x.values) != len(keys):
+            raise AssertionError('keys and values differ at ' + str(keys))
+        if len(keys) > self.order - 1 or (not is_root and len(keys) < self.t - 1):
+            raise AssertionError(str(len(keys)) + ' keys in a node at ' + str(keys[:1]))
+        for i, key in enumerate(keys):
+            if (lo is not None and key <= lo) or (hi is not None and hi <= key) or (i and key <= keys[i - 1]):
+                raise AssertionError('key ' + str(key) + ' out of order')
+        if x.children is None:
+            return 1, len(keys)
+        if len(x.children) != len(keys) + 1:
+            raise AssertionError(str(len(keys)) + ' keys but ' + str(len(x.children)) + ' children')
+        if is_root and not keys:
+            raise AssertionError('empty internal root')
+        bounds = [lo] + keys + [hi]
+        heights = set()
+        size = len(keys)
+        for i, child in enumerate(x.children):
+            h, n = self.__validate(child, bounds[i], bounds[i + 1], False)
+            heights.add(h)
+            size += n
+        if len(heights) != 1:
+            raise AssertionError('leaves at different depths below ' + str(keys[:1]))
+        return heights.pop() + 1, size
+
+
+if __name__ == "__main__":
+    b_tree = B_tree(order=4)
+
+    x = random.sample(range(1, 1000000), 100000)
+    for v in x:
+        b_tree.insert(v)
+
+    for v in x[::2]:
+        b_tree.delete(v)
+
+    # timings live in benchmarks/, this only checks the result
+    print('keys = ' + str(len(b_tree)) + ' height = ' + str(b_tree.validate()))
@@ -0,0 +1,506 @@
+'''
+    RB tree implemented a la CLRS, with the nodes stored column-wise.
+
+    Same algorithm as rb_tree.py, but instead of one Python object per node, every field lives in
+    its own array (key, left, right, parent, color) and a node is just an index into them.
+    Index 0 is the shared dummy (the T.nil of CLRS), so "node != self.dummy" becomes "node != 0".
+    A deleted node's slot is pushed onto a free list (threaded through the right column) and
+    reused by the next create_node, so the arrays never shrink but never grow without need. A free
+    slot has the color FREE, so freeing or deleting it again raises ValueError instead of putting
+    it twice on the free list.
+
+    Keys must fit the key typecode ('l' by default, a C long). Values can be any object, so they
+    live in a plain list. Besides the node API of rb_tree.py (create_node, insert, find, delete on
+    node indexes), the tree has its key API: get, upsert, setdefault, pop, in, len, keys, values,
+    items and iteration.
+'''
+
+from array import array
+import random
+import struct
+
+BLACK = 0
+RED = 1
+# color of the slots on the free list
+FREE = -1
+
+class Rb_tree():
+    # check every invariant (validate) after each insert and delete
+    debug = False
+
+    def __init__(self, key_typecode='l'):
+        # slot 0 is the dummy node
+        self.key = array(key_typecode, [0])
+        self.value = [None]
+        self.left = array('i', [0])
+        self.right = array('i', [0])
+        self.parent = array('i', [0])
+        self.color = array('b', [BLACK])
+        self.dummy = 0
+        self.root = self.dummy
+        self.free = 0
+        self.n_keys = 0
+
+    def __len__(self):
+        return self.n_keys
+
+    def create_node(self, val, value=None):
+        x_node = self.free
+        if x_node != 0:
+            self.free = self.right[x_node]
+            self.key[x_node] = val
+            self.value[x_node] = value
+            self.left[x_node] = 0
+            self.right[x_node] = 0
+            self.parent[x_node] = 0
+            self.color[x_node] = RED
+        else:
+            x_node = len(self.key)
+            self.key.append(val)
+            self.value.append(value)
+            self.left.append(0)
+            self.right.append(0)
+            self.parent.append(0)
+            self.color.append(RED)
+        return x_node
+
+    def free_node(self, x_node):
+        '''
+            Give back the slot of a node made by create_node and not inserted (delete frees the
+            nodes of the tree)
+        '''
+        if x_node == self.dummy:
+            raise ValueError('the dummy node cannot be freed')
+        if self.color[x_node] == FREE:
+            raise ValueError('node ' + str(x_node) + ' is already free')
+        if x_node == self.root or self.parent[x_node] != 0:
+            raise ValueError('node ' + str(x_node) + ' is in the tree, delete it instead')
+        self.__free(x_node)
+
+    def __free(self, x_node):
+        self.value[x_node] = None
+        self.color[x_node] = FREE
+        self.right[x_node] = self.free
+        self.free = x_node
+
+    def memory_usage(self):
+        # Bytes held by the columns (the value column only counts its pointers)
+        return (sum(len(col) * col.itemsize for col in (self.key, self.left, self.right, self.parent, self.color))
+                + len(self.value) * struct.calcsize('P'))
+
+    def left_rotate(self, x_node):
+        left, right, parent = self.left, self.right, self.parent
+
+        y_node = right[x_node]
+
+        right[x_node] = left[y_node]
+        if left[y_node] != 0:
+            parent[left[y_node]] = x_node
+
+        parent[y_node] = parent[x_node]
+        if parent[x_node] == 0:
+            self.root = y_node
+        elif x_node == left[parent[x_node]]:
+            left[parent[x_node]] = y_node
+        else:
+            right[parent[x_node]] = y_node
+
+        left[y_node] = x_node
+        parent[x_node] = y_node
+
+    def right_rotate(self, x_node):
+        left, right, parent = self.left, self.right, self.parent
+
+        y_node = left[x_node]
+        left[x_node] = right[y_node]
+        if right[y_node] != 0:
+            parent[right[y_node]] = x_node
+
+        parent[y_node] = parent[x_node]
+        if parent[x_node] == 0:
+            self.root = y_node
+        elif left[parent[x_node]] == x_node:
+            left[parent[x_node]] = y_node
+        else:
+            right[parent[x_node]] = y_node
+
+        right[y_node] = x_node
+        parent[x_node] = y_node
+
+    def insert(self, z_node):
+        '''
+            Link z_node, a node just made by create_node, into the tree
+        '''
+        if (z_node == self.dummy or z_node == self.root or self.left[z_node] != 0 or self.right[z_node] != 0
+                or self.color[z_node] != RED):
+            raise ValueError('node ' + str(z_node) + ' is not a new node')
+
+        self.n_keys += 1
+        key, left, right = self.key, self.left, self.right
+        z_key = key[z_node]
+        x_node = self.root
+        y_node = 0
+        # Find leaf to insert
+        while x_node != 0:
+            y_node = x_node
+            if z_key < key[x_node]:
+                x_node = left[x_node]
+            else:
+                x_node = right[x_node]
+
+        self.parent[z_node] = y_node
+        if y_node == 0:
+            self.root = z_node
+        elif z_key < key[y_node]:
+            left[y_node] = z_node
+        else:
+            right[y_node] = z_node
+
+        self.insert_fixup(z_node)
+        if self.debug:
+            self.validate()
+
+    def insert_fixup(self, z_node):
+        left, right, parent, color = self.left, self.right, self.parent, self.color
+
+        while color[parent[z_node]] == RED:
+            parent_node = parent[z_node]
+            grand_parent = parent[parent_node]
+            if parent_node == left[grand_parent]:
+                uncle_node = right[grand_parent]
+                # Case 1: uncle is Red, flip colors and continue up the tree
+                if color[uncle_node] == RED:
+                    color[parent_node] = BLACK
+                    color[uncle_node] = BLACK
+                    color[grand_parent] = RED
+                    z_node = grand_parent
+                else:
+                    # Case 2: z_node at right
+                    if z_node == right[parent_node]:
+                        z_node = parent_node
+                        self.left_rotate(z_node)
+                        parent_node = parent[z_node]
+                    # Case 3: z_node at left
+                    color[parent_node] = BLACK
+                    color[grand_parent] = RED
+                    self.right_rotate(grand_parent)
+            else:
+                uncle_node = left[grand_parent]
+                if color[uncle_node] == RED:
+                    color[parent_node] = BLACK
+                    color[uncle_node] = BLACK
+                    color[grand_parent] = RED
+                    z_node = grand_parent
+                else:
+                    if z_node == left[parent_node]:
+                        z_node = parent_node
+                        self.right_rotate(z_node)
+                        parent_node = parent[z_node]
+                    color[parent_node] = BLACK
+                    color[grand_parent] = RED
+                    self.left_rotate(grand_parent)
+
+        color[self.root] = BLACK
+
+    def transplant(self, u_node, v_node):
+        parent = self.parent
+
+        u_parent = parent[u_node]
+        if u_parent == 0:
+            self.root = v_node
+        elif u_node == self.left[u_parent]:
+            self.left[u_parent] = v_node
+        else:
+            self.right[u_parent] = v_node
+
+        parent[v_node] = u_parent
+
+    def minimum(self, x_node):
+        left = self.left
+        while left[x_node] != 0:
+            x_node = left[x_node]
+        return x_node
+
+    def maximum(self, x_node):
+        right = self.right
+        while right[x_node] != 0:
+            x_node = right[x_node]
+        return x_node
+
+    def successor(self, x_node):
+        right, parent = self.right, self.parent
+        if right[x_node] != 0:
+            return self.minimum(right[x_node])
+        y_node = parent[x_node]
+        while y_node != 0 and x_node == right[y_node]:
+            x_node = y_node
+            y_node = parent[y_node]
+        return y_node
+
+    def lower_bound(self, val):
+        '''
+            Node of the first key >= val, or the dummy
+        '''
+        key, left, right = self.key, self.left, self.right
+        x_node = self.root
+        y_node = 0
+        while x_node != 0:
+            if key[x_node] < val:
+                x_node = right[x_node]
+            else:
+                y_node = x_node
+                x_node = left[x_node]
+        return y_node
+
+    def __node_range(self, lo=None, hi=None):
+        if lo is None:
+            x_node = self.minimum(self.root) if self.root != 0 else 0
+        else:
+            x_node = self.lower_bound(lo)
+        key = self.key
+        while x_node != 0 and (hi is None or key[x_node] < hi):
+            yield x_node
+            x_node = self.successor(x_node)
+
+    def keys(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi) in increasing order, generated lazily after an O(log n) seek.
+            None leaves that end of the range open.
+        '''
+        key = self.key
+        return (key[x_node] for x_node in self.__node_range(lo, hi))
+
+    def values(self, lo=None, hi=None):
+        '''
+            Values of the keys in [lo, hi), in key order
+        '''
+        value = self.value
+        return (value[x_node] for x_node in self.__node_range(lo, hi))
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi), in key order
+        '''
+        key, value = self.key, self.value
+        return ((key[x_node], value[x_node]) for x_node in self.__node_range(lo, hi))
+
+    def __iter__(self):
+        return self.keys()
+
+    def find(self, node, value):
+        key, left, right = self.key, self.left, self.right
+        while node != 0 and key[node] != value:
+            if value < key[node]:
+                node = left[node]
+            else:
+                node = right[node]
+
+        return node
+
+    def __contains__(self, val):
+        return self.find(self.root, val) != 0
+
+    def get(self, val, default=None):
+        x_node = self.find(self.root, val)
+        return self.value[x_node] if x_node != 0 else default
+
+    def upsert(self, val, value):
+        '''
+            Set the value of val, inserting it if it is not in the tree yet. Returns its node.
+        '''
+        x_node = self.find(self.root, val)
+        if x_node != 0:
+            self.value[x_node] = value
+        else:
+            x_node = self.create_node(val, value)
+            self.insert(x_node)
+        return x_node
+
+    def setdefault(self, val, default=None):
+        x_node = self.find(self.root, val)
+        if x_node == 0:
+            x_node = self.create_node(val, default)
+            self.insert(x_node)
+        return self.value[x_node]
+
+    def pop(self, val, *default):
+        '''
+            Delete val and return its value. Without a default, a missing key raises KeyError.
+        '''
+        x_node = self.find(self.root, val)
+        if x_node == 0:
+            if default:
+                return default[0]
+            raise KeyError(val)
+        value = self.value[x_node]
+        self.delete(x_node)
+        return value
+
+    def delete(self, z_node):
+        '''
+            Unlink z_node from the tree and free its slot
+        '''
+        if z_node == self.dummy:
+            raise ValueError('the dummy node cannot be deleted')
+        left, right, parent, color = self.left, self.right, self.parent, self.color
+        if color[z_node] == FREE:
+            raise ValueError('node ' + str(z_node) + ' is already free')
+        if z_node != self.root and parent[z_node] == 0:
+            raise ValueError('node ' + str(z_node) + ' is not in the tree')
+
+        original_color = color[z_node]
+        y_node = z_node
+
+        if left[z_node] == 0:
+            x_node = right[z_node]
+            self.transplant(z_node, x_node)
+        elif right[z_node] == 0:
+            x_node = left[z_node]
+            self.transplant(z_node, x_node)
+        else:
+            y_node = self.minimum(right[z_node])
+            original_color = color[y_node]
+            x_node = right[y_node]
+
+            if parent[y_node] == z_node:
+                parent[x_node] = y_node # necessary when x_node is the dummy node
+            else:
+                self.transplant(y_node, x_node)
+                right[y_node] = right[z_node]
+                parent[right[y_node]] = y_node
+            self.transplant(z_node, y_node)
+            left[y_node] = left[z_node]
+            parent[left[y_node]] = y_node
+            color[y_node] = color[z_node]
+
+        if original_color == BLACK:
+            self.delete_fixup(x_node)
+
+        self.__free(z_node)
+        self.n_keys -= 1
+        if self.debug:
+            self.validate()
+
+    def delete_fixup(self, x_node):
+        left, right, parent, color = self.left, self.right, self.parent, self.color
+
+        while x_node != self.root and color[x_node] == BLACK:
+            x_parent = parent[x_node]
+            if x_node == left[x_parent]:
+                w_node = right[x_parent]
+                # Case 1: x's sibling is Red
+                if color[w_node] == RED:
+                    color[w_node] = BLACK
+                    color[x_parent] = RED
+                    self.left_rotate(x_parent)
+                    w_node = right[x_parent]
+                # Case 2: x's siblings nodes are both black and w itself is black
+                if color[left[w_node]] == BLACK and color[right[w_node]] == BLACK:
+                    color[w_node] = RED
+                    x_node = x_parent
+                else:
+                    # Case 3: x's sibling w is black w.left = red and w.right = black
+                    if color[right[w_node]] == BLACK:
+                        color[left[w_node]] = BLACK
+                        color[w_node] = RED
+                        self.right_rotate(w_node)
+                        w_node = right[x_parent]
+                    # Case 4: x's sibling is black and w's right child is red
+                    color[w_node] = color[x_parent]
+                    color[x_parent] = BLACK
+                    color[right[w_node]] = BLACK
+                    self.left_rotate(x_parent)
+                    x_node = self.root
+            else:
+                w_node = left[x_parent]
+                # Case 1: x's sibling is Red
+                if color[w_node] == RED:
+                    color[w_node] = BLACK
+                    color[x_parent] = RED
+                    self.right_rotate(x_parent)
+                    w_node = left[x_parent]
+                # Case 2: x's siblings nodes are both black and w itself is black
+                if color[left[w_node]] == BLACK and color[right[w_node]] == BLACK:
+                    color[w_node] = RED
+                    x_node = x_parent
+                else:
+                    # Case 3: x's sibling w is black w.left = black and w.right = red
+                    if color[left[w_node]] == BLACK:
+                        color[right[w_node]] = BLACK
+                        color[w_node] = RED
+                        self.left_rotate(w_node)
+                        w_node = left[x_parent]
+                    # Case 4: x's sibling is black and w's left child is red
+                    color[w_node] = color[x_parent]
+                    color[x_parent] = BLACK
+                    color[left[w_node]] = BLACK
+                    self.right_rotate(x_parent)
+                    x_node = self.root
+
+        color[x_node] = BLACK
+
+    def validate(self):
+        '''
+            Check the red-black properties, the BST order, the parent pointers, len() and the free
+            list. Raises AssertionError (also under python -O) and returns the black height. O(n).
+        '''
+        if self.color[0] != BLACK or self.color[self.root] != BLACK:
+            raise AssertionError('root or leaves are not black')
+        if self.root != 0 and self.parent[self.root] != 0:
+            raise AssertionError('root has a parent')
+        bh, size = self.__validate(self.root, None, None)
+        if size != self.n_keys:
+            raise AssertionError('len is ' + str(self.n_keys) + ' but there are ' + str(size) + ' nodes')
+        n_free = 0
+        x_node = self.free
+        while x_node != 0:
+            n_free += 1
+            if n_free > len(self.key):
+                raise AssertionError('the free list loops')
+            if self.color[x_node] != FREE:
+                raise AssertionError('slot ' + str(x_node) + ' is on the free list but not free')
+            x_node = self.right[x_node]
+        if size + n_free + 1 != len(self.key):
+            raise AssertionError(str(size) + ' nodes and ' + str(n_free) + ' free slots but '
+                                 + str(len(self.key) - 1) + ' slots')
+        return bh
+
+    def __validate(self, x_node, lo, hi):
+        # (black height, number of nodes) of the subtree at x_node, keys must be in [lo, hi]
+        if x_node == 0:
+            return 1, 0
+        key, color = self.key[x_node], self.color[x_node]
+        if (lo is not None and key < lo) or (hi is not None and hi < key):
+            raise AssertionError('key ' + str(key) + ' out of order')
+        for child in (self.left[x_node], self.right[x_node]):
+            if child != 0:
+                if self.parent[child] != x_node:
+                    raise AssertionError('wrong parent at ' + str(self.key[child]))
+                if color == RED and self.color[child] == RED:
+                    raise AssertionError('red node ' + str(key) + ' has a red child')
+        l_bh, l_size = self.__validate(self.left[x_node], lo, key)
+        r_bh, r_size = self.__validate(self.right[x_node], key, hi)
+        if l_bh != r_bh:
+            raise AssertionError('black heights differ below ' + str(key))
+        return l_bh + (1 if color == BLACK else 0), l_size + r_size + 1
+
+
+if __name__ == "__main__":
+    rb_tree = Rb_tree()
+
+    x = random.sample(range(1, 100000), 10000)
+    for v in x:
+        rb_tree.insert(rb_tree.create_node(v))
+
+    odd = True
+    for v in x:
+        if odd == True:
+            node_del = rb_tree.find(rb_tree.root, v)
+            assert node_del != rb_tree.dummy
+            rb_tree.delete(node_del)
+            odd = False
+        else:
+            odd = True
+
+    rb_tree.validate()
+    print('nodes = ' + str(len(rb_tree.key) - 1) + ' bytes = ' + str(rb_tree.memory_usage()))
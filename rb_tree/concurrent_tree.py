@@ -0,0 +1,309 @@
+'''
+    Thread-safe trees: many reader threads, writes serialized.
+
+    LockedTree wraps the CLRS Rb_tree behind a reader-writer lock. Writes are queued and applied
+    in batches (commit), so the writer takes the write lock once per batch instead of once per
+    update and readers are blocked for fewer, longer intervals. Readers see the tree as of the
+    last commit; a batch becomes visible all at once.
+
+    SnapshotTree uses the persistent LLRB (persistent_ll_rb_tree.py). The writer updates its own
+    version and, at every commit, publishes a snapshot of it (O(1)) by assigning one attribute.
+    Readers take no lock at all: they read whichever snapshot is published, and nothing in a
+    published snapshot is ever modified again, so a reader can even iterate over it lazily while
+    the writer goes on.
+
+    In both, updates not committed yet are not visible to the other threads, but a thread reads
+    its own: LockedTree looks the key up in the updates the thread queued before the tree (its
+    reading() commits them first), SnapshotTree publishes a snapshot first if the thread wrote
+    since the last one.
+'''
+
+import contextlib
+import threading
+
+try:
+    from threading import get_ident
+except ImportError:
+    from thread import get_ident
+
+import rb_tree
+import persistent_ll_rb_tree
+
+class RWLock():
+    '''
+        Reader-writer lock. A waiting writer blocks new readers, so writers do not starve.
+
+        The read side is reentrant: a thread that already reads takes it again at once, even with
+        writers waiting. The write side is not, and a thread cannot read while it writes nor
+        write while it reads: that raises RuntimeError instead of deadlocking.
+    '''
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        # the writer waits on drained for the readers to leave, readers wait on cond
+        self.drained = threading.Condition(self.cond)
+        # Idea: with no writer around, a reader takes no lock at all. It appends its thread id
+        # to active and then looks at writers, a writer counts itself in writers (under cond)
+        # and then looks at active. list.append/remove are atomic under the GIL, so either the
+        # reader sees the writer and backs off, or the writer sees the reader and waits for it.
+        # active also tells which threads read, so the reentrancy checks cost nothing until a
+        # writer shows up.
+        self.active = []
+        # writers waiting or writing, changed under cond only
+        self.writers = 0
+        # thread id of the writer, set when it is next in line
+        self.writer = None
+
+    def acquire_read(self):
+        me = get_ident()
+        self.active.append(me)
+        if self.writers:
+            self.__wait_read(me)
+
+    def __wait_read(self, me):
+        if self.writer == me:
+            self.active.remove(me)
+            raise RuntimeError('read lock requested by the thread holding the write lock')
+        if self.active.count(me) > 1:
+            # this thread reads already, the writer waits for it anyway
+            return
+        self.active.remove(me)
+        with self.cond:
+            # the writer may be waiting for this thread to leave active
+            if not self.active:
+                self.drained.notify()
+            while self.writers:
+                self.cond.wait()
+            self.active.append(me)
+
+    def release_read(self):
+        active = self.active
+        active.remove(get_ident())
+        if self.writers and not active:
+            with self.cond:
+                self.drained.notify()
+
+    def acquire_write(self):
+        me = get_ident()
+        if me in self.active:
+            raise RuntimeError('write lock requested by a thread holding the read lock')
+        with self.cond:
+            if self.writer == me:
+                raise RuntimeError('write lock requested again by the thread holding it')
+            self.writers += 1
+            while self.writer is not None:
+                self.cond.wait()
+            # claimed: the next writer waits on cond, this one for the readers to leave
+            self.writer = me
+            while self.active:
+                self.drained.wait()
+
+    def release_write(self):
+        with self.cond:
+            self.writer = None
+            self.writers -= 1
+            self.cond.notify_all()
+
+    @contextlib.contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class LockedTree():
+    def __init__(self, batch_size=64, **options):
+        '''
+            batch_size: queued updates that trigger a commit, options go to the Rb_tree
+        '''
+        self.tree = rb_tree.Rb_tree(**options)
+        self.lock = RWLock()
+        self.batch_size = batch_size
+        # (key, value, delete) in order, guarded by queue_lock
+        self.pending = []
+        self.queue_lock = threading.Lock()
+        # {thread id: {key: (value, delete)}}, the last update of each key queued by each thread
+        self.queued = {}
+
+    def upsert(self, key, value):
+        self.__queue(key, value, False)
+
+    def delete(self, key):
+        self.__queue(key, None, True)
+
+    def __queue(self, key, value, delete):
+        with self.queue_lock:
+            self.pending.append((key, value, delete))
+            self.queued.setdefault(get_ident(), {})[key] = (value, delete)
+            if len(self.pending) >= self.batch_size:
+                self.__commit()
+
+    def __own(self):
+        # the updates queued by this thread and not committed yet. Only this thread writes to
+        # that dict and __commit replaces queued instead of clearing it, so no lock is needed; if
+        # a commit applies them meanwhile, the tree holds them anyway. Nothing queued is the
+        # common case for a reader, and costs one test.
+        queued = self.queued
+        return queued.get(get_ident()) if queued else None
+
+    def commit(self):
+        '''
+            Apply the queued updates, readers see them all at once
+        '''
+        with self.queue_lock:
+            self.__commit()
+
+    def __commit(self):
+        if not self.pending:
+            return
+        with self.lock.writing():
+            tree = self.tree
+            for key, value, delete in self.pending:
+                if delete:
+                    tree.pop(key, None)
+                else:
+                    tree.upsert(key, value)
+        self.pending = []
+        self.queued = {}
+
+    def get(self, key, default=None):
+        own = self.__own()
+        if own and key in own:
+            value, delete = own[key]
+            return default if delete else value
+        lock = self.lock
+        lock.acquire_read()
+        try:
+            return self.tree.get(key, default)
+        finally:
+            lock.release_read()
+
+    def __contains__(self, key):
+        own = self.__own()
+        if own and key in own:
+            return not own[key][1]
+        lock = self.lock
+        lock.acquire_read()
+        try:
+            return key in self.tree
+        finally:
+            lock.release_read()
+
+    def __len__(self):
+        own = self.__own()
+        with self.lock.reading():
+            n = len(self.tree)
+            for key, (value, delete) in (own or {}).items():
+                if delete == (key in self.tree):
+                    n += -1 if delete else 1
+            return n
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi), as a list taken under the read lock
+        '''
+        own = self.__own()
+        with self.lock.reading():
+            items = list(self.tree.items(lo, hi))
+        own = dict((key, update) for key, update in (own or {}).items()
+                   if (lo is None or not key < lo) and (hi is None or key < hi))
+        if not own:
+            return items
+        merged = dict(items)
+        for key, (value, delete) in own.items():
+            if delete:
+                merged.pop(key, None)
+            else:
+                merged[key] = value
+        return sorted(merged.items(), key=lambda item: item[0])
+
+    @contextlib.contextmanager
+    def reading(self):
+        '''
+            The tree itself, to run several reads on the same version. The updates this thread
+            queued are committed first.
+        '''
+        if self.__own():
+            self.commit()
+        with self.lock.reading():
+            yield self.tree
+
+class SnapshotTree():
+    def __init__(self, batch_size=64, **options):
+        '''
+            batch_size: updates between two published snapshots, options go to the tree
+        '''
+        self.tree = persistent_ll_rb_tree.Rb_tree(**options)
+        self.batch_size = batch_size
+        self.n_pending = 0
+        self.write_lock = threading.Lock()
+        self.current = self.tree.snapshot()
+        # ids of the threads that wrote since the last snapshot was published
+        self.writers = set()
+
+    def upsert(self, key, value):
+        with self.write_lock:
+            self.tree.upsert(key, value)
+            self.__written()
+
+    def delete(self, key):
+        with self.write_lock:
+            self.tree.pop(key, None)
+            self.__written()
+
+    def __written(self):
+        self.writers.add(get_ident())
+        self.n_pending += 1
+        if self.n_pending >= self.batch_size:
+            self.__commit()
+
+    def commit(self):
+        '''
+            Publish the current version to the readers
+        '''
+        with self.write_lock:
+            self.__commit()
+
+    def __commit(self):
+        if self.n_pending:
+            # a single attribute assignment, readers see the old version or the new one
+            self.current = self.tree.snapshot()
+            self.n_pending = 0
+            self.writers = set()
+
+    def snapshot(self):
+        '''
+            The published version: a read-only tree that never changes. A thread that wrote since
+            the last one publishes its writes first.
+        '''
+        writers = self.writers
+        if writers and get_ident() in writers:
+            self.commit()
+        return self.current
+
+    def get(self, key, default=None):
+        return self.snapshot().get(key, default)
+
+    def __contains__(self, key):
+        return key in self.snapshot()
+
+    def __len__(self):
+        return len(self.snapshot())
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi) of the published version, lazily
+        '''
+        return self.snapshot().items(lo, hi)
+
+    @contextlib.contextmanager
+    def reading(self):
+        yield self.snapshot()
@@ -0,0 +1,243 @@
+'''
+    Durable tree: a tree of rb_tree.py or ll_rb_tree.py kept in a directory as a snapshot (the
+    binary file of Rb_tree.dump, see tree_file.py) plus a write-ahead log of the updates made
+    since that snapshot.
+
+    Every upsert and delete is applied to the tree in memory and appended to the log. The log is
+    written and fsync'ed once per group of group_size updates (group commit): an update is
+    durable once commit() has returned, explicitly or because its group was full, and a crash
+    loses at most the updates of the group not committed yet. Each record carries its length and
+    a CRC32, so a record torn by a crash is recognized and dropped at recovery.
+
+    Files are numbered by generation: snapshot.<g>.rbt holds the tree as it was when wal.<g> was
+    started. Every checkpoint_every updates (or at checkpoint()), the log moves to generation g + 1
+    and the tree is dumped to snapshot.<g + 1>.rbt, written under a temporary name and renamed
+    once complete, after which the files of older generations are removed. Recovery loads the
+    newest snapshot and replays only the logs from its generation on, so it costs O(n) for the
+    snapshot plus the tail of the log, not the whole history.
+
+    Dumping the tree costs O(n). With an engine that has an O(1) snapshot() (the persistent LLRB,
+    persistent_ll_rb_tree.py), the dump of the frozen version runs in a background thread while
+    the updates go on to the new log; with the other trees it stalls the updates while it runs.
+
+    One thread at a time may call the methods of a DurableTree.
+'''
+
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+
+import rb_tree
+
+# payload length, CRC32 of the payload
+_RECORD = struct.Struct('<II')
+
+_UPSERT = 0
+_DELETE = 1
+
+# the files of the tree in its directory, anything else there is left alone
+_SNAPSHOT = re.compile(r'snapshot\.(\d+)\.rbt\Z')
+_SNAPSHOT_TMP = re.compile(r'snapshot\.(\d+)\.rbt\.tmp\Z')
+_LOG = re.compile(r'wal\.(\d+)\Z')
+
+def _fsync_path(path):
+    # fsync a file or a directory (making a rename durable) by name
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _records(data):
+    # (op, key, value) of every complete record of a log, and the length they take
+    offset = 0
+    records = []
+    while offset + _RECORD.size <= len(data):
+        length, crc = _RECORD.unpack_from(data, offset)
+        start = offset + _RECORD.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) & 0xffffffff != crc:
+            break
+        records.append(pickle.loads(payload))
+        offset = start + length
+    return records, offset
+
+class DurableTree():
+    def __init__(self, directory, engine=rb_tree.Rb_tree, group_size=64, checkpoint_every=100000,
+                 **options):
+        '''
+            directory: where the snapshots and logs live (created if needed), recovered if it
+                       holds some
+            engine: tree class, options go to its constructor
+            group_size: updates written and fsync'ed together
+            checkpoint_every: updates between two snapshots, None to only take them on demand
+        '''
+        self.directory = directory
+        self.engine = engine
+        self.options = options
+        self.group_size = group_size
+        self.checkpoint_every = checkpoint_every
+        # encoded records not written yet
+        self.pending = []
+        self.n_since_checkpoint = 0
+        self.checkpointer = None
+        # exception raised by the background checkpoint, raised again by wait()
+        self.error = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__recover()
+
+    def __snapshot_path(self, generation):
+        return os.path.join(self.directory, 'snapshot.%d.rbt' % generation)
+
+    def __log_path(self, generation):
+        return os.path.join(self.directory, 'wal.%d' % generation)
+
+    def __generations(self):
+        snapshots, logs = [], []
+        for name in os.listdir(self.directory):
+            snapshot, log = _SNAPSHOT.match(name), _LOG.match(name)
+            if _SNAPSHOT_TMP.match(name):
+                os.remove(os.path.join(self.directory, name))
+            elif snapshot:
+                snapshots.append(int(snapshot.group(1)))
+            elif log:
+                logs.append(int(log.group(1)))
+        return sorted(snapshots), sorted(logs)
+
+# Idea: a snapshot only appears under its final name once complete, so the newest one can be
+# trusted. The logs of its generation and the later ones (there is more than one only after a
+# crash in the middle of a checkpoint) hold the updates made since, in order. A torn record can
+# only be at the end of the last log: it is cut off before appending to that log again.
+    def __recover(self):
+        snapshots, logs = self.__generations()
+        base = snapshots[-1] if snapshots else 0
+        if snapshots:
+            self.tree = self.engine.load(self.__snapshot_path(base), **self.options)
+        else:
+            self.tree = self.engine(**self.options)
+        self.n_replayed = 0
+        self.generation = base
+        for generation in logs:
+            if generation < base:
+                continue
+            path = self.__log_path(generation)
+            with open(path, 'rb') as f:
+                data = f.read()
+            records, length = _records(data)
+            for op, key, value in records:
+                if op == _DELETE:
+                    self.tree.pop(key, None)
+                else:
+                    self.tree.upsert(key, value)
+            if length < len(data):
+                with open(path, 'r+b') as f:
+                    f.truncate(length)
+            self.n_replayed += len(records)
+            self.generation = generation
+        self.n_since_checkpoint = self.n_replayed
+        self.log = open(self.__log_path(self.generation), 'ab')
+
+    def upsert(self, key, value):
+        self.tree.upsert(key, value)
+        self.__append((_UPSERT, key, value))
+
+    def delete(self, key):
+        '''
+            Remove key, if present
+        '''
+        if key in self.tree:
+            self.tree.pop(key)
+            self.__append((_DELETE, key, None))
+
+    def __append(self, record):
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        self.pending.append(_RECORD.pack(len(payload), zlib.crc32(payload) & 0xffffffff))
+        self.pending.append(payload)
+        if len(self.pending) >= 2 * self.group_size:
+            self.commit()
+        self.n_since_checkpoint += 1
+        if self.checkpoint_every is not None and self.n_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def commit(self):
+        '''
+            Write and fsync the updates not committed yet: when it returns, they survive a crash
+        '''
+        if self.pending:
+            self.log.write(b''.join(self.pending))
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.pending = []
+
+    def checkpoint(self):
+        '''
+            Start a new log and take a snapshot of the tree, then drop the older files
+        '''
+        self.commit()
+        self.wait()
+        self.log.close()
+        self.generation += 1
+        self.log = open(self.__log_path(self.generation), 'ab')
+        _fsync_path(self.directory)
+        self.n_since_checkpoint = 0
+        if hasattr(self.tree, 'snapshot'):
+            self.checkpointer = threading.Thread(target=self.__write_snapshot,
+                                                 args=(self.tree.snapshot(), self.generation))
+            self.checkpointer.start()
+        else:
+            self.__dump(self.tree, self.generation)
+
+    def __write_snapshot(self, tree, generation):
+        try:
+            self.__dump(tree, generation)
+        except Exception as e:
+            self.error = e
+
+    def __dump(self, tree, generation):
+        path = self.__snapshot_path(generation)
+        tree.dump(path + '.tmp')
+        _fsync_path(path + '.tmp')
+        os.rename(path + '.tmp', path)
+        _fsync_path(self.directory)
+        for name in os.listdir(self.directory):
+            match = _SNAPSHOT.match(name) or _LOG.match(name)
+            if match and int(match.group(1)) < generation:
+                os.remove(os.path.join(self.directory, name))
+
+    def wait(self):
+        '''
+            Wait for the snapshot being written in the background, if any
+        '''
+        if self.checkpointer is not None:
+            self.checkpointer.join()
+            self.checkpointer = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        self.commit()
+        self.wait()
+        self.log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key, default=None):
+        return self.tree.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.tree
+
+    def __len__(self):
+        return len(self.tree)
+
+    def items(self, lo=None, hi=None):
+        return self.tree.items(lo, hi)
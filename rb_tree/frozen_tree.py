@@ -0,0 +1,158 @@
+'''
+    Frozen snapshot of a tree (Rb_tree.freeze in rb_tree.py and ll_rb_tree.py) for batches of
+    read-only lookups, answered with NumPy over whole arrays of queries instead of one Python
+    call per key. Needs numpy; the trees themselves do not.
+
+    FrozenTree holds the keys in key order in one contiguous array (keys), and the values in the
+    same order (values, an object array unless they are all numbers). Positions in these arrays
+    are what find_many returns, so values[positions] are the values found.
+
+    Two layouts for the binary searches:
+    - sorted: numpy.searchsorted on the sorted keys.
+    - eytzinger: the keys are also stored in BFS order (the children of position k at 2k and
+      2k + 1), so that the first steps of every search hit the same few cache lines. The search
+      descends one level for all the queries at once (log2(n) passes over the batch), then maps
+      the BFS position found back to the key order.
+
+    A snapshot never changes. updated() makes a new one from it: the rows of the keys written
+    since are dropped and the current rows of these keys merged in, in O(n) array operations
+    plus one tree lookup per key written, instead of walking the whole tree again.
+'''
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LAYOUTS = ('sorted', 'eytzinger')
+
+def _column(items):
+    # 1-d array of the items: numbers as they are, anything else as objects
+    items = list(items)
+    column = numpy.array(items) if items else numpy.array([], dtype=object)
+    if column.ndim != 1 or column.dtype.kind not in 'biuf':
+        column = numpy.empty(len(items), dtype=object)
+        column[:] = items
+    return column
+
+def _merged_type(a, b):
+    # dtype holding both arrays; an empty one (maybe an object array) does not count
+    if not len(a):
+        return b.dtype
+    if not len(b):
+        return a.dtype
+    return numpy.result_type(a, b)
+
+def _in_order(n):
+    # BFS positions (1 .. n) of the Eytzinger tree of n keys, in key order. In the perfect tree
+    # of the same height, in-order position j (1-based) is at BFS position
+    # (j >> (z + 1)) + 2 ** (height - 1 - z), z the trailing zeros of j; the tree of n keys is
+    # the first n positions of that one in BFS order.
+    height = n.bit_length()
+    j = numpy.arange(1, 2 ** height, dtype=numpy.int64)
+    z = numpy.zeros(len(j), dtype=numpy.int64)
+    rest = j.copy()
+    for level in range(height):
+        even = rest & 1 == 0
+        z += even
+        rest = numpy.where(even, rest >> 1, rest)
+    bfs = (j >> (z + 1)) + (numpy.int64(1) << (height - 1 - z))
+    return bfs[bfs <= n]
+
+class FrozenTree():
+    def __init__(self, keys, values, layout='sorted'):
+        '''
+            keys: keys in non-decreasing order, values: their values (iterables or arrays)
+            layout: 'sorted' or 'eytzinger', the array the searches run on
+        '''
+        if numpy is None:
+            raise ImportError('a frozen tree needs numpy')
+        if layout not in LAYOUTS:
+            raise ValueError('layout must be one of ' + ', '.join(LAYOUTS) + ', not ' + repr(layout))
+        self.layout = layout
+        self.keys = keys if isinstance(keys, numpy.ndarray) else _column(keys)
+        self.values = values if isinstance(values, numpy.ndarray) else _column(values)
+        if layout == 'eytzinger':
+            n = len(self.keys)
+            bfs = _in_order(n)
+            # BFS position -> key, position 0 unused
+            self.bfs_keys = numpy.empty(n + 1, dtype=self.keys.dtype)
+            self.bfs_keys[bfs] = self.keys
+            # BFS position -> position in key order; 0 stands for "after the last key"
+            self.bfs_rank = numpy.empty(n + 1, dtype=numpy.int64)
+            self.bfs_rank[bfs] = numpy.arange(n)
+            self.bfs_rank[0] = n
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __lower_bound(self, queries):
+        # position (in key order) of the first key >= each query
+        if self.layout == 'sorted':
+            return numpy.searchsorted(self.keys, queries, side='left')
+        n = len(self.keys)
+        bfs_keys = self.bfs_keys
+        k = numpy.ones(queries.shape, dtype=numpy.int64)
+        for level in range(n.bit_length()):
+            inside = k <= n
+            k = numpy.where(inside, 2 * k + (bfs_keys[numpy.where(inside, k, 1)] < queries), k)
+        # the lower bound is where the search last went left: drop the right turns (trailing
+        # ones) and that left turn
+        while True:
+            right = k & 1 == 1
+            if not right.any():
+                break
+            k = numpy.where(right, k >> 1, k)
+        return self.bfs_rank[k >> 1]
+
+    def find_many(self, queries):
+        '''
+            Position of each query in keys (the first one if repeated), -1 if it is not there
+        '''
+        queries = numpy.asarray(queries)
+        positions = self.__lower_bound(queries)
+        if not len(self.keys):
+            return numpy.full(queries.shape, -1, dtype=numpy.int64)
+        found = self.keys[numpy.minimum(positions, len(self.keys) - 1)] == queries
+        found &= positions < len(self.keys)
+        return numpy.where(found, positions, -1)
+
+    def rank_many(self, queries):
+        '''
+            Number of keys smaller than each query (as Rb_tree.rank)
+        '''
+        return self.__lower_bound(numpy.asarray(queries))
+
+    def range_mask(self, lo=None, hi=None):
+        '''
+            Boolean mask of the keys in [lo, hi), over keys and values. None leaves that end open.
+        '''
+        start = 0 if lo is None else self.rank_many([lo])[0]
+        stop = len(self.keys) if hi is None else self.rank_many([hi])[0]
+        mask = numpy.zeros(len(self.keys), dtype=bool)
+        mask[start:stop] = True
+        return mask
+
+    def updated(self, written, items, layout=None):
+        '''
+            New snapshot where the keys of written (sorted, distinct) have the (key, value) items
+            given (in key order, none for a key deleted) instead of their rows in this one
+        '''
+        kept = ~numpy.isin(self.keys, _column(written))
+        keys, values = self.keys[kept], self.values[kept]
+        if not items:
+            return FrozenTree(keys, values, layout or self.layout)
+        new_keys = _column(key for key, value in items)
+        new_values = _column(value for key, value in items)
+        n = len(keys) + len(new_keys)
+        # every new row lands after the kept keys smaller than it and the new rows before it
+        slots = numpy.searchsorted(keys, new_keys) + numpy.arange(len(new_keys))
+        others = numpy.ones(n, dtype=bool)
+        others[slots] = False
+        merged_keys = numpy.empty(n, dtype=_merged_type(keys, new_keys))
+        merged_keys[slots] = new_keys
+        merged_keys[others] = keys
+        merged_values = numpy.empty(n, dtype=_merged_type(values, new_values))
+        merged_values[slots] = new_values
+        merged_values[others] = values
+        return FrozenTree(merged_keys, merged_values, layout or self.layout)
@@ -0,0 +1,140 @@
+'''
+    Left-leaning RB tree that counts what it does, to find out why a workload is slow.
+
+    Opt-in: use this Rb_tree instead of the one of ll_rb_tree.py. The plain tree has no counter,
+    so it pays nothing for them but a call to its empty count_case hook on every fix_up case. This
+    one overrides that hook; the other methods count and call the originals, so inserts and
+    deletes run the same loops as the plain tree (or the recursion, with recursive = True).
+
+    stats() returns a snapshot as a plain dict (numbers and dicts of numbers, ready for a metrics
+    pipeline):
+    - fix_up_case_1..3: the three cases of fix_up, on the way back up from an insert or a delete:
+      1 rotate a right-leaning red link left, 2 rotate two reds in a row right, 3 split a 4-node
+      (flip its colors)
+    - left_rotations, right_rotations, flips, move_red_left, move_red_right: all the calls,
+      wherever they come from
+    - finds, find_comparisons, comparisons_per_find: key comparisons made by find (used by get,
+      pop, __contains__...)
+    - find_path_lengths, insert_path_lengths: histograms {nodes on the search path: count}
+    - height, black_height (walking the tree: O(n) for the height), n_keys
+'''
+
+import random
+
+import ll_rb_tree
+from ll_rb_tree import BLACK
+
+COUNTERS = ('fix_up_case_1', 'fix_up_case_2', 'fix_up_case_3',
+            'left_rotations', 'right_rotations', 'flips', 'move_red_left', 'move_red_right',
+            'finds', 'find_comparisons')
+
+class Rb_tree(ll_rb_tree.Rb_tree):
+    def __init__(self, order_statistics=False, monoid=None):
+        ll_rb_tree.Rb_tree.__init__(self, order_statistics, monoid)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.find_path_lengths = {}
+        self.insert_path_lengths = {}
+
+    def stats(self):
+        '''
+            Snapshot of the counters, with the current height and black height
+        '''
+        stats = dict(self.counters)
+        stats['comparisons_per_find'] = float(stats['find_comparisons']) / stats['finds'] if stats['finds'] else 0.0
+        stats['find_path_lengths'] = dict(self.find_path_lengths)
+        stats['insert_path_lengths'] = dict(self.insert_path_lengths)
+        stats['height'] = self.height()
+        stats['black_height'] = self.black_height()
+        stats['n_keys'] = len(self)
+        return stats
+
+    def height(self):
+        '''
+            Nodes on the longest path from the root to a leaf
+        '''
+        height = 0
+        stack = [(self.root, 1)] if self.root != None else []
+        while stack:
+            h, depth = stack.pop()
+            height = max(height, depth)
+            for child in (h.left, h.right):
+                if child != None:
+                    stack.append((child, depth + 1))
+        return height
+
+    def black_height(self):
+        '''
+            Black nodes on any path from the root to a leaf, the leaf included (as validate())
+        '''
+        bh = 1
+        h = self.root
+        while h != None:
+            if h.color == BLACK:
+                bh += 1
+            h = h.left
+        return bh
+
+    def rotate_left(self, h):
+        self.counters['left_rotations'] += 1
+        return ll_rb_tree.Rb_tree.rotate_left(self, h)
+
+    def rotate_right(self, h):
+        self.counters['right_rotations'] += 1
+        return ll_rb_tree.Rb_tree.rotate_right(self, h)
+
+    def flip_colors(self, h):
+        self.counters['flips'] += 1
+        ll_rb_tree.Rb_tree.flip_colors(self, h)
+
+    def move_red_left(self, h):
+        self.counters['move_red_left'] += 1
+        return ll_rb_tree.Rb_tree.move_red_left(self, h)
+
+    def move_red_right(self, h):
+        self.counters['move_red_right'] += 1
+        return ll_rb_tree.Rb_tree.move_red_right(self, h)
+
+    def count_case(self, case):
+        self.counters[case] += 1
+
+    def __search(self, key):
+        # (nodes visited, key comparisons) of a search for key from the root, as find does it:
+        # one comparison for equality per node and one more to go down
+        length = 0
+        h = self.root
+        while h != None:
+            length += 1
+            if h.key == key:
+                return length, 2 * length - 1
+            if key < h.key:
+                h = h.left
+            else:
+                h = h.right
+        return length, 2 * length
+
+    def find(self, key):
+        length, comparisons = self.__search(key)
+        self.counters['finds'] += 1
+        self.counters['find_comparisons'] += comparisons
+        self.find_path_lengths[length] = self.find_path_lengths.get(length, 0) + 1
+        return ll_rb_tree.Rb_tree.find(self, key)
+
+    def insert(self, key, value=None):
+        # the insert goes down the same path before changing anything
+        length = self.__search(key)[0]
+        self.insert_path_lengths[length] = self.insert_path_lengths.get(length, 0) + 1
+        ll_rb_tree.Rb_tree.insert(self, key, value)
+
+
+if __name__ == "__main__":
+    for name, keys in (('sorted', range(100000)), ('random', random.sample(range(100000), 100000))):
+        tree = Rb_tree()
+        for k in keys:
+            tree.upsert(k, None)
+        for k in keys[::2]:
+            tree.pop(k)
+        stats = tree.stats()
+        print(name + ' ' + ' '.join('%s = %s' % (key, stats[key]) for key in sorted(stats) if not key.endswith('lengths')))
@@ -0,0 +1,129 @@
+'''
+    RB tree a la CLRS that counts what it does, to find out why a workload is slow.
+
+    Opt-in: use this Rb_tree instead of the one of rb_tree.py. The plain tree has no counter, so
+    it pays nothing for them but a call to its empty count_case hook on every fixup case (a few per
+    insert or delete). This one overrides that hook; the rotations, find and insert_fixup count
+    and call the originals, so the tree runs the same code as the plain one.
+
+    stats() returns a snapshot as a plain dict (numbers and dicts of numbers, ready for a metrics
+    pipeline):
+    - insert_case_1..3, delete_case_1..4: how many times each case of the fixups ran. A
+      delete_case_2 is one step of delete_fixup up the tree.
+    - left_rotations, right_rotations
+    - finds, find_comparisons, comparisons_per_find: key comparisons made by find (used by get,
+      upsert, pop...)
+    - find_path_lengths, insert_path_lengths: histograms {nodes on the search path: count}
+    - height, black_height (walking the tree: O(n) for the height), n_keys
+'''
+
+import random
+
+import rb_tree
+from rb_tree import BLACK
+
+COUNTERS = ('insert_case_1', 'insert_case_2', 'insert_case_3',
+            'delete_case_1', 'delete_case_2', 'delete_case_3', 'delete_case_4',
+            'left_rotations', 'right_rotations', 'finds', 'find_comparisons')
+
+class Rb_tree(rb_tree.Rb_tree):
+    def __init__(self, order_statistics=False, monoid=None):
+        rb_tree.Rb_tree.__init__(self, order_statistics, monoid)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.find_path_lengths = {}
+        self.insert_path_lengths = {}
+
+    def stats(self):
+        '''
+            Snapshot of the counters, with the current height and black height
+        '''
+        stats = dict(self.counters)
+        stats['comparisons_per_find'] = float(stats['find_comparisons']) / stats['finds'] if stats['finds'] else 0.0
+        stats['find_path_lengths'] = dict(self.find_path_lengths)
+        stats['insert_path_lengths'] = dict(self.insert_path_lengths)
+        stats['height'] = self.height()
+        stats['black_height'] = self.black_height()
+        stats['n_keys'] = len(self)
+        return stats
+
+    def height(self):
+        '''
+            Nodes on the longest path from the root to a leaf
+        '''
+        height = 0
+        stack = [(self.root, 1)] if self.root != self.dummy else []
+        while stack:
+            x_node, depth = stack.pop()
+            height = max(height, depth)
+            for child in (x_node.left, x_node.right):
+                if child != self.dummy:
+                    stack.append((child, depth + 1))
+        return height
+
+    def black_height(self):
+        '''
+            Black nodes on any path from the root to a leaf, the leaf included (as validate())
+        '''
+        bh = 1
+        x_node = self.root
+        while x_node != self.dummy:
+            if x_node.color == BLACK:
+                bh += 1
+            x_node = x_node.left
+        return bh
+
+    def left_rotate(self, x_node):
+        self.counters['left_rotations'] += 1
+        rb_tree.Rb_tree.left_rotate(self, x_node)
+
+    def right_rotate(self, x_node):
+        self.counters['right_rotations'] += 1
+        rb_tree.Rb_tree.right_rotate(self, x_node)
+
+    def count_case(self, case):
+        self.counters[case] += 1
+
+    def __search(self, node, value):
+        # (nodes visited, key comparisons) of find(node, value), which does one comparison for
+        # equality per node and one more to go down
+        length = 0
+        while node != self.dummy:
+            length += 1
+            if node.key == value:
+                return length, 2 * length - 1
+            if value < node.key:
+                node = node.left
+            else:
+                node = node.right
+        return length, 2 * length
+
+    def find(self, node, value):
+        length, comparisons = self.__search(node, value)
+        self.counters['finds'] += 1
+        self.counters['find_comparisons'] += comparisons
+        self.find_path_lengths[length] = self.find_path_lengths.get(length, 0) + 1
+        return rb_tree.Rb_tree.find(self, node, value)
+
+    def insert_fixup(self, z_node):
+        # z_node was just linked as a leaf: its depth is the length of the insert search path
+        length = 0
+        x_node = z_node
+        while x_node != self.dummy:
+            length += 1
+            x_node = x_node.parent
+        self.insert_path_lengths[length] = self.insert_path_lengths.get(length, 0) + 1
+        return rb_tree.Rb_tree.insert_fixup(self, z_node)
+
+
+if __name__ == "__main__":
+    for name, keys in (('sorted', range(100000)), ('random', random.sample(range(100000), 100000))):
+        tree = Rb_tree()
+        for k in keys:
+            tree.upsert(k, None)
+        for k in keys[::2]:
+            tree.pop(k)
+        stats = tree.stats()
+        print(name + ' ' + ' '.join('%s = %s' % (key, stats[key]) for key in sorted(stats) if not key.endswith('lengths')))
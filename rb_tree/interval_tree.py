@@ -0,0 +1,127 @@
+'''
+    Interval tree on top of the CLRS RB tree (CLRS 14.3).
+
+    A node holds the closed interval [key, high], keyed by its low endpoint (equal lows are
+    allowed), and max_high, the largest high endpoint in its subtree. max_high is computed from the
+    node and its two children only, so it is kept up to date by the update() hook that the RB tree
+    already calls wherever the shape of the tree changes: the rotations (so insert_fixup and
+    delete_fixup), the insert path, delete (after transplant) and split/join. The tree therefore
+    always runs with order_statistics, and rank/select work too. Like find, the set operations
+    (union, intersection, difference) only compare keys, i.e. low endpoints.
+
+    overlap(lo, hi) and stab(t) are lazy: they walk the tree in key order, skipping the subtrees
+    whose max_high is below lo and stopping at the first low endpoint above hi. The first result
+    comes after O(log n) steps. The results starting in [lo, hi] all overlap and make one run of
+    the walk, O(1) each. The s results starting before lo (the intervals that contain lo) can be
+    scattered in key order, and every node visited is a result or an ancestor of one, so they
+    cost O(log(n / s)) each: a query with k results is O(log n + k + s log(n / s)) at worst, and
+    stab(t) is O(log n + k log(n / k)). That is as far as max_high goes; O(log n + k) for any
+    stabbing query takes another structure (a priority search tree).
+'''
+
+import random
+
+import rb_tree
+
+class Node(rb_tree.Node):
+    __slots__ = ('high', 'max_high')
+
+    def __init__(self, key, value=None, high=None):
+        rb_tree.Node.__init__(self, key, value)
+        self.high = key if high is None else high
+        self.max_high = self.high
+
+class Rb_tree(rb_tree.Rb_tree):
+    def __init__(self):
+        rb_tree.Rb_tree.__init__(self, order_statistics=True)
+
+    def create_node(self, val, value=None, high=None):
+        '''
+            Node for the interval [val, high] ([val, val] without high)
+        '''
+        x_node = Node(val, value, high)
+        x_node.parent = self.dummy
+        x_node.left = self.dummy
+        x_node.right = self.dummy
+        return x_node
+
+    def update(self, x_node):
+        rb_tree.Rb_tree.update(self, x_node)
+        max_high = x_node.high
+        if x_node.left != self.dummy and x_node.left.max_high > max_high:
+            max_high = x_node.left.max_high
+        if x_node.right != self.dummy and x_node.right.max_high > max_high:
+            max_high = x_node.right.max_high
+        x_node.max_high = max_high
+
+    def overlap(self, lo, hi):
+        '''
+            Nodes whose interval intersects [lo, hi], lazily and in order of low endpoint
+        '''
+        dummy = self.dummy
+        stack = []
+        x_node = self.root
+        while True:
+            while x_node != dummy and x_node.max_high >= lo:
+                stack.append(x_node)
+                x_node = x_node.left
+            if not stack:
+                return
+            x_node = stack.pop()
+            # everything left to visit starts at x_node.key or later
+            if x_node.key > hi:
+                return
+            if x_node.high >= lo:
+                yield x_node
+            x_node = x_node.right
+
+    def stab(self, t):
+        '''
+            Nodes whose interval contains t, lazily
+        '''
+        return self.overlap(t, t)
+
+    def find_interval(self, low, high):
+        '''
+            A node holding [low, high], or the dummy
+        '''
+        for x_node in self.overlap(low, low):
+            if x_node.key == low and x_node.high == high:
+                return x_node
+        return self.dummy
+
+    def validate(self):
+        '''
+            RB tree checks plus max_high of every node
+        '''
+        bh = rb_tree.Rb_tree.validate(self)
+        stack = [self.root] if self.root != self.dummy else []
+        while stack:
+            x_node = stack.pop()
+            max_high = x_node.high
+            for child in (x_node.left, x_node.right):
+                if child != self.dummy:
+                    max_high = max(max_high, child.max_high)
+                    stack.append(child)
+            if x_node.max_high != max_high:
+                raise AssertionError('wrong max_high at ' + str(x_node.key))
+        return bh
+
+
+if __name__ == "__main__":
+    tree = Rb_tree()
+
+    intervals = []
+    for i in range(10000):
+        low = random.randrange(1000000)
+        intervals.append((low, low + random.randrange(1000)))
+    for low, high in intervals:
+        tree.insert(tree.create_node(low, None, high))
+    for low, high in intervals[::2]:
+        tree.delete(tree.find_interval(low, high))
+    tree.validate()
+
+    lo, hi = 500000, 501000
+    found = sorted((x_node.key, x_node.high) for x_node in tree.overlap(lo, hi))
+    assert found == sorted((l, h) for l, h in intervals[1::2] if l <= hi and h >= lo)
+    print('intervals = ' + str(len(tree)) + ' overlapping [' + str(lo) + ', ' + str(hi) + '] = ' + str(len(found)))
@@ -1,123 +1,732 @@
 '''
     Left-leaning RB tree. Implemented according to the LLRB paper from Sedgewick.
 '''
-import pdb
 import random
 
-class Node:
-    def __init__(self,key):
+import frozen_tree
+import tree_file
+
+RED = True
+BLACK = False
+
+class Node(object):
+    __slots__ = ('key', 'value', 'left', 'right', 'color', 'size', 'agg')
+
+    def __init__(self,key,value=None):
         self.key = key
+        self.value = value
         self.left = None
         self.right = None
-        self.color = 'Red'
+        self.color = RED
+        self.size = 1
+        self.agg = None
+
+class Cursor:
+    '''
+        Position between two keys of the tree. next() returns the key after the position and
+        moves forward, prev() the key before it and moves back, both raising StopIteration at
+        the ends. LLRB nodes have no parent pointer, so the cursor keeps the path from the root
+        to the node after the position (empty at the end); each step is O(1) amortized. Any
+        insert or delete in the tree invalidates the cursor.
+    '''
+    def __init__(self, tree, path):
+        self.tree = tree
+        self.path = path
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        path = self.path
+        if not path:
+            raise StopIteration
+        h = path[-1]
+        if h.right != None:
+            x = h.right
+            while x != None:
+                path.append(x)
+                x = x.left
+        else:
+            # climb while coming from a right child
+            x = path.pop()
+            while path and path[-1].right is x:
+                x = path.pop()
+        return h.key
+
+    __next__ = next
+
+    def prev(self):
+        path = self.path
+        if not path:
+            x = self.tree.root
+            if x == None:
+                raise StopIteration
+            while x != None:
+                path.append(x)
+                x = x.right
+            return path[-1].key
+
+        h = path[-1]
+        if h.left != None:
+            x = h.left
+            while x != None:
+                path.append(x)
+                x = x.right
+        else:
+            # climb while coming from a left child, without losing the position at the minimum
+            i = len(path) - 1
+            while i > 0 and path[i - 1].left is path[i]:
+                i -= 1
+            if i == 0:
+                raise StopIteration
+            del path[i:]
+        return path[-1].key
 
 class Rb_tree:
-    def __init__(self):
+    # check every invariant (validate) after each insert and delete
+    debug = False
+    # run insert and delete through the recursive insert_fixup, delete_fixup and delete_min,
+    # which subclasses can hook into (the default loops give the same trees, faster)
+    recursive = False
+
+    def __init__(self, order_statistics=False, monoid=None):
+        '''
+            order_statistics: maintain node.size (number of nodes in the subtree) for rank/select
+            monoid: object with combine(a, b), identity and measure(key, value) (see monoid.py),
+                    node.agg is then the combination of the measures of its subtree, in key order,
+                    for aggregate(). Implies order_statistics.
+        '''
         self.root = None
+        self.n_keys = 0
+        self.order_statistics = order_statistics or monoid is not None
+        self.monoid = monoid
+        # nodes of the smallest and biggest keys, None until peek_min / peek_max look for them
+        self.min_node = None
+        self.max_node = None
+        # snapshot of freeze(), and the keys written since (None: it must walk the whole tree)
+        self.frozen = None
+        self.written = None
+
+    def __len__(self):
+        return self.n_keys
 
     def rotate_left(self,h):
-        assert h != None
-        assert h.right != None
         x = h.right
         h.right = x.left
         x.left = h
         x.color = h.color
-        h.color = 'Red'
+        h.color = RED
+        if self.order_statistics:
+            self.update(h)
+            self.update(x)
         return x
 
     def rotate_right(self,h):
-        assert h != None
-        assert h.left != None
         x = h.left
         h.left = x.right
         x.right = h
         x.color = h.color
-        h.color = 'Red'
+        h.color = RED
+        if self.order_statistics:
+            self.update(h)
+            self.update(x)
         return x
 
     def flip_colors(self, h):
-        h.color = 'Black' if h.color == 'Red' else 'Red'
-        h.left.color = 'Black' if h.left.color == 'Red' else 'Red'
-        h.right.color = 'Black' if h.right.color == 'Red' else 'Red'
+        h.color = not h.color
+        h.left.color = not h.left.color
+        h.right.color = not h.right.color
 
-    def create_node(self,key):
-        x_node = Node(key)
+    def create_node(self,key,value=None):
+        x_node = Node(key,value)
         return x_node
-    
+
+# Idea: build the 2-3 tree that the LLRB encodes directly. A 2-3 tree whose leaves are all at
+# black height b holds between 2^b - 1 and 3^b - 1 keys, so pick the smallest b with 3^b - 1 >= n
+# and, at every level, use a 2-node (black) or a 3-node (black with a red left child) depending on
+# whether the keys fit in two or need three subtrees of height b - 1. Keys are consumed in order,
+# so the input is only read once and no rotation or color flip is ever needed.
+    @classmethod
+    def from_sorted(cls, keys, **options):
+        '''
+            Build a tree from keys in strictly increasing order in O(n). Keys without a len()
+            are first materialized in a list. Options are passed to the constructor.
+        '''
+        tree = cls(**options)
+        if not hasattr(keys, '__len__'):
+            keys = list(keys)
+        tree.__load_sorted((tree.create_node(key) for key in keys), len(keys))
+        return tree
+
+    def __load_sorted(self, nodes, n):
+        # Replace the content of the tree with the n nodes given in key order (they are relinked)
+        self.n_keys = n
+        self.min_node = self.max_node = None
+        self.written = None
+        height = 0
+        while 3 ** height - 1 < n:
+            height += 1
+        self.root = self.__build_sorted(iter(nodes), n, height, [None])
+
+    def __next_sorted(self, nodes, last):
+        h = next(nodes)
+        if last[0] is not None and h.key <= last[0]:
+            raise ValueError('keys are not strictly increasing: ' + str(h.key) + ' after ' + str(last[0]))
+        last[0] = h.key
+        return h
+
+    def __build_sorted(self, keys, n, height, last):
+        if height == 0:
+            return None
+
+        # largest number of keys a subtree of height - 1 can hold
+        cap = 3 ** (height - 1) - 1
+        if n <= 2 * cap + 1:
+            # 2-node
+            n_left = (n - 1) // 2
+            left = self.__build_sorted(keys, n_left, height - 1, last)
+            h = self.__next_sorted(keys, last)
+            h.left = left
+            h.right = self.__build_sorted(keys, n - 1 - n_left, height - 1, last)
+        else:
+            # 3-node: red left child l, with subtrees a < l < b < h < c
+            n_a = (n - 2) // 3
+            n_b = (n - 2 - n_a) // 2
+            a = self.__build_sorted(keys, n_a, height - 1, last)
+            l = self.__next_sorted(keys, last)
+            l.color = RED
+            l.left = a
+            l.right = self.__build_sorted(keys, n_b, height - 1, last)
+            if self.order_statistics:
+                self.update(l)
+            h = self.__next_sorted(keys, last)
+            h.left = l
+            h.right = self.__build_sorted(keys, n - 2 - n_a - n_b, height - 1, last)
+        h.color = BLACK
+        if self.order_statistics:
+            self.update(h)
+        return h
+
+# Idea: reuse the shape stored in the file (tree_file.py) and relink the nodes in O(n). A file
+# written by the CLRS tree may have right-leaning red links, its keys are in order though, so the
+# tree is then rebuilt from them by __load_sorted, still in O(n).
+    def dump(self, path):
+        '''
+            Write the keys, values and shape of the tree to path (format in tree_file.py)
+        '''
+        tree_file.dump(path, self.root, None, True)
+
+    @classmethod
+    def load(cls, path, mmap=False, **options):
+        '''
+            Tree written by dump(), in O(n). With mmap, a read-only tree_file.MappedTree that
+            reads the file in place instead, opened in O(1). Options are passed to the constructor.
+        '''
+        if mmap:
+            return tree_file.MappedTree(path)
+        tree = cls(**options)
+        keys, values, colors, lefts, rights, root, left_leaning = tree_file.read(path)
+        nodes = [tree.create_node(key, value) for key, value in zip(keys, values)]
+        if left_leaning:
+            tree.__load_columns(nodes, colors, lefts, rights, root)
+        else:
+            tree.__load_sorted(nodes, len(nodes))
+        if tree.debug:
+            tree.validate()
+        return tree
+
+# Idea: as in rb_tree.py, freeze() keeps its snapshot and every write records its key, so that the
+# next freeze() only has to look up the keys written and merge them into the previous arrays.
+# The writes stop being recorded once they reach freeze_ratio of the tree.
+    freeze_ratio = 0.1
+
+    def freeze(self, layout='sorted'):
+        '''
+            Read-only snapshot of the keys and values for vectorized batch lookups
+            (frozen_tree.FrozenTree, needs numpy). Writing to the tree does not change it; calling
+            freeze() again returns it as it is if nothing was written since, else a new one.
+        '''
+        if (self.frozen is None or self.written is None or self.frozen.layout != layout
+                or len(self.written) >= self.freeze_ratio * self.n_keys):
+            self.frozen = frozen_tree.FrozenTree(self.keys(), self.values(), layout)
+        elif self.written:
+            written = sorted(self.written)
+            items = []
+            for key in written:
+                h = self.find(key)
+                if h != None:
+                    items.append((key, h.value))
+            self.frozen = self.frozen.updated(written, items)
+        self.written = set()
+        return self.frozen
+
+    def __record(self, key):
+        # key written since freeze(): once that makes freeze_ratio of the tree, the next freeze()
+        # walks the whole tree anyway, so stop recording
+        written = self.written
+        written.add(key)
+        if len(written) >= self.freeze_ratio * self.n_keys:
+            self.written = None
+
+    def __load_columns(self, nodes, colors, lefts, rights, root):
+        for h, color, left, right in zip(nodes, colors, lefts, rights):
+            h.color = RED if color else BLACK
+            if left >= 0:
+                h.left = nodes[left]
+            if right >= 0:
+                h.right = nodes[right]
+        self.n_keys = len(nodes)
+        self.min_node = self.max_node = None
+        self.written = None
+        self.root = nodes[root] if nodes else None
+        if self.order_statistics:
+            # parents come before their children in a pre-order walk, update in reverse
+            order = []
+            stack = [self.root] if nodes else []
+            while stack:
+                h = stack.pop()
+                order.append(h)
+                if h.left != None:
+                    stack.append(h.left)
+                if h.right != None:
+                    stack.append(h.right)
+            for h in reversed(order):
+                self.update(h)
+
+    def count_case(self, case):
+        '''
+            Called on every case of fix_up ('fix_up_case_1'..3), wherever it runs (fix_up or the
+            loops of insert and delete). Does nothing: instrumented_ll_rb_tree.py counts them.
+        '''
+
     def fix_up(self,h):
-        if (h.right!=None and h.right.color=='Red') and (h.left==None or h.left.color=='Black'):
+        if (h.right!=None and h.right.color==RED) and (h.left==None or h.left.color==BLACK):
+            self.count_case('fix_up_case_1')
             h = self.rotate_left(h)
-        if (h.left!=None and h.left.color=='Red') and (h.left!=None and h.left.left!=None and h.left.left.color=='Red'):
+        if (h.left!=None and h.left.color==RED) and (h.left!=None and h.left.left!=None and h.left.left.color==RED):
+            self.count_case('fix_up_case_2')
             h = self.rotate_right(h)
-        if (h.left!=None and h.left.color=='Red') and (h.right!=None and h.right.color=='Red'):
+        if (h.left!=None and h.left.color==RED) and (h.right!=None and h.right.color==RED):
+            self.count_case('fix_up_case_3')
             self.flip_colors(h)
+        if self.order_statistics:
+            self.update(h)
         return h
 
-    def insert(self,key):
-        self.root = self.insert_fixup(self.root,key)
-        self.root.color = 'Black'
+    def update(self, h):
+        h.size = 1 + (h.left.size if h.left != None else 0) + (h.right.size if h.right != None else 0)
+        monoid = self.monoid
+        if monoid is not None:
+            agg = monoid.measure(h.key, h.value)
+            if h.left != None:
+                agg = monoid.combine(h.left.agg, agg)
+            if h.right != None:
+                agg = monoid.combine(agg, h.right.agg)
+            h.agg = agg
+
+    def rank(self, key):
+        '''
+            Number of keys smaller than key, in O(log n)
+        '''
+        assert self.order_statistics
+        r = 0
+        h = self.root
+        while h != None:
+            if h.key < key:
+                r += 1 + (h.left.size if h.left != None else 0)
+                h = h.right
+            else:
+                h = h.left
+        return r
+
+    def select(self, k):
+        '''
+            k-th smallest key (from 0), in O(log n)
+        '''
+        assert self.order_statistics
+        if k < 0 or self.root == None or k >= self.root.size:
+            raise IndexError('select index out of range')
+        h = self.root
+        while True:
+            left_size = h.left.size if h.left != None else 0
+            if k < left_size:
+                h = h.left
+            elif k == left_size:
+                return h.key
+            else:
+                k -= left_size + 1
+                h = h.right
 
-    def insert_fixup(self,h,key):
+    def count_range(self, lo, hi):
+        '''
+            Number of keys in [lo, hi), in O(log n)
+        '''
+        if hi <= lo:
+            return 0
+        return self.rank(hi) - self.rank(lo)
 
+# Idea: as in the CLRS tree, go down to the node where the searches for lo and hi split, then
+# collect whole subtrees along the two boundary paths, in key order.
+    def aggregate(self, lo=None, hi=None):
+        '''
+            Combination of the measures of the keys in [lo, hi), in key order, in O(log n).
+            None leaves that end of the range open.
+        '''
+        monoid = self.monoid
+        combine = monoid.combine
+        identity = monoid.identity
+        h = self.root
+        while h != None:
+            if hi is not None and not h.key < hi:
+                h = h.left
+            elif lo is not None and h.key < lo:
+                h = h.right
+            else:
+                break
         if h == None:
-            return self.create_node(key)
+            return identity
+
+        left = identity
+        x = h.left
+        if lo is None:
+            left = x.agg if x != None else identity
+        else:
+            while x != None:
+                if x.key < lo:
+                    x = x.right
+                else:
+                    piece = monoid.measure(x.key, x.value)
+                    if x.right != None:
+                        piece = combine(piece, x.right.agg)
+                    left = combine(piece, left)
+                    x = x.left
+
+        right = identity
+        x = h.right
+        if hi is None:
+            right = x.agg if x != None else identity
+        else:
+            while x != None:
+                if x.key < hi:
+                    piece = monoid.measure(x.key, x.value)
+                    if x.left != None:
+                        piece = combine(x.left.agg, piece)
+                    right = combine(right, piece)
+                    x = x.right
+                else:
+                    x = x.left
+
+        return combine(combine(left, monoid.measure(h.key, h.value)), right)
+
+    def insert(self,key,value=None):
+        '''
+            Insert key, or replace its value if it is already in the tree
+        '''
+        if self.written is not None:
+            self.__record(key)
+        if self.recursive:
+            self.root = self.insert_fixup(self.root,key,value)
+        else:
+            self.root = self.__insert(key, value)
+        self.root.color = BLACK
+        if self.debug:
+            self.validate()
+
+    def insert_fixup(self,h,key,value=None):
+
+        if h == None:
+            self.n_keys += 1
+            h = self.create_node(key,value)
+            if self.monoid is not None:
+                self.update(h)
+            self.__extremes(h)
+            return h
 
         if key == h.key:
-            print 'Same key asked, so replace'
+            h.value = value
         elif key < h.key: 
-            h.left = self.insert_fixup(h.left,key)
+            h.left = self.insert_fixup(h.left,key,value)
         else:
-            h.right = self.insert_fixup(h.right,key)
+            h.right = self.insert_fixup(h.right,key,value)
 
         h = self.fix_up(h)
         return h
 
+# Idea: the recursion of insert_fixup only keeps the search path, to relink every level and fix_up
+# it on the way back. Keep the path in a list instead (with the side taken at every node), then
+# walk it back up in one loop with fix_up written inline: the same rotations and flips in the
+# same order, so the same tree, without a Python call per level.
+# Before the insert no fix_up case holds anywhere, and fix_up at a node only looks at the node,
+# its children and its left grandchild. So once two levels in a row come back with the same root
+# and the same colors, nothing above can change: without sizes or aggregates to refresh up to
+# the root, the walk stops there, usually after a few levels.
+    def __insert(self, key, value):
+        # New root of the tree after inserting key (not yet colored black)
+        path = []
+        lefts = []
+        h = self.root
+        while h is not None:
+            if key == h.key:
+                h.value = value
+                if not self.order_statistics:
+                    return self.root
+                # fix_up (only the sizes and aggregates change) from the node up
+                path.append(h)
+                lefts.append(None)
+                return self.__unwind(path, lefts, None)
+            path.append(h)
+            if key < h.key:
+                lefts.append(True)
+                h = h.left
+            else:
+                lefts.append(False)
+                h = h.right
+        self.n_keys += 1
+        h = self.create_node(key, value)
+        # __extremes(h)
+        if self.min_node is not None and key < self.min_node.key:
+            self.min_node = h
+        if self.max_node is not None and self.max_node.key < key:
+            self.max_node = h
+        if self.order_statistics:
+            if self.monoid is not None:
+                self.update(h)
+            return self.__unwind(path, lefts, h)
+
+        # changed: the subtree just fixed has a new root or a new color, changed_below: same one
+        # level further down
+        changed = changed_below = True
+        while path:
+            if not changed and not changed_below:
+                return self.root
+            p = path.pop()
+            if lefts.pop():
+                p.left = h
+            else:
+                p.right = h
+            changed_below = changed
+            changed = False
+            h = p
+            left = h.left
+            right = h.right
+            if right is not None and right.color == RED and (left is None or left.color == BLACK):
+                self.count_case('fix_up_case_1')
+                h = self.rotate_left(h)
+                left = h.left
+                right = h.right
+                changed = True
+            if left is not None and left.color == RED and left.left is not None and left.left.color == RED:
+                self.count_case('fix_up_case_2')
+                h = self.rotate_right(h)
+                left = h.left
+                right = h.right
+                changed = True
+            if left is not None and left.color == RED and right is not None and right.color == RED:
+                self.count_case('fix_up_case_3')
+                self.flip_colors(h)
+                changed = True
+        return h
+
+    def __unwind(self, path, lefts, h):
+        # Hang h below the last node of path (on the side of lefts, None for no change), fix_up
+        # that node, and so on up to the root, which is returned
+        order_statistics = self.order_statistics
+        while path:
+            p = path.pop()
+            left = lefts.pop()
+            if left:
+                p.left = h
+            elif left is not None:
+                p.right = h
+            h = p
+            # fix_up(h)
+            left = h.left
+            right = h.right
+            if right is not None and right.color == RED and (left is None or left.color == BLACK):
+                self.count_case('fix_up_case_1')
+                h = self.rotate_left(h)
+                left = h.left
+                right = h.right
+            if left is not None and left.color == RED and left.left is not None and left.left.color == RED:
+                self.count_case('fix_up_case_2')
+                h = self.rotate_right(h)
+                left = h.left
+                right = h.right
+            if left is not None and left.color == RED and right is not None and right.color == RED:
+                self.count_case('fix_up_case_3')
+                self.flip_colors(h)
+            if order_statistics:
+                self.update(h)
+        return h
+
     def print_tree(self,x_node):
         if x_node != None:
             self.print_tree(x_node.left)
-            print "Value = " + str(x_node.key)
+            print("Value = " + str(x_node.key))
             self.print_tree(x_node.right)
 
+    def validate(self):
+        '''
+            Check the left-leaning red-black properties, the BST order, the sizes and the cached
+            minimum and maximum. Raises AssertionError (also under python -O) and returns the
+            black height. O(n).
+        '''
+        if self.root != None and self.root.color != BLACK:
+            raise AssertionError('root is not black')
+        bh, size = self.__validate(self.root, None, None)
+        if size != self.n_keys:
+            raise AssertionError('len is ' + str(self.n_keys) + ' but there are ' + str(size) + ' nodes')
+        if self.min_node is not None and self.min_node is not self.minimum(self.root):
+            raise AssertionError('cached minimum is not the first node')
+        if self.max_node is not None and self.max_node is not self.maximum(self.root):
+            raise AssertionError('cached maximum is not the last node')
+        return bh
+
+    def __validate(self, h, lo, hi):
+        # (black height, number of nodes) of the subtree at h, keys must be in (lo, hi)
+        if h == None:
+            return 1, 0
+        if (lo is not None and h.key <= lo) or (hi is not None and hi <= h.key):
+            raise AssertionError('key ' + str(h.key) + ' out of order')
+        if h.right != None and h.right.color == RED:
+            raise AssertionError('red right link at ' + str(h.key))
+        if h.color == RED and h.left != None and h.left.color == RED:
+            raise AssertionError('two red links in a row at ' + str(h.key))
+        l_bh, l_size = self.__validate(h.left, lo, h.key)
+        r_bh, r_size = self.__validate(h.right, h.key, hi)
+        if l_bh != r_bh:
+            raise AssertionError('black heights differ below ' + str(h.key))
+        size = l_size + r_size + 1
+        if self.order_statistics and h.size != size:
+            raise AssertionError('wrong size at ' + str(h.key))
+        monoid = self.monoid
+        if monoid is not None:
+            agg = monoid.measure(h.key, h.value)
+            if h.left != None:
+                agg = monoid.combine(h.left.agg, agg)
+            if h.right != None:
+                agg = monoid.combine(agg, h.right.agg)
+            if h.agg != agg:
+                raise AssertionError('wrong aggregate at ' + str(h.key))
+        return l_bh + (1 if h.color == BLACK else 0), size
+
 
     def move_red_left(self,h):
         self.flip_colors(h)
-        if h.right != None and h.right.left != None and h.right.left.color == 'Red':
-            assert h.right.left != None
+        if h.right != None and h.right.left != None and h.right.left.color == RED:
             h.right = self.rotate_right(h.right)
             h = self.rotate_left(h)
             self.flip_colors(h)
-            assert h.left.left.color == 'Red'
         return h
 
     def move_red_right(self,h):
         self.flip_colors(h)
-        if h.left != None and h.left.left != None and h.left.left.color == 'Red':
+        if h.left != None and h.left.left != None and h.left.left.color == RED:
             h = self.rotate_right(h)
             self.flip_colors(h)
-            assert h.right.right.color == 'Red'
         return h
 
 
     def delete(self, key):
-        self.root = self.delete_fixup(self.root,key)
+        '''
+            Delete key, KeyError if it is not in the tree
+        '''
+        if self.find(key) == None:
+            raise KeyError(key)
+        self.__remove(key)
+
+    def __remove(self, key):
+        # delete key, which must be in the tree
+        if self.recursive:
+            # the recursion does not keep the path: look for the new minimum or maximum right away
+            gone_min = self.min_node is not None and self.min_node.key == key
+            gone_max = self.max_node is not None and self.max_node.key == key
+            self.root = self.delete_fixup(self.root,key)
+            if gone_min:
+                self.min_node = self.minimum(self.root) if self.root != None else None
+            if gone_max:
+                self.max_node = self.maximum(self.root) if self.root != None else None
+        else:
+            self.root = self.__delete(key)
         if self.root != None:
-            self.root.color = 'Black'
+            self.root.color = BLACK
+        self.n_keys -= 1
+        if self.written is not None:
+            self.__record(key)
+        if self.debug:
+            self.validate()
    
+# Idea: the same steps as delete_fixup (and delete_min for the successor), in one loop down the
+# tree. Each node is transformed (move_red_left, rotate_right, move_red_right) before going
+# below it, exactly when the recursion would, and pushed on the path; __unwind then relinks and
+# fixes the path bottom-up as the recursion does when it returns.
+# The node taken out is a leaf (the one of key, or of its successor copied into the node of key),
+# so its successor is the last node of the path where the search went left, and its predecessor
+# the last one where it went right: the cached minimum or maximum moves there.
+    def __delete(self, key):
+        # New root of the tree after deleting key, which must be in the tree
+        path = []
+        lefts = []
+        # last nodes of the path where the search went left and right
+        after = before = None
+        h = self.root
+        while True:
+            if key < h.key:
+                left = h.left
+                if left is not None and left.color == BLACK and (left.left is None or left.left.color == BLACK):
+                    h = self.move_red_left(h)
+                path.append(h)
+                lefts.append(True)
+                after = h
+                h = h.left
+                continue
+            if h.left is not None and h.left.color == RED:
+                h = self.rotate_right(h)
+            right = h.right
+            if right is None and key == h.key:
+                if h is self.min_node:
+                    self.min_node = after
+                if h is self.max_node:
+                    self.max_node = before
+                break
+            if right is not None and right.color == BLACK and (right.left is None or right.left.color == BLACK):
+                h = self.move_red_right(h)
+            path.append(h)
+            lefts.append(False)
+            if key == h.key:
+                # the node of key stays with the successor (so stays the minimum if it was)
+                succ_node = self.minimum(h.right)
+                h.key = succ_node.key
+                h.value = succ_node.value
+                if succ_node is self.max_node:
+                    self.max_node = h
+                # delete_min(h.right)
+                h = h.right
+                while h.left is not None:
+                    left = h.left
+                    if left.color == BLACK and (left.left is None or left.left.color == BLACK):
+                        h = self.move_red_left(h)
+                    path.append(h)
+                    lefts.append(True)
+                    h = h.left
+                break
+            before = h
+            h = h.right
+        return self.__unwind(path, lefts, None)
+
 # Idea: Move to the left, since the minimum while be on the left most leaf of the tree.
 # Maintain the invariant, that either the actual node or the node's left child is red. (BST 3-Node).
 # Use the move_red_left to maintain it.
-# Since, there are no two consecutive red's in a rb-tree and the leaf's child is 'Black', when 
-# the algorithm reaches the min leaf, it must be 'Red' and can therefore be deleted without causing
+# Since, there are no two consecutive red's in a rb-tree and the leaf's child is Black, when 
+# the algorithm reaches the min leaf, it must be Red and can therefore be deleted without causing
 # any violation. On the way up the stack, fix possible right leaning Red links with fix_up
     def delete_min(self,h):
         if h.left == None:
-            assert h.color == 'Red'
             return None
 
-        if h.left.color == 'Black' and (h.left.left == None or h.left.left.color == 'Black'):
+        if h.left.color == BLACK and (h.left.left == None or h.left.left.color == BLACK):
             h = self.move_red_left(h)
-        
-        assert h.color == 'Red' or h.left.color == 'Red' 
+
         h.left = self.delete_min(h.left)
         
         return self.fix_up(h)
@@ -127,44 +736,330 @@ class Rb_tree:
             node = node.left
         return node
 
+    def maximum(self, node):
+        while node.right != None:
+            node = node.right
+        return node
+
+# Double-ended priority queue: the nodes of the smallest and biggest keys are cached once looked
+# for, and a new node only has to be compared with them. Rotations and flips keep the nodes; a
+# delete of the minimum or maximum moves the cache to the successor or predecessor met on its way
+# down (see __delete), and the maximum moves along when it is the successor copied. Batches and
+# loads relink the nodes wholesale and forget both.
+    def __extremes(self, h):
+        # h is a new node: is it the new minimum or maximum?
+        if self.min_node is not None and h.key < self.min_node.key:
+            self.min_node = h
+        if self.max_node is not None and self.max_node.key < h.key:
+            self.max_node = h
+
+    def peek_min(self):
+        '''
+            (key, value) of the smallest key, O(1) once cached. KeyError on an empty tree.
+        '''
+        if self.min_node is None:
+            if self.root == None:
+                raise KeyError('peek_min on an empty tree')
+            self.min_node = self.minimum(self.root)
+        return self.min_node.key, self.min_node.value
+
+    def peek_max(self):
+        '''
+            (key, value) of the biggest key, O(1) once cached. KeyError on an empty tree.
+        '''
+        if self.max_node is None:
+            if self.root == None:
+                raise KeyError('peek_max on an empty tree')
+            self.max_node = self.maximum(self.root)
+        return self.max_node.key, self.max_node.value
+
+    def pop_min(self):
+        '''
+            Delete the smallest key and return (key, value)
+        '''
+        item = self.peek_min()
+        self.n_keys -= 1
+        if self.written is not None:
+            self.__record(item[0])
+        if self.recursive:
+            self.root = self.delete_min(self.root)
+            self.min_node = self.minimum(self.root) if self.root != None else None
+        else:
+            # delete_min as a loop down the left spine, as in __delete
+            path = []
+            lefts = []
+            h = self.root
+            while h.left is not None:
+                left = h.left
+                if left.color == BLACK and (left.left is None or left.left.color == BLACK):
+                    h = self.move_red_left(h)
+                path.append(h)
+                lefts.append(True)
+                h = h.left
+            # the leaf taken out is the left child of its successor
+            self.min_node = path[-1] if path else None
+            self.root = self.__unwind(path, lefts, None)
+        if self.root != None:
+            self.root.color = BLACK
+        else:
+            self.max_node = None
+        if self.debug:
+            self.validate()
+        return item
+
+    def pop_max(self):
+        '''
+            Delete the biggest key and return (key, value)
+        '''
+        item = self.peek_max()
+        self.__remove(item[0])
+        return item
+
+    def find(self, key):
+        '''
+            Node holding key, or None
+        '''
+        h = self.root
+        while h != None and h.key != key:
+            if key < h.key:
+                h = h.left
+            else:
+                h = h.right
+        return h
+
+    # A batch holding at least this fraction of the tree size is merged with the tree and the
+    # tree rebuilt in O(n + m), instead of O(m log n) separate updates (see bench_batch.py)
+    rebuild_ratio = 0.1
+
+# The LLRB insert and delete restructure the tree top-down from the root, so the search path of
+# a key cannot be reused by the next one: small batches are just applied in key order. Lookups
+# do not change the tree, so find_many uses a finger search (see rb_tree.py).
+    def insert_many(self, keys):
+        '''
+            Insert a batch of keys (keys already in the tree are left as they are)
+        '''
+        keys = sorted(keys)
+        if not keys:
+            return
+        if len(keys) >= self.rebuild_ratio * self.n_keys:
+            merged = []
+            i = 0
+            for h in self.__node_range():
+                while i < len(keys) and keys[i] <= h.key:
+                    if keys[i] < h.key and (not merged or merged[-1].key < keys[i]):
+                        merged.append(self.create_node(keys[i]))
+                    i += 1
+                merged.append(h)
+            for key in keys[i:]:
+                if not merged or merged[-1].key < key:
+                    merged.append(self.create_node(key))
+            self.__load_sorted(merged, len(merged))
+            return
+
+        for key in keys:
+            self.setdefault(key)
+
+    def find_many(self, keys):
+        '''
+            Node for each key, in the order of the keys (None when the key is not there)
+        '''
+        keys = list(keys)
+        result = [None] * len(keys)
+        # path from the root to the last node reached, with the (exclusive) upper bound of the
+        # keys in each node's subtree. Going up until key < bound gives the finger to start from.
+        path = []
+        for i in sorted(range(len(keys)), key=keys.__getitem__):
+            key = keys[i]
+            while path and path[-1][1] is not None and not key < path[-1][1]:
+                path.pop()
+            if not path:
+                if self.root == None:
+                    continue
+                path.append((self.root, None))
+            h, hi = path[-1]
+            while key != h.key:
+                if key < h.key:
+                    h, hi = h.left, h.key
+                else:
+                    h = h.right
+                if h == None:
+                    break
+                path.append((h, hi))
+            else:
+                result[i] = h
+        return result
+
+    def delete_many(self, keys):
+        '''
+            Delete a batch of keys (keys not in the tree are ignored). Returns the number of deleted keys.
+        '''
+        keys = sorted(keys)
+        if not keys:
+            return 0
+        if len(keys) >= self.rebuild_ratio * self.n_keys:
+            kept = []
+            i = 0
+            for h in self.__node_range():
+                while i < len(keys) and keys[i] < h.key:
+                    i += 1
+                if i == len(keys) or keys[i] != h.key:
+                    kept.append(h)
+            deleted = self.n_keys - len(kept)
+            self.__load_sorted(kept, len(kept))
+            return deleted
+
+        deleted = 0
+        for key in keys:
+            if self.find(key) != None:
+                self.__remove(key)
+                deleted += 1
+        return deleted
+
+    def __contains__(self, key):
+        return self.find(key) != None
+
+    def get(self, key, default=None):
+        h = self.find(key)
+        return h.value if h != None else default
+
+    def upsert(self, key, value):
+        '''
+            Set the value of key, inserting it if it is not in the tree yet
+        '''
+        self.insert(key, value)
+
+    def setdefault(self, key, default=None):
+        h = self.find(key)
+        if h != None:
+            return h.value
+        self.insert(key, default)
+        return default
+
+    def pop(self, key, *default):
+        '''
+            Delete key and return its value. Without a default, a missing key raises KeyError.
+        '''
+        h = self.find(key)
+        if h == None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = h.value
+        self.__remove(key)
+        return value
+
+    def __node_range(self, lo=None, hi=None):
+        # the stack holds the nodes whose left subtree is being walked
+        stack = []
+        h = self.root
+        while h != None:
+            if lo is not None and h.key < lo:
+                h = h.right
+            else:
+                stack.append(h)
+                h = h.left
+        while stack:
+            h = stack.pop()
+            if hi is not None and not h.key < hi:
+                return
+            yield h
+            h = h.right
+            while h != None:
+                stack.append(h)
+                h = h.left
+
+    def keys(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi) in increasing order, generated lazily after an O(log n) seek.
+            None leaves that end of the range open.
+        '''
+        return (h.key for h in self.__node_range(lo, hi))
+
+    def values(self, lo=None, hi=None):
+        '''
+            Values of the keys in [lo, hi), in key order
+        '''
+        return (h.value for h in self.__node_range(lo, hi))
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi), in key order
+        '''
+        return ((h.key, h.value) for h in self.__node_range(lo, hi))
+
+    def __iter__(self):
+        return self.keys()
+
+    def __reversed_nodes(self):
+        stack = []
+        h = self.root
+        while h != None:
+            stack.append(h)
+            h = h.right
+        while stack:
+            h = stack.pop()
+            yield h
+            h = h.left
+            while h != None:
+                stack.append(h)
+                h = h.right
+
+    def __reversed__(self):
+        return (h.key for h in self.__reversed_nodes())
+
+    def reversed_items(self):
+        '''
+            (key, value) pairs in decreasing key order, lazily
+        '''
+        return ((h.key, h.value) for h in self.__reversed_nodes())
+
+    def cursor(self, key=None):
+        '''
+            Cursor placed before the first key >= key (before the minimum if key is None)
+        '''
+        path = []
+        last_left = 0
+        h = self.root
+        while h != None:
+            path.append(h)
+            if key is not None and h.key < key:
+                h = h.right
+            else:
+                last_left = len(path)
+                h = h.left
+        # the lower bound is the last node where the search went left
+        del path[last_left:]
+        return Cursor(self, path)
+
 # Idea. Find the node to delete. Exchange it with the successor, that is on the right subtree. 
 # Delete the successor (delete_min). While searching the succesor, change the nodes color, so that
 # when the succesor is found, it is red. Red nodes from the leafs can be deleted without violatng
 # any invariant. Fixup the tree while unwinding the stack to preserve the left-leaning property
     def delete_fixup(self,h,key):
         if key < h.key:
-            l_black = (h.left == None or h.left.color == 'Black') 
-            ll_black = h.left != None and (h.left.left == None or h.left.left.color == 'Black')
+            l_black = (h.left == None or h.left.color == BLACK) 
+            ll_black = h.left != None and (h.left.left == None or h.left.left.color == BLACK)
 
-            root = True if h == self.root else False
             if l_black and ll_black:
                 h = self.move_red_left(h)
 
-            if root == True: 
-                assert h.color == 'Red' or h.left.color == 'Red' or h.left.left.color == 'Red' 
-            else:
-                assert h.color == 'Red' or h.left.color == 'Red'  
-
             # Same argument as delete_min
             h.left = self.delete_fixup(h.left,key)
         else:
             # Rotate to move red link to the right
-            if h.left != None and h.left.color == 'Red':
+            if h.left != None and h.left.color == RED:
                 h = self.rotate_right(h)
             
             # We are at the bottom leaf, so we can securely delete the node 
-            # if h.right == None, it could only either h.left.color == 'Red' or h.left == None 
+            # if h.right == None, it could only either h.left.color == RED or h.left == None 
             # to maintain rb-tree property of equal black nodes in the path
-            # (None considered as Black). If h.left.color == 'Red', we have already rotate it,
+            # (None considered as Black). If h.left.color == RED, we have already rotate it,
             # so this possibility cannot exist
             if key == h.key and h.right == None:
-                assert h.color == 'Red' or h == self.root 
-                assert h.left == None
                 return None
 
             # Create a red in the links searching for the deletion node 
-            if (h.right!=None and h.right.color=='Black') and (h.right.left==None or h.right.left.color=='Black'):
-                assert h.left != None
+            if (h.right!=None and h.right.color==BLACK) and (h.right.left==None or h.right.left.color==BLACK):
                 h = self.move_red_right(h)
 
             if key == h.key:
@@ -172,6 +1067,9 @@ class Rb_tree:
                 succ_node = self.minimum(h.right)
                 # change content
                 h.key = succ_node.key
+                h.value = succ_node.value
+                if succ_node is self.max_node:
+                    self.max_node = h
                 # delete the succesor node. Create red invariants on the way
                 h.right = self.delete_min(h.right)
             else:
@@ -189,17 +1087,16 @@ if __name__ == "__main__":
 #    x = [88,11,91,25,17,81,3,94,43,58]
 #    x = [571,865,298,769,533,638,875,412,515,827,110,281,254,696,82,167,748,55,186,257]
     for v in x:
-        print 'Inserting v = ' + str(v)
         rb_tree.insert(v)
 
     flag = True
     for v in reversed(x):
         if flag == True:
-            print ' Deleting v = ' + str(v)
             rb_tree.delete(v)
             flag = False
         else:
             flag = True
 
-    rb_tree.print_tree(rb_tree.root)
+    # timings live in benchmarks/, this only checks the result
+    print('keys = ' + str(len(rb_tree)) + ' black height = ' + str(rb_tree.validate()))
 
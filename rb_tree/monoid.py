@@ -0,0 +1,31 @@
+'''
+    Monoids for the aggregate() of the trees (rb_tree.py, ll_rb_tree.py): Rb_tree(monoid=SUM)
+    keeps in every node the sum of the values of its subtree, so that aggregate(lo, hi) returns
+    the sum of the values of the keys in [lo, hi) in O(log n).
+
+    combine must be associative and identity its neutral element; it needs not be commutative
+    (pieces are always combined in key order). measure(key, value) gives the element of one key,
+    by default its value.
+'''
+
+import operator
+
+def _value(key, value):
+    return value
+
+class Monoid():
+    def __init__(self, combine, identity, measure=_value):
+        self.combine = combine
+        self.identity = identity
+        self.measure = measure
+
+def _min(a, b):
+    return a if a <= b else b
+
+def _max(a, b):
+    return a if a >= b else b
+
+SUM = Monoid(operator.add, 0)
+MIN = Monoid(_min, float('inf'))
+MAX = Monoid(_max, float('-inf'))
+COUNT = Monoid(operator.add, 0, lambda key, value: 1)
@@ -0,0 +1,119 @@
+'''
+    Persistent Left-leaning RB tree, by path copying.
+
+    The LLRB insert and delete already rebuild the search path on the way back up the recursion
+    (every level returns its, maybe new, h). Here a node is only modified in place by the tree
+    version that created it: every node carries the epoch of its version and, before any change,
+    a node of another epoch is copied. An insert or delete therefore copies the O(log n) nodes of
+    its path (plus the siblings it recolors or rotates) and leaves everything else shared.
+
+    snapshot() is O(1): it hands the current root to a new tree object and moves both trees to new
+    epochs, so from then on neither of them can modify a node the other one sees. A snapshot can
+    be read (or written, it is a full tree) while the original keeps taking writes. Writes between
+    two snapshots modify their own new nodes in place, so they cost no more copies.
+'''
+
+import copy
+import itertools
+import random
+
+import ll_rb_tree
+
+_epochs = itertools.count(1)
+
+class Node(ll_rb_tree.Node):
+    __slots__ = ('epoch',)
+
+    def __init__(self, key, value=None, epoch=0):
+        ll_rb_tree.Node.__init__(self, key, value)
+        self.epoch = epoch
+
+class Rb_tree(ll_rb_tree.Rb_tree):
+    # rebuilding a batch relinks the existing nodes in place, which snapshots may share
+    rebuild_ratio = float('inf')
+    # the copies are made in insert_fixup, delete_fixup and delete_min
+    recursive = True
+
+    def __init__(self, order_statistics=False, monoid=None):
+        ll_rb_tree.Rb_tree.__init__(self, order_statistics, monoid)
+        self.epoch = next(_epochs)
+
+    def create_node(self, key, value=None):
+        return Node(key, value, self.epoch)
+
+    def own(self, h):
+        '''
+            h itself if this version created it, else a copy of h that belongs to this version
+        '''
+        if h.epoch == self.epoch:
+            return h
+        x = Node(h.key, h.value, self.epoch)
+        x.left = h.left
+        x.right = h.right
+        x.color = h.color
+        x.size = h.size
+        x.agg = h.agg
+        # the cached minimum and maximum follow the copies of this version
+        if h is self.min_node:
+            self.min_node = x
+        if h is self.max_node:
+            self.max_node = x
+        return x
+
+    def snapshot(self):
+        '''
+            Read-only (until written) copy of the current version, in O(1)
+        '''
+        tree = copy.copy(self)
+        tree.epoch = next(_epochs)
+        if self.written is not None:
+            tree.written = set(self.written)
+        self.epoch = next(_epochs)
+        return tree
+
+    def rotate_left(self, h):
+        h = self.own(h)
+        h.right = self.own(h.right)
+        return ll_rb_tree.Rb_tree.rotate_left(self, h)
+
+    def rotate_right(self, h):
+        h = self.own(h)
+        h.left = self.own(h.left)
+        return ll_rb_tree.Rb_tree.rotate_right(self, h)
+
+    def flip_colors(self, h):
+        # h is already owned by the caller, which keeps using it
+        h.left = self.own(h.left)
+        h.right = self.own(h.right)
+        ll_rb_tree.Rb_tree.flip_colors(self, h)
+
+    def insert_fixup(self, h, key, value=None):
+        if h != None:
+            h = self.own(h)
+        return ll_rb_tree.Rb_tree.insert_fixup(self, h, key, value)
+
+    def delete_fixup(self, h, key):
+        return ll_rb_tree.Rb_tree.delete_fixup(self, self.own(h), key)
+
+    def delete_min(self, h):
+        return ll_rb_tree.Rb_tree.delete_min(self, self.own(h))
+
+
+if __name__ == "__main__":
+    rb_tree = Rb_tree()
+
+    x = random.sample(range(1, 1000000), 10000)
+    versions = []
+    for i, v in enumerate(x):
+        rb_tree.insert(v)
+        if i % 1000 == 0:
+            versions.append((i + 1, rb_tree.snapshot()))
+
+    for v in x[::2]:
+        rb_tree.delete(v)
+
+    # old versions still hold what they held when taken
+    for n, version in versions:
+        assert list(version) == sorted(x[:n])
+    assert list(rb_tree) == sorted(x[1::2])
+    print('versions = ' + str(len(versions)) + ' keys now = ' + str(len(rb_tree)))
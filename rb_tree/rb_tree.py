@@ -11,46 +11,276 @@
     Lemma 1: a red-black tree with n internal nodes has a height at most 2lg(n+1)
 '''
 
+import copy
 import random
 import sys
-import pdb
 
-class DummyNode():
+import frozen_tree
+import tree_file
+
+RED = True
+BLACK = False
+
+def color_name(color):
+    return 'Red' if color == RED else 'Black'
+
+class DummyNode(object):
+    __slots__ = ('key', 'value', 'parent', 'left', 'right', 'color', 'size', 'agg')
+
     def __init__(self):
         self.key = None
+        self.value = None
         self.parent = None
         self.left = None
         self.right = None
-        self.color = 'Black'
+        self.color = BLACK
+        self.size = 0
+        self.agg = None
+
+class Node(object):
+    __slots__ = ('key', 'value', 'parent', 'left', 'right', 'color', 'size', 'agg')
 
-class Node():
-    def __init__(self,key):
+    def __init__(self,key,value=None):
         self.key = key
+        self.value = value
         self.parent = None
         self.left = None
         self.right = None
-        self.color = 'Red'
+        self.color = RED
+        self.size = 1
+        # agg is only set (and read) with a monoid
+
+class Cursor():
+    '''
+        Position between two keys of the tree. next() returns the key after the position and
+        moves forward, prev() the key before it and moves back, both raising StopIteration at
+        the ends. Uses the parent pointers, so each step is O(1) amortized. Any insert or
+        delete in the tree invalidates the cursor.
+    '''
+    def __init__(self, tree, node):
+        self.tree = tree
+        # node right after the position, dummy when at the end
+        self.node = node
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.node == self.tree.dummy:
+            raise StopIteration
+        key = self.node.key
+        self.node = self.tree.successor(self.node)
+        return key
+
+    __next__ = next
+
+    def prev(self):
+        tree = self.tree
+        if self.node != tree.dummy:
+            x_node = tree.predecessor(self.node)
+        elif tree.root != tree.dummy:
+            x_node = tree.maximum(tree.root)
+        else:
+            x_node = tree.dummy
+        if x_node == tree.dummy:
+            raise StopIteration
+        self.node = x_node
+        return x_node.key
 
 class Rb_tree():
-    def __init__(self):
+    # check every invariant (validate) after each insert and delete
+    debug = False
+
+    def __init__(self, order_statistics=False, monoid=None):
+        '''
+            order_statistics: maintain node.size (number of nodes in the subtree) for rank/select
+            monoid: object with combine(a, b), identity and measure(key, value) (see monoid.py),
+                    node.agg is then the combination of the measures of its subtree, in key order,
+                    for aggregate(). Implies order_statistics.
+        '''
         self.dummy = DummyNode()
         self.root = self.dummy 
         self.last_value = 0
+        self.n_keys = 0
+        # False after a split, until len() counts the nodes again
+        self.n_keys_valid = True
+        self.order_statistics = order_statistics or monoid is not None
+        self.monoid = monoid
+        if monoid is not None:
+            self.dummy.agg = monoid.identity
+        # nodes of the smallest and biggest keys, None until peek_min / peek_max look for them
+        self.min_node = None
+        self.max_node = None
+        # snapshot of freeze(), and the keys written since (None: it must walk the whole tree)
+        self.frozen = None
+        self.written = None
 
+    def __len__(self):
+        if not self.n_keys_valid:
+            self.n_keys = sum(1 for x_node in self.__node_range())
+            self.n_keys_valid = True
+        return self.n_keys
 
-    def create_node(self, val):
-        x_node = Node(val)
+    def create_node(self, val, value=None):
+        x_node = Node(val, value)
         x_node.parent = self.dummy
         x_node.left = self.dummy
         x_node.right = self.dummy
         return x_node
 
+# Idea: with the keys already sorted, there is no need to search or rebalance. Build a perfectly
+# balanced tree by taking the middle key as the root, recursively (consuming the keys in order,
+# so the input is only read once). All leaves are then at depth h or h+1 with h = floor(lg(n)),
+# so coloring the nodes of the deepest level red (unless that level is full) and the rest black
+# gives the same number of blacks in every path.
+    @classmethod
+    def from_sorted(cls, keys, **options):
+        '''
+            Build a tree from keys in non-decreasing order in O(n). Keys without a len() are
+            first materialized in a list. Options are passed to the constructor.
+        '''
+        tree = cls(**options)
+        if not hasattr(keys, '__len__'):
+            keys = list(keys)
+        tree.__load_sorted((tree.create_node(key) for key in keys), len(keys))
+        return tree
+
+    def __load_sorted(self, nodes, n):
+        # Replace the content of the tree with the n nodes given in key order (they are relinked)
+        self.n_keys = n
+        self.n_keys_valid = True
+        self.min_node = self.max_node = None
+        self.written = None
+        if n == 0:
+            self.root = self.dummy
+            return
+
+        depth = n.bit_length() - 1
+        # n + 1 a power of 2 means the last level is full, so no red nodes are needed
+        red_depth = depth if (n + 1) & n else -1
+        last = [None]
+        self.root = self.__build_sorted(iter(nodes), n, 0, red_depth, last)
+        self.root.parent = self.dummy
+
+    def __build_sorted(self, nodes, n, depth, red_depth, last):
+        if n == 0:
+            return self.dummy
+
+        n_left = (n - 1) // 2
+        left = self.__build_sorted(nodes, n_left, depth + 1, red_depth, last)
+        x_node = next(nodes)
+        if last[0] is not None and x_node.key < last[0]:
+            raise ValueError('keys are not sorted: ' + str(x_node.key) + ' after ' + str(last[0]))
+        last[0] = x_node.key
+        right = self.__build_sorted(nodes, n - 1 - n_left, depth + 1, red_depth, last)
+
+        x_node.color = RED if depth == red_depth else BLACK
+        x_node.left = left
+        x_node.right = right
+        if left != self.dummy:
+            left.parent = x_node
+        if right != self.dummy:
+            right.parent = x_node
+        if self.order_statistics:
+            self.update(x_node)
+        return x_node
+
+# Idea: the file keeps the nodes in key order with their colors and the indexes of their children
+# (tree_file.py), so loading it relinks the same tree in O(n) with no comparison at all. A file
+# written by the LLRB holds a valid RB tree too, its shape is reused as it is.
+    def dump(self, path):
+        '''
+            Write the keys, values and shape of the tree to path (format in tree_file.py)
+        '''
+        tree_file.dump(path, self.root, self.dummy, False)
+
+    @classmethod
+    def load(cls, path, mmap=False, **options):
+        '''
+            Tree written by dump(), in O(n). With mmap, a read-only tree_file.MappedTree that
+            reads the file in place instead, opened in O(1). Options are passed to the constructor.
+        '''
+        if mmap:
+            return tree_file.MappedTree(path)
+        tree = cls(**options)
+        tree.__load_columns(*tree_file.read(path)[:6])
+        if tree.debug:
+            tree.validate()
+        return tree
+
+# Idea: most lookups in bulk come against a tree that rarely changes, so freeze() copies the keys
+# and values into NumPy arrays once (frozen_tree.py) and keeps that snapshot. Every write from
+# then on records its key; the next freeze() only looks those keys up again and merges their rows
+# into the previous snapshot with array operations, unless the tree was rebuilt wholesale (batches,
+# loads, split, set operations) or too many keys were written, then it walks the whole tree. The
+# writes stop being recorded as soon as they reach freeze_ratio of the tree, so the set of keys
+# never grows past that.
+    freeze_ratio = 0.5
+
+    def freeze(self, layout='sorted'):
+        '''
+            Read-only snapshot of the keys and values for vectorized batch lookups
+            (frozen_tree.FrozenTree, needs numpy). Writing to the tree does not change it; calling
+            freeze() again returns it as it is if nothing was written since, else a new one.
+        '''
+        if (self.frozen is None or self.written is None or self.frozen.layout != layout
+                or len(self.written) >= self.freeze_ratio * len(self)):
+            self.frozen = frozen_tree.FrozenTree(self.keys(), self.values(), layout)
+        elif self.written:
+            written = sorted(self.written)
+            items = []
+            for key in written:
+                x_node = self.lower_bound(key)
+                while x_node != self.dummy and x_node.key == key:
+                    items.append((key, x_node.value))
+                    x_node = self.successor(x_node)
+            self.frozen = self.frozen.updated(written, items)
+        self.written = set()
+        return self.frozen
+
+    def __record(self, key):
+        # key written since freeze(): once that makes freeze_ratio of the tree, the next freeze()
+        # walks the whole tree anyway, so stop recording
+        written = self.written
+        written.add(key)
+        if len(written) >= self.freeze_ratio * self.n_keys:
+            self.written = None
+
+    def __load_columns(self, keys, values, colors, lefts, rights, root):
+        nodes = [self.create_node(key, value) for key, value in zip(keys, values)]
+        for x_node, color, left, right in zip(nodes, colors, lefts, rights):
+            x_node.color = RED if color else BLACK
+            if left >= 0:
+                x_node.left = nodes[left]
+                nodes[left].parent = x_node
+            if right >= 0:
+                x_node.right = nodes[right]
+                nodes[right].parent = x_node
+        self.n_keys = len(nodes)
+        self.n_keys_valid = True
+        self.min_node = self.max_node = None
+        self.written = None
+        self.root = nodes[root] if nodes else self.dummy
+        if self.order_statistics:
+            # parents come before their children in a pre-order walk, update in reverse
+            order = []
+            stack = [self.root] if nodes else []
+            while stack:
+                x_node = stack.pop()
+                order.append(x_node)
+                if x_node.left != self.dummy:
+                    stack.append(x_node.left)
+                if x_node.right != self.dummy:
+                    stack.append(x_node.right)
+            for x_node in reversed(order):
+                self.update(x_node)
+
     def in_order_traversal(self, node):
         if node != self.dummy:
             self.in_order_traversal(node.left)
-            sys.stdout.write(str(node.key) + " color =  " + node.color + " \n" )
+            sys.stdout.write(str(node.key) + " color =  " + color_name(node.color) + " \n" )
             if node.key <= self.last_value:
-                print 'node.key == ' + str(node.key) + ' self.last_value = ' + str(self.last_value)
+                print('node.key == ' + str(node.key) + ' self.last_value = ' + str(self.last_value))
                 assert node.key > self.last_value  
             self.last_value = node.key 
             self.in_order_traversal(node.right)
@@ -58,7 +288,7 @@ class Rb_tree():
 
     def pre_order_traversal(self,node):
         if node != self.dummy:
-            sys.stdout.write(str(node.key) + " color =  " + node.color + " \n" )
+            sys.stdout.write(str(node.key) + " color =  " + color_name(node.color) + " \n" )
             self.pre_order_traversal(node.left)
             self.pre_order_traversal(node.right)
 
@@ -66,12 +296,10 @@ class Rb_tree():
         if node != self.dummy:
             self.post_order_traversal(node.left)
             self.post_order_traversal(node.right)
-            sys.stdout.write(str(node.key) + " color =  " + node.color + " \n" )
+            sys.stdout.write(str(node.key) + " color =  " + color_name(node.color) + " \n" )
 
 
     def left_rotate(self, x_node):
-        assert x_node.right != self.dummy
-
         y_node = x_node.right
 
         x_node.right = y_node.left
@@ -89,9 +317,11 @@ class Rb_tree():
         y_node.left = x_node
         x_node.parent = y_node
 
-    def right_rotate(self, x_node):
-        assert x_node.left != self.dummy
+        if self.order_statistics:
+            self.update(x_node)
+            self.update(y_node)
 
+    def right_rotate(self, x_node):
         y_node = x_node.left 
         x_node.left = y_node.right
         if y_node.right != self.dummy:
@@ -108,14 +338,19 @@ class Rb_tree():
         y_node.right = x_node
         x_node.parent = y_node
 
+        if self.order_statistics:
+            self.update(x_node)
+            self.update(y_node)
+
 
     def insert(self,z_node):
-        assert z_node != self.dummy
-        assert z_node.left == self.dummy
-        assert z_node.right == self.dummy
-        assert z_node.color == 'Red'
+        self.__insert_below(self.root, z_node)
+        if self.debug:
+            self.validate()
 
-        x_node = self.root
+    def __insert_below(self, x_node, z_node):
+        # x_node is the root or any node whose subtree range holds z_node.key
+        self.n_keys += 1
         y_node = self.dummy
         # Find leaf to insert 
         while x_node != self.dummy:
@@ -133,13 +368,28 @@ class Rb_tree():
         else:
             y_node.right = z_node
 
+        if self.order_statistics:
+            self.update_path(z_node)
+        # equal keys go to the right, so a new node with the biggest key is the last one
+        if self.min_node is not None and z_node.key < self.min_node.key:
+            self.min_node = z_node
+        if self.max_node is not None and not z_node.key < self.max_node.key:
+            self.max_node = z_node
+        if self.written is not None:
+            self.__record(z_node.key)
+
+        return self.insert_fixup(z_node)
 
-        self.insert_fixup(z_node)
+    def count_case(self, case):
+        '''
+            Called on every case of insert_fixup ('insert_case_1'..3) and delete_fixup
+            ('delete_case_1'..4). Does nothing: instrumented_rb_tree.py counts them.
+        '''
 
     def insert_fixup(self,z_node):
 
-        while z_node.parent.color == 'Red':
-            # z_node.parent.color == 'Red' which means 
+        while z_node.parent.color == RED:
+            # z_node.parent.color == RED which means 
             #1- violating only property 4 of the red-black tree
             #2- z_node_parent was not the root by property 2, root must be black
             #3- z_node.parent.parent must exist and is Black, since Red-Red is illegal
@@ -148,42 +398,51 @@ class Rb_tree():
             if parent == grand_parent.left:
                 uncle_node = grand_parent.right
                 # Case 1: uncle is Red, flip colors and continue up the tree
-                if uncle_node.color == 'Red':
-                    parent.color = 'Black'
-                    uncle_node.color = 'Black'
-                    grand_parent.color = 'Red'
+                if uncle_node.color == RED:
+                    self.count_case('insert_case_1')
+                    parent.color = BLACK
+                    uncle_node.color = BLACK
+                    grand_parent.color = RED
                     z_node = grand_parent
 
                 else: # uncle is Black
                     #Case 2: z_node at right
                     if z_node == parent.right:
+                        self.count_case('insert_case_2')
                         z_node = parent
                         self.left_rotate(z_node)
                         parent = z_node.parent # the grand_parent is the same, so do not refresh 
 
                     #Case 3: z_node at left
-                    parent.color = 'Black' 
-                    grand_parent.color = 'Red'
+                    self.count_case('insert_case_3')
+                    parent.color = BLACK 
+                    grand_parent.color = RED
                     self.right_rotate(grand_parent)
             else:
                 uncle_node = z_node.parent.parent.left
-                if uncle_node.color == 'Red':
-                    z_node.parent.color = 'Black'
-                    uncle_node.color = 'Black'
-                    z_node.parent.parent.color = 'Red'
+                if uncle_node.color == RED:
+                    self.count_case('insert_case_1')
+                    z_node.parent.color = BLACK
+                    uncle_node.color = BLACK
+                    z_node.parent.parent.color = RED
                     z_node = z_node.parent.parent
 
                 else: # uncle node color = Black
                     if z_node == z_node.parent.left:
+                        self.count_case('insert_case_2')
                         z_node = z_node.parent
                         self.right_rotate(z_node)
 
-                    z_node.parent.color = 'Black' 
-                    z_node.parent.parent.color = 'Red'
+                    self.count_case('insert_case_3')
+                    z_node.parent.color = BLACK 
+                    z_node.parent.parent.color = RED
                     self.left_rotate(z_node.parent.parent)
        
             #Assure that not violating property 2 of the red-black tree
-        self.root.color = 'Black'
+        # (a red root here means the black height grows by one, join relies on the return value)
+        grew = self.root.color == RED
+        self.root.color = BLACK
+        return grew
 
     def __print_helper(self, node, indent, last):
         if node != self.dummy:
@@ -195,7 +454,7 @@ class Rb_tree():
                 sys.stdout.write("L----")
                 indent += "|    "
 
-            print str(node.key) + "(" +  node.color + ")"
+            print(str(node.key) + "(" +  color_name(node.color) + ")")
             self.__print_helper(node.left, indent, False)
             self.__print_helper(node.right, indent, True)
  #
@@ -203,9 +462,51 @@ class Rb_tree():
     def print_tree(self):
         self.__print_helper(self.root, "", True )
 
-    def transplant(self, u_node, v_node):
-        assert u_node != self.dummy
+    def validate(self):
+        '''
+            Check the red-black properties, the BST order, the parent pointers, the sizes and the
+            cached minimum and maximum. Raises AssertionError (also under python -O) and returns
+            the black height. O(n).
+        '''
+        if self.dummy.color != BLACK or self.root.color != BLACK:
+            raise AssertionError('root or leaves are not black')
+        if self.root != self.dummy and self.root.parent != self.dummy:
+            raise AssertionError('root has a parent')
+        bh, size = self.__validate(self.root, None, None)
+        if self.n_keys_valid and size != self.n_keys:
+            raise AssertionError('len is ' + str(self.n_keys) + ' but there are ' + str(size) + ' nodes')
+        if self.min_node is not None and self.min_node is not self.minimum(self.root):
+            raise AssertionError('cached minimum is not the first node')
+        if self.max_node is not None and self.max_node is not self.maximum(self.root):
+            raise AssertionError('cached maximum is not the last node')
+        return bh
 
+    def __validate(self, x_node, lo, hi):
+        # (black height, number of nodes) of the subtree at x_node, keys must be in [lo, hi]
+        if x_node == self.dummy:
+            return 1, 0
+        if (lo is not None and x_node.key < lo) or (hi is not None and hi < x_node.key):
+            raise AssertionError('key ' + str(x_node.key) + ' out of order')
+        for child in (x_node.left, x_node.right):
+            if child != self.dummy:
+                if child.parent != x_node:
+                    raise AssertionError('wrong parent at ' + str(child.key))
+                if x_node.color == RED and child.color == RED:
+                    raise AssertionError('red node ' + str(x_node.key) + ' has a red child')
+        l_bh, l_size = self.__validate(x_node.left, lo, x_node.key)
+        r_bh, r_size = self.__validate(x_node.right, x_node.key, hi)
+        if l_bh != r_bh:
+            raise AssertionError('black heights differ below ' + str(x_node.key))
+        size = l_size + r_size + 1
+        if self.order_statistics and x_node.size != size:
+            raise AssertionError('wrong size at ' + str(x_node.key))
+        monoid = self.monoid
+        if monoid is not None and x_node.agg != monoid.combine(
+                monoid.combine(x_node.left.agg, monoid.measure(x_node.key, x_node.value)), x_node.right.agg):
+            raise AssertionError('wrong aggregate at ' + str(x_node.key))
+        return l_bh + (1 if x_node.color == BLACK else 0), size
+
+    def transplant(self, u_node, v_node):
         if u_node.parent == self.dummy:
             self.root = v_node
         elif u_node == u_node.parent.left:
@@ -220,6 +521,852 @@ class Rb_tree():
             x_node = x_node.left
         return x_node
 
+    def maximum(self, x_node):
+        while x_node.right != self.dummy:
+            x_node = x_node.right
+        return x_node
+
+# Double-ended priority queue: the nodes of the smallest and biggest keys are cached once looked
+# for. An insert only has to compare its key with them; a delete of one of them moves the cache to
+# its successor (predecessor), which is O(1) amortized since the minimum has no left child.
+# Batches, loads and the split and set operations relink the nodes wholesale and just forget them.
+    def peek_min(self):
+        '''
+            (key, value) of the smallest key, O(1) once cached. KeyError on an empty tree.
+        '''
+        if self.min_node is None:
+            if self.root == self.dummy:
+                raise KeyError('peek_min on an empty tree')
+            self.min_node = self.minimum(self.root)
+        return self.min_node.key, self.min_node.value
+
+    def peek_max(self):
+        '''
+            (key, value) of the biggest key, O(1) once cached. KeyError on an empty tree.
+        '''
+        if self.max_node is None:
+            if self.root == self.dummy:
+                raise KeyError('peek_max on an empty tree')
+            self.max_node = self.maximum(self.root)
+        return self.max_node.key, self.max_node.value
+
+    def pop_min(self):
+        '''
+            Delete the smallest key and return (key, value)
+        '''
+        item = self.peek_min()
+        self.delete(self.min_node)
+        return item
+
+    def pop_max(self):
+        '''
+            Delete the biggest key and return (key, value)
+        '''
+        item = self.peek_max()
+        self.delete(self.max_node)
+        return item
+
+    def successor(self, x_node):
+        if x_node.right != self.dummy:
+            return self.minimum(x_node.right)
+        y_node = x_node.parent
+        while y_node != self.dummy and x_node == y_node.right:
+            x_node = y_node
+            y_node = y_node.parent
+        return y_node
+
+    def predecessor(self, x_node):
+        if x_node.left != self.dummy:
+            return self.maximum(x_node.left)
+        y_node = x_node.parent
+        while y_node != self.dummy and x_node == y_node.left:
+            x_node = y_node
+            y_node = y_node.parent
+        return y_node
+
+    def lower_bound(self, key):
+        '''
+            First node (in order) with node.key >= key, or the dummy
+        '''
+        x_node = self.root
+        y_node = self.dummy
+        while x_node != self.dummy:
+            if x_node.key < key:
+                x_node = x_node.right
+            else:
+                y_node = x_node
+                x_node = x_node.left
+        return y_node
+
+    def __node_range(self, lo=None, hi=None):
+        if lo is None:
+            x_node = self.minimum(self.root) if self.root != self.dummy else self.dummy
+        else:
+            x_node = self.lower_bound(lo)
+        while x_node != self.dummy and (hi is None or x_node.key < hi):
+            yield x_node
+            x_node = self.successor(x_node)
+
+    def keys(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi) in increasing order, generated lazily after an O(log n) seek.
+            None leaves that end of the range open.
+        '''
+        return (x_node.key for x_node in self.__node_range(lo, hi))
+
+    def values(self, lo=None, hi=None):
+        '''
+            Values of the keys in [lo, hi), in key order
+        '''
+        return (x_node.value for x_node in self.__node_range(lo, hi))
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi), in key order
+        '''
+        return ((x_node.key, x_node.value) for x_node in self.__node_range(lo, hi))
+
+    def __iter__(self):
+        return self.keys()
+
+    def __reversed_nodes(self):
+        x_node = self.maximum(self.root) if self.root != self.dummy else self.dummy
+        while x_node != self.dummy:
+            yield x_node
+            x_node = self.predecessor(x_node)
+
+    def __reversed__(self):
+        return (x_node.key for x_node in self.__reversed_nodes())
+
+    def reversed_items(self):
+        '''
+            (key, value) pairs in decreasing key order, lazily
+        '''
+        return ((x_node.key, x_node.value) for x_node in self.__reversed_nodes())
+
+# Idea (finger search): process a batch in key order and start each search from the node reached
+# by the previous one instead of from the root. Climb from that finger until reaching a node that
+# is the left child of a parent with a bigger key: the subtree of that node is the first one on
+# the way up whose key range can hold the new (bigger or equal) key, so descend from there. Keys
+# close to each other share most of their path, so the climb plus descent is short. A batch of m
+# keys spread over n is about n / m apart: the climb and descent of about 2 log(n / m) steps only
+# beat a descent from the root when m * m > n, sparser batches start every search at the root.
+    def __fingers(self, m):
+        # whether a batch of m keys gains from finger searches
+        return m * m > len(self) if self.n_keys_valid else True
+
+    def __finger_start(self, finger, key):
+        if finger == self.dummy:
+            return self.root
+        x_node = finger
+        while x_node.parent != self.dummy:
+            parent = x_node.parent
+            if x_node == parent.left and key < parent.key:
+                break
+            x_node = parent
+        return x_node
+
+    # A batch holding at least this fraction of the tree size is merged with the tree and the
+    # tree rebuilt in O(n + m), instead of O(m log n) separate updates (see bench_batch.py)
+    rebuild_ratio = 0.5
+
+    def insert_many(self, keys):
+        '''
+            Insert a batch of keys, creating their nodes
+        '''
+        keys = sorted(keys)
+        if not keys:
+            return
+        if len(keys) >= self.rebuild_ratio * len(self):
+            merged = []
+            i = 0
+            for x_node in self.__node_range():
+                while i < len(keys) and keys[i] < x_node.key:
+                    merged.append(self.create_node(keys[i]))
+                    i += 1
+                merged.append(x_node)
+            merged.extend(self.create_node(key) for key in keys[i:])
+            self.__load_sorted(merged, len(merged))
+            return
+
+        fingers = self.__fingers(len(keys))
+        finger = self.dummy
+        for key in keys:
+            z_node = self.create_node(key)
+            self.__insert_below(self.__finger_start(finger, key) if fingers else self.root, z_node)
+            finger = z_node
+
+    def find_many(self, values):
+        '''
+            Node for each value, in the order of the values (the dummy when the value is not there)
+        '''
+        values = list(values)
+        dummy = self.dummy
+        result = [dummy] * len(values)
+        fingers = self.__fingers(len(values))
+        finger = dummy
+        for i in sorted(range(len(values)), key=values.__getitem__):
+            value = values[i]
+            node = self.__finger_start(finger, value) if fingers else self.root
+            while node != dummy and node.key != value:
+                finger = node
+                if value < node.key:
+                    node = node.left
+                else:
+                    node = node.right
+            if node != dummy:
+                result[i] = node
+                finger = node
+        return result
+
+    def delete_many(self, values):
+        '''
+            Delete one node per value (values not found are ignored). Returns the number of deleted nodes.
+        '''
+        values = sorted(values)
+        if not values:
+            return 0
+        if len(values) >= self.rebuild_ratio * len(self):
+            # merge-filter the nodes against the values
+            kept = []
+            deleted = 0
+            i = 0
+            for x_node in self.__node_range():
+                while i < len(values) and values[i] < x_node.key:
+                    i += 1
+                if i < len(values) and values[i] == x_node.key:
+                    i += 1
+                    deleted += 1
+                else:
+                    kept.append(x_node)
+            self.__load_sorted(kept, len(kept))
+            return deleted
+
+        deleted = 0
+        fingers = self.__fingers(len(values))
+        finger = self.dummy
+        for value in values:
+            node = self.__finger_start(finger, value) if fingers else self.root
+            while node != self.dummy and node.key != value:
+                finger = node
+                if value < node.key:
+                    node = node.left
+                else:
+                    node = node.right
+            if node != self.dummy:
+                # the successor node survives the deletion (CLRS moves nodes, not keys)
+                if fingers:
+                    finger = self.successor(node)
+                self.delete(node)
+                deleted += 1
+        return deleted
+
+    def cursor(self, key=None):
+        '''
+            Cursor placed before the first key >= key (before the minimum if key is None)
+        '''
+        if key is None:
+            x_node = self.minimum(self.root) if self.root != self.dummy else self.dummy
+        else:
+            x_node = self.lower_bound(key)
+        return Cursor(self, x_node)
+
+    def update(self, x_node):
+        x_node.size = x_node.left.size + x_node.right.size + 1
+        monoid = self.monoid
+        if monoid is not None:
+            x_node.agg = monoid.combine(monoid.combine(x_node.left.agg, monoid.measure(x_node.key, x_node.value)),
+                                        x_node.right.agg)
+
+    def update_path(self, x_node):
+        while x_node != self.dummy:
+            self.update(x_node)
+            x_node = x_node.parent
+
+    def rank(self, key):
+        '''
+            Number of keys smaller than key, in O(log n)
+        '''
+        assert self.order_statistics
+        r = 0
+        x_node = self.root
+        while x_node != self.dummy:
+            if x_node.key < key:
+                r += x_node.left.size + 1
+                x_node = x_node.right
+            else:
+                x_node = x_node.left
+        return r
+
+    def select(self, k):
+        '''
+            Node holding the k-th smallest key (from 0), in O(log n)
+        '''
+        assert self.order_statistics
+        if k < 0 or k >= self.root.size:
+            raise IndexError('select index out of range')
+        x_node = self.root
+        while True:
+            left_size = x_node.left.size
+            if k < left_size:
+                x_node = x_node.left
+            elif k == left_size:
+                return x_node
+            else:
+                k -= left_size + 1
+                x_node = x_node.right
+
+    def count_range(self, lo, hi):
+        '''
+            Number of keys in [lo, hi), in O(log n)
+        '''
+        if hi <= lo:
+            return 0
+        return self.rank(hi) - self.rank(lo)
+
+# Idea: go down to the first node x_node inside [lo, hi), where the searches for lo and hi split.
+# Everything in the range is then the part of x_node.left with keys >= lo, x_node itself and the
+# part of x_node.right with keys < hi. Going down x_node.left towards lo, every node >= lo comes
+# with its whole right subtree, and those pieces come further left (earlier) the deeper they are;
+# symmetrically towards hi. The monoid needs not be commutative: pieces are combined in key order.
+    def aggregate(self, lo=None, hi=None):
+        '''
+            Combination of the measures of the keys in [lo, hi), in key order, in O(log n).
+            None leaves that end of the range open.
+        '''
+        monoid = self.monoid
+        combine = monoid.combine
+        dummy = self.dummy
+        x_node = self.root
+        while x_node != dummy:
+            if hi is not None and not x_node.key < hi:
+                x_node = x_node.left
+            elif lo is not None and x_node.key < lo:
+                x_node = x_node.right
+            else:
+                break
+        if x_node == dummy:
+            return monoid.identity
+
+        if lo is None:
+            left = x_node.left.agg
+        else:
+            left = monoid.identity
+            y_node = x_node.left
+            while y_node != dummy:
+                if y_node.key < lo:
+                    y_node = y_node.right
+                else:
+                    left = combine(combine(monoid.measure(y_node.key, y_node.value), y_node.right.agg), left)
+                    y_node = y_node.left
+
+        if hi is None:
+            right = x_node.right.agg
+        else:
+            right = monoid.identity
+            y_node = x_node.right
+            while y_node != dummy:
+                if y_node.key < hi:
+                    right = combine(right, combine(y_node.left.agg, monoid.measure(y_node.key, y_node.value)))
+                    y_node = y_node.right
+                else:
+                    y_node = y_node.left
+
+        return combine(combine(left, monoid.measure(x_node.key, x_node.value)), right)
+
+# Split and join, following "Just join for parallel ordered sets" (Blelloch et al.) on CLRS
+# problem 13-2. Joining two trees through a pivot key only has to walk down the spine of the
+# taller tree until the black height of the other one, hang the pivot there as a red node and run
+# insert_fixup, so it costs O(|difference in black height| + 1). Splitting cuts the search path
+# of the key and joins the pieces hanging from it back, bottom-up; the black heights of those
+# pieces grow along the way, so the joins add up to O(log n). Union, intersection and difference
+# recurse on the smaller tree, splitting the other one by its keys, in O(m log(n/m + 1)).
+#
+# All the pieces must share the same dummy, a tree created by split (or sibling) keeps the dummy
+# of the tree it comes from. Two trees built apart are first relinked to one dummy (__adopt), which
+# walks the smaller one: joining them costs O(min(n, m)), not O(log n). With order_statistics the sizes are refreshed up to the root on every join,
+# which makes split and join O(log^2 n).
+    def __black_height(self, x_node):
+        # number of black nodes in any path from x_node (included) to a leaf
+        bh = 0
+        while x_node != self.dummy:
+            if x_node.color == BLACK:
+                bh += 1
+            x_node = x_node.left
+        return bh
+
+    def __expose(self, x_node, bh):
+        # detach the subtree at x_node as a tree of its own, with a black root
+        if x_node == self.dummy:
+            return x_node, 0
+        x_node.parent = self.dummy
+        if x_node.color == RED:
+            x_node.color = BLACK
+            bh += 1
+        return x_node, bh
+
+    def __join(self, l_root, l_bh, z_node, r_root, r_bh):
+        # Returns the root and black height of the tree with the keys of l_root, z_node and r_root
+        dummy = self.dummy
+        if l_bh == r_bh:
+            z_node.color = BLACK
+            z_node.parent = dummy
+            z_node.left = l_root
+            z_node.right = r_root
+            if l_root != dummy:
+                l_root.parent = z_node
+            if r_root != dummy:
+                r_root.parent = z_node
+            if self.order_statistics:
+                self.update(z_node)
+            return z_node, l_bh + 1
+
+        z_node.color = RED
+        if l_bh > r_bh:
+            # right spine of l_root, down to the black node with the black height of r_root
+            p_node = dummy
+            y_node = l_root
+            bh = l_bh
+            while y_node.color == RED or bh > r_bh:
+                if y_node.color == BLACK:
+                    bh -= 1
+                p_node = y_node
+                y_node = y_node.right
+            p_node.right = z_node
+            z_node.left = y_node
+            z_node.right = r_root
+            self.root = l_root
+        else:
+            p_node = dummy
+            y_node = r_root
+            bh = r_bh
+            while y_node.color == RED or bh > l_bh:
+                if y_node.color == BLACK:
+                    bh -= 1
+                p_node = y_node
+                y_node = y_node.left
+            p_node.left = z_node
+            z_node.left = l_root
+            z_node.right = y_node
+            self.root = r_root
+        z_node.parent = p_node
+        if z_node.left != dummy:
+            z_node.left.parent = z_node
+        if z_node.right != dummy:
+            z_node.right.parent = z_node
+
+        if self.order_statistics:
+            self.update_path(z_node)
+        grew = self.insert_fixup(z_node)
+        return self.root, max(l_bh, r_bh) + (1 if grew else 0)
+
+    def __join2(self, l_root, l_bh, r_root, r_bh):
+        # join without pivot: take the minimum out of the right tree and use it as the pivot
+        if l_root == self.dummy:
+            return r_root, r_bh
+        if r_root == self.dummy:
+            return l_root, l_bh
+        self.root = r_root
+        z_node = self.minimum(r_root)
+        self.__delete(z_node)
+        return self.__join(l_root, l_bh, z_node, self.root, self.__black_height(self.root))
+
+    def __split(self, x_node, bh, key):
+        # Trees (root, black height) of the keys < key and of the keys >= key in the subtree at x_node
+        dummy = self.dummy
+        if x_node == dummy:
+            return dummy, 0, dummy, 0
+        child_bh = bh - 1 if x_node.color == BLACK else bh
+        left, right = x_node.left, x_node.right
+        if key <= x_node.key:
+            l_root, l_bh, r_root, r_bh = self.__split(left, child_bh, key)
+            right, right_bh = self.__expose(right, child_bh)
+            r_root, r_bh = self.__join(r_root, r_bh, x_node, right, right_bh)
+        else:
+            l_root, l_bh, r_root, r_bh = self.__split(right, child_bh, key)
+            left, left_bh = self.__expose(left, child_bh)
+            l_root, l_bh = self.__join(left, left_bh, x_node, l_root, l_bh)
+        return l_root, l_bh, r_root, r_bh
+
+    def __split3(self, x_node, bh, key):
+        # As __split, but a node with key is taken apart: (l_root, l_bh, node or dummy, r_root, r_bh)
+        dummy = self.dummy
+        if x_node == dummy:
+            return dummy, 0, dummy, dummy, 0
+        child_bh = bh - 1 if x_node.color == BLACK else bh
+        left, right = x_node.left, x_node.right
+        if key < x_node.key:
+            l_root, l_bh, m_node, r_root, r_bh = self.__split3(left, child_bh, key)
+            right, right_bh = self.__expose(right, child_bh)
+            r_root, r_bh = self.__join(r_root, r_bh, x_node, right, right_bh)
+        elif x_node.key < key:
+            l_root, l_bh, m_node, r_root, r_bh = self.__split3(right, child_bh, key)
+            left, left_bh = self.__expose(left, child_bh)
+            l_root, l_bh = self.__join(left, left_bh, x_node, l_root, l_bh)
+        else:
+            l_root, l_bh = self.__expose(left, child_bh)
+            r_root, r_bh = self.__expose(right, child_bh)
+            m_node = x_node
+        return l_root, l_bh, m_node, r_root, r_bh
+
+    def __replace(self, x_node, z_node):
+        # put z_node in the place of x_node
+        z_node.parent, z_node.left, z_node.right = x_node.parent, x_node.left, x_node.right
+        z_node.color, z_node.size = x_node.color, x_node.size
+        if x_node.parent == self.dummy:
+            self.root = z_node
+        elif x_node.parent.left == x_node:
+            x_node.parent.left = z_node
+        else:
+            x_node.parent.right = z_node
+        if x_node.left != self.dummy:
+            x_node.left.parent = z_node
+        if x_node.right != self.dummy:
+            x_node.right.parent = z_node
+        # same subtree, but another value: the monoid state up to the root changes
+        if self.order_statistics:
+            self.update_path(z_node)
+
+    def __union(self, a_root, a_bh, b_root, b_bh, keep_b):
+        # splits b by the keys of a; on equal keys keep the node of b if keep_b, else the one of a
+        dummy = self.dummy
+        if a_root == dummy:
+            return b_root, b_bh
+        if b_root == dummy:
+            return a_root, a_bh
+        if a_root.left == dummy and a_root.right == dummy:
+            # a single key left: a plain insert is cheaper than splitting and joining
+            self.root = b_root
+            x_node = self.find(b_root, a_root.key)
+            if x_node == dummy:
+                a_root.color = RED
+                grew = self.__insert_below(b_root, a_root)
+                return self.root, b_bh + (1 if grew else 0)
+            if not keep_b:
+                self.__replace(x_node, a_root)
+            return self.root, b_bh
+        left, right = a_root.left, a_root.right
+        l_root, l_bh, m_node, r_root, r_bh = self.__split3(b_root, b_bh, a_root.key)
+        left, left_bh = self.__expose(left, a_bh - 1)
+        right, right_bh = self.__expose(right, a_bh - 1)
+        l_root, l_bh = self.__union(left, left_bh, l_root, l_bh, keep_b)
+        r_root, r_bh = self.__union(right, right_bh, r_root, r_bh, keep_b)
+        pivot = m_node if keep_b and m_node != self.dummy else a_root
+        return self.__join(l_root, l_bh, pivot, r_root, r_bh)
+
+    def __intersection(self, a_root, a_bh, b_root, b_bh, keep_b):
+        dummy = self.dummy
+        if a_root == dummy or b_root == dummy:
+            return dummy, 0
+        if a_root.left == dummy and a_root.right == dummy:
+            x_node = self.find(b_root, a_root.key)
+            if x_node == dummy:
+                return dummy, 0
+            z_node = x_node if keep_b else a_root
+            z_node.left = z_node.right = dummy
+            z_node.parent = dummy
+            z_node.color = BLACK
+            if self.order_statistics:
+                self.update(z_node)
+            return z_node, 1
+        left, right = a_root.left, a_root.right
+        l_root, l_bh, m_node, r_root, r_bh = self.__split3(b_root, b_bh, a_root.key)
+        left, left_bh = self.__expose(left, a_bh - 1)
+        right, right_bh = self.__expose(right, a_bh - 1)
+        l_root, l_bh = self.__intersection(left, left_bh, l_root, l_bh, keep_b)
+        r_root, r_bh = self.__intersection(right, right_bh, r_root, r_bh, keep_b)
+        if m_node == self.dummy:
+            return self.__join2(l_root, l_bh, r_root, r_bh)
+        return self.__join(l_root, l_bh, m_node if keep_b else a_root, r_root, r_bh)
+
+    def __difference(self, a_root, a_bh, b_root, b_bh):
+        # keys of a that are not in b, splitting a by the keys of b
+        dummy = self.dummy
+        if a_root == dummy or b_root == dummy:
+            return a_root, a_bh
+        if b_root.left == dummy and b_root.right == dummy:
+            x_node = self.find(a_root, b_root.key)
+            if x_node == dummy:
+                return a_root, a_bh
+            self.root = a_root
+            self.__delete(x_node)
+            return self.root, self.__black_height(self.root)
+        left, right = b_root.left, b_root.right
+        l_root, l_bh, m_node, r_root, r_bh = self.__split3(a_root, a_bh, b_root.key)
+        left, left_bh = self.__expose(left, b_bh - 1)
+        right, right_bh = self.__expose(right, b_bh - 1)
+        l_root, l_bh = self.__difference(l_root, l_bh, left, left_bh)
+        r_root, r_bh = self.__difference(r_root, r_bh, right, right_bh)
+        return self.__join2(l_root, l_bh, r_root, r_bh)
+
+    def __adopt(self, other):
+        # make other use the dummy of this tree, in O(len(other))
+        assert self.order_statistics == other.order_statistics and self.monoid is other.monoid
+        if other.dummy is self.dummy:
+            return
+        old = other.dummy
+        for x_node in list(other.__node_range()):
+            if x_node.left is old:
+                x_node.left = self.dummy
+            if x_node.right is old:
+                x_node.right = self.dummy
+        if other.root is old:
+            other.root = self.dummy
+        else:
+            other.root.parent = self.dummy
+        other.dummy = self.dummy
+
+    def __new_tree(self, root):
+        # tree with the same options and dummy as this one
+        tree = copy.copy(self)
+        tree.root = root
+        tree.min_node = tree.max_node = None
+        tree.frozen = tree.written = None
+        if root != self.dummy:
+            root.parent = self.dummy
+            root.color = BLACK
+        if self.order_statistics:
+            tree.n_keys = root.size
+            tree.n_keys_valid = True
+        else:
+            tree.n_keys_valid = root == self.dummy
+            tree.n_keys = 0
+        return tree
+
+    def __clear(self):
+        self.root = self.dummy
+        self.min_node = self.max_node = None
+        self.written = None
+        self.n_keys = 0
+        self.n_keys_valid = True
+
+    def __roots(self, other):
+        # black-rooted roots and black heights of both trees, once they share a dummy
+        if other.dummy is not self.dummy:
+            if self.n_keys_valid and other.n_keys_valid and len(self) < len(other):
+                other.__adopt(self)
+            else:
+                self.__adopt(other)
+        a_root, b_root = self.root, other.root
+        return a_root, self.__black_height(a_root), b_root, self.__black_height(b_root)
+
+    def __smaller(self, other):
+        # recursing on the smaller tree is what keeps the set operations cheap, but do not count
+        # the nodes for it
+        if self.n_keys_valid and other.n_keys_valid:
+            return len(self) <= len(other)
+        return True
+
+    def split(self, key):
+        '''
+            Split in two trees, with the keys < key and the keys >= key, in O(log n). This tree is
+            left empty; its nodes are moved to the new trees.
+        '''
+        l_root, l_bh, r_root, r_bh = self.__split(self.root, self.__black_height(self.root), key)
+        left, right = self.__new_tree(l_root), self.__new_tree(r_root)
+        self.__clear()
+        return left, right
+
+    def sibling(self):
+        '''
+            Empty tree with the options and the dummy of this one, so that join and the set
+            operations between the two need no relinking. Trees sharing a dummy must not be
+            written by two threads at once.
+        '''
+        return self.__new_tree(self.dummy)
+
+    @staticmethod
+    def join(left, z_node, right):
+        '''
+            Tree with the keys of left, the node z_node and the keys of right, where the keys of
+            left <= z_node.key <= the keys of right. O(log n) when both trees share the dummy
+            (they come from split or sibling of the same tree), else O(size of the smaller tree)
+            to relink it first. left and right are left empty.
+        '''
+        a_root, a_bh, b_root, b_bh = left.__roots(right)
+        assert a_root == left.dummy or left.maximum(a_root).key <= z_node.key
+        assert b_root == left.dummy or z_node.key <= left.minimum(b_root).key
+        n_keys = len(left) + len(right) + 1 if left.n_keys_valid and right.n_keys_valid else None
+        root, bh = left.__join(a_root, a_bh, z_node, b_root, b_bh)
+        tree = left.__new_tree(root)
+        if n_keys is not None:
+            tree.n_keys = n_keys
+            tree.n_keys_valid = True
+        left.__clear()
+        right.__clear()
+        return tree
+
+# The set operations see each tree as a set: with duplicated keys, only one node per key takes
+# part. On equal keys the node (and value) of this tree is kept. Both trees are left empty.
+# When both sizes are known and within rebuild_ratio of each other, merging the two in-order
+# node sequences and relinking them (O(n + m)) beats the recursion, as for the batches. Below that
+# ratio, the keys of the smaller tree are inserted into, looked up in or deleted from the bigger
+# one with finger searches (as the batches): also O(m log(n / m)), but measured two to three times
+# faster than splitting and joining at every ratio (see bench_split_join.py). The recursion is
+# left for trees whose size is not known (split without order_statistics), since it needs none.
+    def __comparable(self, other):
+        if not (self.n_keys_valid and other.n_keys_valid):
+            return False
+        return min(len(self), len(other)) >= self.rebuild_ratio * max(len(self), len(other))
+
+    def __absorb(self, nodes, replace):
+        # Insert the nodes of another tree (in key order) with finger searches. A node whose key
+        # is already here replaces the node of this tree if replace, else is dropped.
+        dummy = self.dummy
+        fingers = self.__fingers(len(nodes))
+        finger = dummy
+        for z_node in nodes:
+            key = z_node.key
+            start = self.__finger_start(finger, key) if fingers else self.root
+            x_node = start
+            while x_node != dummy and x_node.key != key:
+                if key < x_node.key:
+                    x_node = x_node.left
+                else:
+                    x_node = x_node.right
+            if x_node != dummy:
+                if replace:
+                    self.__replace(x_node, z_node)
+                    x_node = z_node
+                finger = x_node
+                continue
+            z_node.left = z_node.right = dummy
+            z_node.color = RED
+            z_node.size = 1
+            self.__insert_below(start, z_node)
+            finger = z_node
+
+    def __finger_result(self, other, nodes):
+        # tree of the nodes (in key order) picked from self and other by finger searches
+        tree = self.__new_tree(self.dummy)
+        tree.__load_sorted(nodes, len(nodes))
+        self.__clear()
+        other.__clear()
+        return tree
+
+    def __distinct_nodes(self):
+        # nodes in key order, the first one of each key
+        nodes = []
+        for x_node in self.__node_range():
+            if not nodes or nodes[-1].key != x_node.key:
+                nodes.append(x_node)
+        return nodes
+
+    def __finger_union(self, other):
+        if len(self) < len(other):
+            big = other
+            big.__absorb(self.__distinct_nodes(), True)
+        else:
+            big = self
+            big.__absorb(other.__distinct_nodes(), False)
+        tree = big.__new_tree(big.root)
+        tree.n_keys = big.n_keys
+        tree.n_keys_valid = True
+        self.__clear()
+        other.__clear()
+        return tree
+
+    def __finger_intersection(self, other):
+        if len(self) < len(other):
+            nodes = self.__distinct_nodes()
+            found = other.find_many([x_node.key for x_node in nodes])
+            nodes = [x_node for x_node, y_node in zip(nodes, found) if y_node != other.dummy]
+        else:
+            found = self.find_many([x_node.key for x_node in other.__distinct_nodes()])
+            nodes = [y_node for y_node in found if y_node != self.dummy]
+        return self.__finger_result(other, nodes)
+
+    def __finger_difference(self, other):
+        if len(self) < len(other):
+            nodes = self.__distinct_nodes()
+            found = other.find_many([x_node.key for x_node in nodes])
+            nodes = [x_node for x_node, y_node in zip(nodes, found) if y_node == other.dummy]
+            return self.__finger_result(other, nodes)
+        self.delete_many([x_node.key for x_node in other.__distinct_nodes()])
+        tree = self.__new_tree(self.root)
+        tree.n_keys = self.n_keys
+        tree.n_keys_valid = True
+        self.__clear()
+        other.__clear()
+        return tree
+
+    def __merge(self, other, only_self, only_other, both):
+        nodes = []
+        a_nodes, b_nodes = self.__node_range(), other.__node_range()
+        a_node, b_node = next(a_nodes, None), next(b_nodes, None)
+        while a_node is not None and b_node is not None:
+            if a_node.key < b_node.key:
+                if only_self:
+                    nodes.append(a_node)
+                a_node = next(a_nodes, None)
+            elif b_node.key < a_node.key:
+                if only_other:
+                    nodes.append(b_node)
+                b_node = next(b_nodes, None)
+            else:
+                if both:
+                    nodes.append(a_node)
+                a_node, b_node = next(a_nodes, None), next(b_nodes, None)
+        if only_self and a_node is not None:
+            nodes.append(a_node)
+            nodes.extend(a_nodes)
+        if only_other and b_node is not None:
+            nodes.append(b_node)
+            nodes.extend(b_nodes)
+        tree = self.__new_tree(self.dummy)
+        tree.__load_sorted(nodes, len(nodes))
+        self.__clear()
+        other.__clear()
+        return tree
+
+    def __result(self, other, root):
+        tree = self.__new_tree(root)
+        self.__clear()
+        other.__clear()
+        return tree
+
+    def union(self, other):
+        '''
+            Tree with the keys of both trees
+        '''
+        if self.__comparable(other):
+            return self.__merge(other, True, True, True)
+        if self.n_keys_valid and other.n_keys_valid:
+            return self.__finger_union(other)
+        a_root, a_bh, b_root, b_bh = self.__roots(other)
+        if self.__smaller(other):
+            root, bh = self.__union(a_root, a_bh, b_root, b_bh, False)
+        else:
+            root, bh = self.__union(b_root, b_bh, a_root, a_bh, True)
+        return self.__result(other, root)
+
+    def intersection(self, other):
+        '''
+            Tree with the keys that are in both trees
+        '''
+        if self.__comparable(other):
+            return self.__merge(other, False, False, True)
+        if self.n_keys_valid and other.n_keys_valid:
+            return self.__finger_intersection(other)
+        a_root, a_bh, b_root, b_bh = self.__roots(other)
+        if self.__smaller(other):
+            root, bh = self.__intersection(a_root, a_bh, b_root, b_bh, False)
+        else:
+            root, bh = self.__intersection(b_root, b_bh, a_root, a_bh, True)
+        return self.__result(other, root)
+
+    def difference(self, other):
+        '''
+            Tree with the keys of this tree that are not in other
+        '''
+        if self.__comparable(other):
+            return self.__merge(other, True, False, False)
+        if self.n_keys_valid and other.n_keys_valid:
+            return self.__finger_difference(other)
+        a_root, a_bh, b_root, b_bh = self.__roots(other)
+        root, bh = self.__difference(a_root, a_bh, b_root, b_bh)
+        return self.__result(other, root)
+
     def find(self, node, value):
         while node != self.dummy and node.key != value:
             if value < node.key: 
@@ -229,6 +1376,48 @@ class Rb_tree():
 
         return node 
 
+    def __contains__(self, key):
+        return self.find(self.root, key) != self.dummy
+
+    def get(self, key, default=None):
+        x_node = self.find(self.root, key)
+        return x_node.value if x_node != self.dummy else default
+
+    def upsert(self, key, value):
+        '''
+            Set the value of key, inserting it if it is not in the tree yet. Returns its node.
+        '''
+        x_node = self.find(self.root, key)
+        if x_node != self.dummy:
+            x_node.value = value
+            if self.monoid is not None:
+                self.update_path(x_node)
+            if self.written is not None:
+                self.__record(key)
+        else:
+            x_node = self.create_node(key, value)
+            self.insert(x_node)
+        return x_node
+
+    def setdefault(self, key, default=None):
+        x_node = self.find(self.root, key)
+        if x_node == self.dummy:
+            x_node = self.create_node(key, default)
+            self.insert(x_node)
+        return x_node.value
+
+    def pop(self, key, *default):
+        '''
+            Delete key and return its value. Without a default, a missing key raises KeyError.
+        '''
+        x_node = self.find(self.root, key)
+        if x_node == self.dummy:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self.delete(x_node)
+        return x_node.value
+
     def create_dummy_node(self, parent_node, direction):
         assert direction == 'r' or direction == 'l'
         x_node = DummyNode()
@@ -242,6 +1431,24 @@ class Rb_tree():
 
 
     def delete(self, z_node):
+        self.__delete(z_node)
+        if self.debug:
+            self.validate()
+
+    def __delete(self, z_node):
+        # delete without the debug check, split and join use it on trees that are half built
+        self.n_keys -= 1
+        if self.written is not None:
+            self.__record(z_node.key)
+        # the nodes are moved, not their keys: the cached nodes only change when they go
+        if z_node is self.min_node:
+            self.min_node = self.successor(z_node)
+            if self.min_node == self.dummy:
+                self.min_node = None
+        if z_node is self.max_node:
+            self.max_node = self.predecessor(z_node)
+            if self.max_node == self.dummy:
+                self.max_node = None
         original_color = z_node.color
         x_node = z_node
         y_node = z_node
@@ -269,44 +1476,47 @@ class Rb_tree():
             y_node.left.parent = y_node
             y_node.color = z_node.color
 
-        if original_color == 'Black':
+        # x_node.parent is the lowest node whose subtree lost a node (set even for the dummy)
+        if self.order_statistics:
+            self.update_path(x_node.parent)
+
+        if original_color == BLACK:
             self.delete_fixup(x_node)
 
     def delete_fixup(self, x_node):
-        while x_node != self.root and x_node.color == 'Black':
+        while x_node != self.root and x_node.color == BLACK:
             if x_node == x_node.parent.left:
                 w_node = x_node.parent.right
                 # Case 1: x's sibling is Red
-                if w_node.color == 'Red': 
-                    w_node.color = 'Black'
-                    x_node.parent.color = 'Red'
+                if w_node.color == RED: 
+                    self.count_case('delete_case_1')
+                    w_node.color = BLACK
+                    x_node.parent.color = RED
                     self.left_rotate(x_node.parent)
                     w_node = x_node.parent.right
 
-                assert w_node.color == 'Black'
                 #Case 2: x's siblings nodes are both black and w itself is black
-                if w_node.left.color =='Black' and w_node.right.color =='Black': 
-                   w_node.color = 'Red'
-                   # if we come from case 1, this will terminate, as x_node.parent == 'Red'
+                if w_node.left.color ==BLACK and w_node.right.color ==BLACK: 
+                   self.count_case('delete_case_2')
+                   w_node.color = RED
+                   # if we come from case 1, this will terminate, as x_node.parent == RED
                    # else, spread the problem to upper levels in the tree (maybe left and right 
                    # branch decompensated after removing a black node in the left branch
                    x_node = x_node.parent
                 else: 
                     #Case 3: x's sibling w is black w.left = red and w.right = black
-                    if  w_node.right.color == 'Black':
-                        assert w_node.color ==  'Black'
-                        assert w_node.left.color ==  'Red'
-                        w_node.left.color = 'Black'
-                        w_node.color = 'Red'
+                    if  w_node.right.color == BLACK:
+                        self.count_case('delete_case_3')
+                        w_node.left.color = BLACK
+                        w_node.color = RED
                         self.right_rotate(w_node)
                         w_node = x_node.parent.right
                     #Case 4: x's sibling is black and w's right child is red
-                    assert w_node.color == 'Black'
-                    assert w_node.right.color == 'Red'
+                    self.count_case('delete_case_4')
                     w_node.color = x_node.parent.color
-                    x_node.parent.color = 'Black'
-                    # since w_node.right.color == 'Red' we insert a new black in the w_node path, changing the color
-                    w_node.right.color = 'Black'
+                    x_node.parent.color = BLACK
+                    # since w_node.right.color == RED we insert a new black in the w_node path, changing the color
+                    w_node.right.color = BLACK
                     # the rotation adds one black in the x_node path and deletes one in w_node path
                     # as a result, after the function, the x_node path gets one extra black and the w_node 
                     #path ends with the same number of blacks +1, -1
@@ -316,38 +1526,35 @@ class Rb_tree():
             else:
                 w_node = x_node.parent.left
                 # Case 1: x's sibling is Red
-                if w_node.color == 'Red': 
-                    w_node.color = 'Black'
-                    x_node.parent.color = 'Red'
+                if w_node.color == RED: 
+                    self.count_case('delete_case_1')
+                    w_node.color = BLACK
+                    x_node.parent.color = RED
                     self.right_rotate(x_node.parent)
                     w_node = x_node.parent.left
 
-                assert w_node.color == 'Black'
-                if w_node == self.dummy:
-                    pdb.set_trace()
                 #Case 2: x's siblings nodes are both black and w itself is black
-                if w_node.left.color=='Black' and w_node.right.color == 'Black': 
-                   w_node.color = 'Red'
+                if w_node.left.color==BLACK and w_node.right.color == BLACK: 
+                   self.count_case('delete_case_2')
+                   w_node.color = RED
                    x_node = x_node.parent
                 else: 
                     #Case 3: x's sibling w is black w.left = red and w.right = black
-                    if w_node.left.color == 'Black':
-                        assert w_node.color ==  'Black'
-                        assert w_node.right.color ==  'Red'
-                        w_node.right.color = 'Black'
-                        w_node.color = 'Red'
+                    if w_node.left.color == BLACK:
+                        self.count_case('delete_case_3')
+                        w_node.right.color = BLACK
+                        w_node.color = RED
                         self.left_rotate(w_node)
                         w_node = x_node.parent.left
                     #Case 4: x's sibling is black and w's left child is red
-                    assert w_node.color == 'Black'
-                    assert w_node.left.color == 'Red'
+                    self.count_case('delete_case_4')
                     w_node.color = x_node.parent.color
-                    x_node.parent.color = 'Black'
-                    w_node.left.color = 'Black'
+                    x_node.parent.color = BLACK
+                    w_node.left.color = BLACK
                     self.right_rotate(x_node.parent)
                     x_node = self.root
 
-        x_node.color = 'Black'
+        x_node.color = BLACK
 
 
 
@@ -362,7 +1569,6 @@ if __name__ == "__main__":
     odd = True
     for v in x:
         if odd == True:
-            print 'delete node = ' + str(v)
             node_del = rb_tree.find(rb_tree.root,v)
             assert node_del != rb_tree.dummy
             rb_tree.delete(node_del)
@@ -370,4 +1576,5 @@ if __name__ == "__main__":
         else:
             odd = True
 
-    rb_tree.in_order_traversal(rb_tree.root)
+    # timings live in benchmarks/, this only checks the result
+    print('keys = ' + str(len(rb_tree)) + ' black height = ' + str(rb_tree.validate()))
@@ -0,0 +1,261 @@
+'''
+    Range-sharded tree: the key space is cut at a sorted list of bounds and every range is served
+    by its own worker process, which owns an Rb_tree (rb_tree.py by default). The front end
+    (ShardedTree) only keeps the bounds and routes every key with a binary search.
+
+    Writes are queued per shard and sent in batches (flush, or batch_size writes to one shard),
+    so that the shards apply them in parallel; any read of a shard first flushes its queue. Lookups
+    in bulk (get_many) are sent to all the shards involved before any answer is awaited.
+
+    The ranges do not overlap, so a range scan is the concatenation of the scans of the shards, in
+    the order of the bounds. items(lo, hi) asks every shard in the range for its first chunk at
+    once, then yields lazily and fetches the next chunks as it goes. A chunk is asked for by key
+    (the items after the last key seen), so the shards keep no state between two chunks: writes,
+    splits and other scans can go on in between.
+
+    With max_shard_size, a shard that grows past it after a batch is split at its median key: the
+    worker finds the median (Rb_tree.select, O(log n), with order_statistics=True in the options,
+    else a walk over half the keys, O(n)), splits its tree (Rb_tree.split, O(log n)), keeps the
+    lower half and dumps the upper one (Rb_tree.dump, O(n)), and a new worker loads that file for
+    the new range (Rb_tree.load, O(n)). A split is O(n) in all: the upper half has to be moved to
+    the new process anyway.
+
+    The worker processes are started with multiprocessing and stopped by close().
+'''
+
+import bisect
+import itertools
+import multiprocessing
+import os
+import tempfile
+
+import rb_tree
+
+def _apply(tree, op, args):
+    if op == 'write':
+        for key, value, delete in args[0]:
+            if delete:
+                tree.pop(key, None)
+            else:
+                tree.upsert(key, value)
+        return len(tree)
+    if op == 'get_many':
+        return [(key in tree, tree.get(key)) for key in args[0]]
+    if op == 'scan':
+        # up to n items of [lo, hi), after the key after (if any)
+        after, lo, hi, n = args
+        items = tree.items(lo if after is None else after, hi)
+        if after is not None:
+            items = itertools.dropwhile(lambda item: item[0] == after, items)
+        return list(itertools.islice(items, n))
+    if op == 'len':
+        return len(tree)
+    raise ValueError('unknown request ' + repr(op))
+
+def _serve(conn, engine, options, path):
+    # Worker: owns one tree, answers (op, args) requests with ('ok', result) or ('error', exception)
+    if path is None:
+        tree = engine(**options)
+    else:
+        tree = engine.load(path, **options)
+        os.remove(path)
+    while True:
+        op, args = conn.recv()
+        if op == 'close':
+            conn.close()
+            return
+        try:
+            if op == 'split':
+                if tree.order_statistics:
+                    key = tree.select(len(tree) // 2).key
+                else:
+                    key = next(itertools.islice(tree.keys(), len(tree) // 2, None))
+                tree, upper = tree.split(key)
+                fd, path = tempfile.mkstemp(suffix='.rbt')
+                os.close(fd)
+                upper.dump(path)
+                result = key, path, len(tree), len(upper)
+                del upper
+            else:
+                result = _apply(tree, op, args)
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', e))
+
+class Shard():
+    '''
+        Front end side of one worker: the lower bound of its range and its queued writes
+    '''
+    def __init__(self, lo, engine, options, path=None):
+        self.lo = lo
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child, engine, options, path))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        # (key, value, delete) in order
+        self.pending = []
+        # number of keys after the last batch
+        self.size = 0
+
+    def send(self, op, *args):
+        self.conn.send((op, args))
+
+    def receive(self):
+        status, result = self.conn.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def call(self, op, *args):
+        self.send(op, *args)
+        return self.receive()
+
+    def close(self):
+        self.send('close')
+        self.process.join()
+        self.conn.close()
+
+class ShardedTree():
+    def __init__(self, bounds=(), max_shard_size=None, batch_size=1024, engine=rb_tree.Rb_tree, **options):
+        '''
+            bounds: keys where the shards start (one shard more than bounds)
+            max_shard_size: split a shard that grows past it, None to keep the shards as they are
+            batch_size: writes queued for a shard before they are sent
+            engine: tree class of the workers (with split() for max_shard_size), options go to
+                    its constructor
+        '''
+        self.engine = engine
+        self.options = options
+        self.max_shard_size = max_shard_size
+        self.batch_size = batch_size
+        self.bounds = sorted(bounds)
+        self.n_splits = 0
+        self.shards = [Shard(lo, engine, options) for lo in [None] + self.bounds]
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __shard(self, key):
+        return self.shards[bisect.bisect_right(self.bounds, key)]
+
+    def upsert(self, key, value):
+        self.__queue(key, value, False)
+
+    def delete(self, key):
+        '''
+            Remove key, if present
+        '''
+        self.__queue(key, None, True)
+
+    def __queue(self, key, value, delete):
+        shard = self.__shard(key)
+        shard.pending.append((key, value, delete))
+        if len(shard.pending) >= self.batch_size:
+            self.__flush([shard])
+
+    def flush(self):
+        '''
+            Send the queued writes of all the shards, and wait until they are applied
+        '''
+        self.__flush(self.shards)
+
+    def __flush(self, shards):
+        shards = [shard for shard in shards if shard.pending]
+        for shard in shards:
+            shard.send('write', shard.pending)
+            shard.pending = []
+        for shard in shards:
+            shard.size = shard.receive()
+        if self.max_shard_size is not None:
+            for shard in shards:
+                if shard.size > self.max_shard_size:
+                    self.__split(shard)
+
+    def __split(self, shard):
+        key, path, lower_size, upper_size = shard.call('split')
+        upper = Shard(key, self.engine, self.options, path)
+        shard.size, upper.size = lower_size, upper_size
+        i = self.shards.index(shard)
+        self.shards.insert(i + 1, upper)
+        self.bounds.insert(i, key)
+        self.n_splits += 1
+
+    def get_many(self, keys):
+        '''
+            Values of keys (None when missing), asking all the shards concerned at the same time
+        '''
+        # flushing may split shards, group the keys afterwards
+        self.__flush(set(self.__shard(key) for key in keys))
+        by_shard = {}
+        for i, key in enumerate(keys):
+            by_shard.setdefault(bisect.bisect_right(self.bounds, key), []).append(i)
+        for s, positions in by_shard.items():
+            self.shards[s].send('get_many', [keys[i] for i in positions])
+        values = [None] * len(keys)
+        for s, positions in by_shard.items():
+            for i, (found, value) in zip(positions, self.shards[s].receive()):
+                values[i] = value
+        return values
+
+    def get(self, key, default=None):
+        self.__flush([self.__shard(key)])
+        shard = self.__shard(key)
+        found, value = shard.call('get_many', [key])[0]
+        return value if found else default
+
+    def __contains__(self, key):
+        self.__flush([self.__shard(key)])
+        shard = self.__shard(key)
+        return shard.call('get_many', [key])[0][0]
+
+    def __len__(self):
+        self.flush()
+        for shard in self.shards:
+            shard.send('len')
+        return sum(shard.receive() for shard in self.shards)
+
+    def items(self, lo=None, hi=None, chunk_size=1024):
+        '''
+            (key, value) pairs of the keys in [lo, hi), lazily. None leaves that end open. Keys
+            written while the scan runs may or may not be seen.
+        '''
+        self.flush()
+        i = 0 if lo is None else bisect.bisect_right(self.bounds, lo)
+        last = len(self.shards) if hi is None else bisect.bisect_left(self.bounds, hi) + 1
+        shards = self.shards[i:last]
+        for shard in shards:
+            shard.send('scan', None, lo, hi, chunk_size)
+        prefetched = dict((shard, shard.receive()) for shard in shards)
+        n_splits = self.n_splits
+        # last key yielded: each chunk starts after it, whichever shard holds the keys by then
+        after = None
+        while i < len(self.shards) and (hi is None or self.shards[i].lo is None or self.shards[i].lo < hi):
+            shard = self.shards[i]
+            chunk = prefetched.pop(shard, None) if self.n_splits == n_splits else None
+            if chunk is None:
+                chunk = shard.call('scan', after, lo, hi, chunk_size)
+            while True:
+                for item in chunk:
+                    yield item
+                if chunk:
+                    after = chunk[-1][0]
+                if len(chunk) < chunk_size:
+                    break
+                chunk = shard.call('scan', after, lo, hi, chunk_size)
+            # a split meanwhile puts the rest of this range in the next shard
+            i = self.shards.index(shard) + 1
+
+    def keys(self, lo=None, hi=None):
+        return (key for key, value in self.items(lo, hi))
+
+    def __iter__(self):
+        return self.keys()
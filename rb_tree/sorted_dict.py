@@ -0,0 +1,116 @@
+'''
+    Sorted dictionary on top of one of the red-black trees.
+
+    SortedDict behaves like a dict (it is a MutableMapping) whose iteration order is the key order.
+    Lookups, updates and deletes are O(log n) and range iteration (irange) is lazy. The storage
+    engine is the LLRB tree (ll_rb_tree.py) by default, or any tree class with the same mapping
+    methods, like the CLRS one (rb_tree.py).
+'''
+
+try:
+    from collections.abc import MutableMapping, KeysView, ValuesView, ItemsView
+except ImportError:
+    from collections import MutableMapping, KeysView, ValuesView, ItemsView
+
+import ll_rb_tree
+
+_missing = object()
+
+class SortedKeysView(KeysView):
+    def __iter__(self):
+        return self._mapping.tree.keys()
+
+    def __reversed__(self):
+        return reversed(self._mapping.tree)
+
+class SortedValuesView(ValuesView):
+    def __iter__(self):
+        return self._mapping.tree.values()
+
+class SortedItemsView(ItemsView):
+    def __iter__(self):
+        return self._mapping.tree.items()
+
+class SortedDict(MutableMapping):
+    def __init__(self, items=(), engine=ll_rb_tree.Rb_tree, **options):
+        '''
+            items: mapping or iterable of (key, value) pairs to start with
+            engine: tree class used as storage, options are passed to its constructor
+        '''
+        self.engine = engine
+        self.options = options
+        self.tree = engine(**options)
+        self.update(items)
+
+    def __getitem__(self, key):
+        value = self.tree.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.tree.upsert(key, value)
+
+    def __delitem__(self, key):
+        self.tree.pop(key)
+
+    def __contains__(self, key):
+        return key in self.tree
+
+    def __iter__(self):
+        return self.tree.keys()
+
+    def __reversed__(self):
+        return reversed(self.tree)
+
+    def __len__(self):
+        return len(self.tree)
+
+    def __repr__(self):
+        return 'SortedDict({' + ', '.join(repr(k) + ': ' + repr(v) for k, v in self.tree.items()) + '})'
+
+    def get(self, key, default=None):
+        return self.tree.get(key, default)
+
+    def pop(self, key, *default):
+        return self.tree.pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        return self.tree.setdefault(key, default)
+
+    def clear(self):
+        self.tree = self.engine(**self.options)
+
+    def keys(self):
+        return SortedKeysView(self)
+
+    def values(self):
+        return SortedValuesView(self)
+
+    def items(self):
+        return SortedItemsView(self)
+
+    def irange(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi), lazily. None leaves that end of the range open.
+        '''
+        return self.tree.keys(lo, hi)
+
+    def irange_items(self, lo=None, hi=None):
+        '''
+            (key, value) pairs of the keys in [lo, hi), lazily
+        '''
+        return self.tree.items(lo, hi)
+
+
+if __name__ == "__main__":
+    import rb_tree
+
+    for engine in (ll_rb_tree.Rb_tree, rb_tree.Rb_tree):
+        d = SortedDict(engine=engine)
+        for k in [44, 22, 3, 61, 34, 89, 79, 65, 5, 28]:
+            d[k] = str(k)
+        d[22] = 'twenty two'
+        del d[89]
+        print(repr(d))
+        print(str(list(d.irange(20, 62))))
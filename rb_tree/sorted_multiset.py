@@ -0,0 +1,126 @@
+'''
+    Sorted multiset on top of one of the red-black trees.
+
+    The trees themselves keep one node per key: the CLRS insert hangs an equal key to the right
+    (one node per copy, and find returns any of them), the LLRB insert replaces the value. Here a
+    key is stored once, with its number of copies as the value, so the memory and the height of the
+    tree depend on the number of distinct keys only, however skewed the data. Iteration yields
+    every key as many times as it is in the multiset, expanding the counts lazily.
+
+    count, add and discard are O(log d) for d distinct keys, len is O(1). The storage engine is the
+    LLRB tree (ll_rb_tree.py) by default, or any tree class with the same mapping methods, like the
+    CLRS one (rb_tree.py).
+'''
+
+import itertools
+
+import ll_rb_tree
+
+class SortedMultiset():
+    def __init__(self, keys=(), engine=ll_rb_tree.Rb_tree, **options):
+        '''
+            keys: iterable of keys, or mapping of keys to their counts, to start with
+            engine: tree class used as storage, options are passed to its constructor
+        '''
+        self.engine = engine
+        self.options = options
+        self.tree = engine(**options)
+        # total number of copies
+        self.size = 0
+        self.update(keys)
+
+    def update(self, keys):
+        '''
+            Add the keys of an iterable, or of a mapping of keys to counts
+        '''
+        if hasattr(keys, 'items'):
+            for key, n in keys.items():
+                self.add(key, n)
+        else:
+            for key in keys:
+                self.add(key)
+
+    def count(self, key):
+        '''
+            Number of copies of key (0 if it is not there)
+        '''
+        return self.tree.get(key, 0)
+
+    def add(self, key, n=1):
+        '''
+            Add n copies of key
+        '''
+        if n < 1:
+            raise ValueError('n must be at least 1, not ' + str(n))
+        self.tree.upsert(key, self.tree.get(key, 0) + n)
+        self.size += n
+
+    def discard(self, key, n=1):
+        '''
+            Remove n copies of key, or all of them if there are fewer (none if key is not there)
+        '''
+        if n < 1:
+            raise ValueError('n must be at least 1, not ' + str(n))
+        count = self.tree.get(key, 0)
+        if count > n:
+            self.tree.upsert(key, count - n)
+            self.size -= n
+        elif count:
+            self.tree.pop(key)
+            self.size -= count
+
+    def __contains__(self, key):
+        return key in self.tree
+
+    def __len__(self):
+        return self.size
+
+    def distinct(self):
+        '''
+            Number of distinct keys
+        '''
+        return len(self.tree)
+
+    def __iter__(self):
+        return self.irange()
+
+    def __reversed__(self):
+        return itertools.chain.from_iterable(itertools.repeat(key, n) for key, n in self.tree.reversed_items())
+
+    def __repr__(self):
+        return 'SortedMultiset({' + ', '.join(repr(k) + ': ' + repr(n) for k, n in self.tree.items()) + '})'
+
+    def clear(self):
+        self.tree = self.engine(**self.options)
+        self.size = 0
+
+    def irange(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi), each as many times as it is there, lazily. None leaves that end of
+            the range open.
+        '''
+        return itertools.chain.from_iterable(itertools.repeat(key, n) for key, n in self.tree.items(lo, hi))
+
+    def keys(self, lo=None, hi=None):
+        '''
+            Distinct keys in [lo, hi), lazily
+        '''
+        return self.tree.keys(lo, hi)
+
+    def items(self, lo=None, hi=None):
+        '''
+            (key, count) pairs of the distinct keys in [lo, hi), lazily
+        '''
+        return self.tree.items(lo, hi)
+
+
+if __name__ == "__main__":
+    import rb_tree
+
+    for engine in (ll_rb_tree.Rb_tree, rb_tree.Rb_tree):
+        s = SortedMultiset([44, 22, 3, 22, 61, 3, 22], engine=engine)
+        s.add(89, 1000000)
+        s.discard(3)
+        s.discard(61, 5)
+        print(repr(s) + ' len = ' + str(len(s)) + ' distinct = ' + str(s.distinct()))
+        print(str(list(s.irange(20, 45))))
@@ -0,0 +1,289 @@
+'''
+    Binary file format of the trees (Rb_tree.dump / Rb_tree.load in rb_tree.py and ll_rb_tree.py).
+
+    The nodes are written column by column, in key order: the keys, the values, the colors (one
+    byte per node, 1 for red) and the indexes of the left and right children (int32, -1 for
+    none), after a fixed header with the number of keys, the index of the root and the offset of
+    every column. Storing the shape lets load() relink the very same tree in O(n), without a
+    single comparison or rotation.
+
+    A column of ints (int64) or floats is stored as fixed-width little-endian numbers, a column of
+    str (utf-8) or bytes as n + 1 int64 offsets followed by the data, and anything else is
+    pickled, one object after the other, with the same offsets. A column of None values takes no
+    space at all.
+
+    MappedTree opens a file read-only through mmap and answers lookups and range queries straight
+    from the mapped buffer, by binary search over the sorted key column (struct.unpack_from), so
+    there are no per-node Python objects and opening a file costs the same whatever its size.
+'''
+
+import mmap
+import pickle
+import struct
+
+MAGIC = b'RBT1'
+
+# magic, key kind, value kind, left_leaning, number of keys, root index,
+# offsets of the key, value, color, left and right columns
+_HEADER = struct.Struct('<4scc?qqqqqqq')
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+_OFFSETS = struct.Struct('<qq')
+_CHILD = 'i'
+
+_INT_TYPES = set([int, type(2 ** 64)])
+_TEXT = type(u'')
+
+# items packed per struct.pack call, to keep the argument tuples small
+_CHUNK = 65536
+
+def _kind(items):
+    types = set(map(type, items))
+    if not types or types == set([type(None)]):
+        return b'n'
+    if types <= _INT_TYPES and -2 ** 63 <= min(items) and max(items) < 2 ** 63:
+        return b'q'
+    if types == set([float]):
+        return b'd'
+    if types == set([_TEXT]):
+        return b's'
+    if types == set([bytes]):
+        return b'b'
+    return b'p'
+
+def _encoder(kind):
+    if kind == b's':
+        return lambda item: item.encode('utf-8')
+    if kind == b'b':
+        return lambda item: item
+    return lambda item: pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+
+def _decoder(kind):
+    if kind == b's':
+        return lambda data: data.decode('utf-8')
+    if kind == b'b':
+        return bytes
+    return pickle.loads
+
+def _write_fixed(f, code, items):
+    for i in range(0, len(items), _CHUNK):
+        chunk = items[i:i + _CHUNK]
+        f.write(struct.pack('<%d%s' % (len(chunk), code), *chunk))
+
+def _write_column(f, kind, items):
+    # Write one column at the current position (8-aligned), return its offset
+    offset = f.tell()
+    if kind in (b'q', b'd'):
+        _write_fixed(f, kind.decode('ascii'), items)
+    elif kind != b'n':
+        encode = _encoder(kind)
+        data = [encode(item) for item in items]
+        offsets = [0]
+        for d in data:
+            offsets.append(offsets[-1] + len(d))
+        _write_fixed(f, 'q', offsets)
+        f.write(b''.join(data))
+    f.write(b'\0' * (-f.tell() % 8))
+    return offset
+
+def _columns(root, nil):
+    # Walk the tree in order, numbering the nodes. A node learns the index of its left child
+    # while it waits on the stack, and the index of its right child comes from the parent that
+    # is remembered while that subtree is walked.
+    keys, values, colors, lefts, rights = [], [], [], [], []
+    root_index = -1
+    # [node, index of the parent if node is a right child, index of the left child]
+    stack = []
+    x_node, right_of = root, -1
+    while True:
+        while x_node is not nil:
+            stack.append([x_node, right_of, -1])
+            x_node, right_of = x_node.left, -1
+        if not stack:
+            break
+        x_node, right_of, left = stack.pop()
+        i = len(keys)
+        keys.append(x_node.key)
+        values.append(x_node.value)
+        colors.append(1 if x_node.color else 0)
+        lefts.append(left)
+        rights.append(-1)
+        if right_of >= 0:
+            rights[right_of] = i
+        elif stack:
+            # pushed on the left spine of the node below it
+            stack[-1][2] = i
+        else:
+            root_index = i
+        x_node, right_of = x_node.right, i
+    return keys, values, colors, lefts, rights, root_index
+
+def dump(path, root, nil, left_leaning):
+    '''
+        Write the tree under root (nil is its empty child: the dummy or None) to path
+    '''
+    keys, values, colors, lefts, rights, root_index = _columns(root, nil)
+    key_kind = _kind(keys)
+    value_kind = _kind(values)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        f.write(b'\0' * (-f.tell() % 8))
+        key_offset = _write_column(f, key_kind, keys)
+        value_offset = _write_column(f, value_kind, values)
+        color_offset = f.tell()
+        f.write(bytearray(colors))
+        f.write(b'\0' * (-f.tell() % 8))
+        left_offset = f.tell()
+        _write_fixed(f, _CHILD, lefts)
+        right_offset = f.tell()
+        _write_fixed(f, _CHILD, rights)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, key_kind, value_kind, left_leaning, len(keys), root_index,
+                             key_offset, value_offset, color_offset, left_offset, right_offset))
+
+def _header(buf):
+    if len(buf) < _HEADER.size:
+        raise ValueError('not a tree file: too short')
+    header = _HEADER.unpack_from(buf, 0)
+    if header[0] != MAGIC:
+        raise ValueError('not a tree file: bad magic ' + repr(header[0]))
+    return header[1:]
+
+def _read_column(buf, kind, offset, n):
+    if kind == b'n':
+        return [None] * n
+    if kind in (b'q', b'd'):
+        return list(struct.unpack_from('<%d%s' % (n, kind.decode('ascii')), buf, offset))
+    offsets = struct.unpack_from('<%dq' % (n + 1), buf, offset)
+    start = offset + 8 * (n + 1)
+    decode = _decoder(kind)
+    return [decode(buf[start + offsets[i]:start + offsets[i + 1]]) for i in range(n)]
+
+def read(path):
+    '''
+        Columns of the file: keys, values, colors, lefts, rights (lists in key order), the root
+        index and whether the tree was left-leaning
+    '''
+    with open(path, 'rb') as f:
+        buf = f.read()
+    key_kind, value_kind, left_leaning, n, root, key_offset, value_offset, color_offset, \
+        left_offset, right_offset = _header(buf)
+    keys = _read_column(buf, key_kind, key_offset, n)
+    values = _read_column(buf, value_kind, value_offset, n)
+    colors = bytearray(buf[color_offset:color_offset + n])
+    lefts = struct.unpack_from('<%d%s' % (n, _CHILD), buf, left_offset)
+    rights = struct.unpack_from('<%d%s' % (n, _CHILD), buf, right_offset)
+    return keys, values, colors, lefts, rights, root, left_leaning
+
+class MappedTree():
+    '''
+        Read-only tree over a file written by dump(), through mmap. Key number i (in order) is read
+        from the buffer when it is needed, so a lookup decodes O(log n) keys and nothing else.
+    '''
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.key_kind, self.value_kind, self.left_leaning, self.n_keys, root, self.key_offset, \
+            self.value_offset = _header(self.buf)[:7]
+        self.key = self.__reader(self.key_kind, self.key_offset)
+        self.value = self.__reader(self.value_kind, self.value_offset)
+
+    def __reader(self, kind, offset):
+        # Function returning item number i of a column
+        buf = self.buf
+        if kind == b'n':
+            return lambda i: None
+        if kind == b'q':
+            unpack = _INT64.unpack_from
+            return lambda i: unpack(buf, offset + 8 * i)[0]
+        if kind == b'd':
+            unpack = _FLOAT64.unpack_from
+            return lambda i: unpack(buf, offset + 8 * i)[0]
+        unpack = _OFFSETS.unpack_from
+        start = offset + 8 * (self.n_keys + 1)
+        decode = _decoder(kind)
+
+        def item(i):
+            lo, hi = unpack(buf, offset + 8 * i)
+            return decode(buf[start + lo:start + hi])
+        return item
+
+    def close(self):
+        self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n_keys
+
+    def bisect_left(self, key):
+        '''
+            Number of keys < key
+        '''
+        get_key = self.key
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if get_key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_right(self, key):
+        '''
+            Number of keys <= key
+        '''
+        get_key = self.key
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key < get_key(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def __find(self, key):
+        # Index of key, or -1
+        i = self.bisect_left(key)
+        if i < self.n_keys and self.key(i) == key:
+            return i
+        return -1
+
+    def __contains__(self, key):
+        return self.__find(key) >= 0
+
+    def get(self, key, default=None):
+        i = self.__find(key)
+        return self.value(i) if i >= 0 else default
+
+    def __range(self, lo=None, hi=None):
+        start = 0 if lo is None else self.bisect_left(lo)
+        stop = self.n_keys if hi is None else self.bisect_left(hi)
+        return range(start, stop)
+
+    def keys(self, lo=None, hi=None):
+        '''
+            Keys in [lo, hi), lazily. None leaves that end of the range open.
+        '''
+        return (self.key(i) for i in self.__range(lo, hi))
+
+    def values(self, lo=None, hi=None):
+        return (self.value(i) for i in self.__range(lo, hi))
+
+    def items(self, lo=None, hi=None):
+        return ((self.key(i), self.value(i)) for i in self.__range(lo, hi))
+
+    def __iter__(self):
+        return self.keys()
+
+    def __reversed__(self):
+        return (self.key(i) for i in range(self.n_keys - 1, -1, -1))
+
+    def reversed_items(self):
+        return ((self.key(i), self.value(i)) for i in range(self.n_keys - 1, -1, -1))
@@ -0,0 +1,5 @@
+'''
+    Retroactive data structures (Demaine, Iacono, Langerman: Retroactive Data Structures).
+'''
+
+from .partial_retroactive_queue import PartialRetroactiveQueue
@@ -0,0 +1,161 @@
+'''
+    Partially retroactive queue
+    https://erikdemaine.org/papers/Retroactive_TALG/paper.pdf
+
+    Same operations as partial/partial_retroactive_queue.c, but the enqueues are kept in the CLRS
+    Rb_tree (rb_tree/rb_tree.py) with order statistics, keyed by time, instead of a linked list
+    walked from the front. Whatever the order of the operations, after d dequeues the queue holds
+    the enqueues in time order minus the first d of them, so the front is select(d): every
+    operation, retroactive or not, is O(log n). For the front, dequeues only need to be counted.
+
+    Times are any comparable values (an operation in the present takes the last time + time_step)
+    and must be distinct among all the operations. The dequeues are kept by time too, in a second
+    tree of every operation (+1 for an enqueue, -1 for a dequeue) whose monoid keeps the running
+    balance: the queue size after each operation is a prefix sum and the smallest of them says, in
+    O(log n), whether a retroactive change would make some dequeue run on an empty queue. Such a
+    change raises IndexError and leaves the queue as it was.
+
+    Like every module of rb_tree/, this one imports the trees by their plain names: rb_tree/ must
+    be on sys.path (the benchmarks and tests/conftest.py put it there).
+'''
+
+import monoid
+import rb_tree
+
+ENQUEUE = 1
+DEQUEUE = -1
+
+def _combine(a, b):
+    # (sum, smallest prefix sum) of a then b
+    low = a[0] + b[1]
+    return (a[0] + b[0], a[1] if a[1] <= low else low)
+
+def _balance(key, value):
+    return (value, value)
+
+# balance of a run of operations: how the queue size changes and its lowest point relative to the
+# start (infinite for no operation, so that it never wins a min)
+BALANCE = monoid.Monoid(_combine, (0, float('inf')), _balance)
+
+class PartialRetroactiveQueue():
+    def __init__(self, time_step=100):
+        self.time_step = time_step
+        # enqueues by time, node.value is the enqueued value
+        self.enqueues = rb_tree.Rb_tree(order_statistics=True)
+        # every operation by time, node.value is ENQUEUE or DEQUEUE
+        self.operations = rb_tree.Rb_tree(monoid=BALANCE)
+        self.dequeues = 0
+        self.now = 0
+
+    def __len__(self):
+        return len(self.enqueues) - self.dequeues
+
+    def enqueue(self, value):
+        '''
+            Enqueue value in the present, returns its time
+        '''
+        self.now += self.time_step
+        self.enqueues.insert(self.enqueues.create_node(self.now, value))
+        self.operations.insert(self.operations.create_node(self.now, ENQUEUE))
+        return self.now
+
+    def dequeue(self):
+        '''
+            Dequeue in the present, returns the value
+        '''
+        value = self.front()
+        self.now += self.time_step
+        self.operations.insert(self.operations.create_node(self.now, DEQUEUE))
+        self.dequeues += 1
+        return value
+
+    def __check_time(self, t):
+        if t > self.now:
+            raise ValueError('time ' + str(t) + ' is in the future')
+        if self.operations.find(self.operations.root, t) != self.operations.dummy:
+            raise ValueError('there is already an operation at time ' + str(t))
+
+    def __valid(self):
+        # no prefix of the operations leaves the queue below empty
+        return self.operations.aggregate()[1] >= 0
+
+    def insert_enqueue(self, t, value):
+        '''
+            Add an enqueue of value at time t (in the past)
+        '''
+        self.__check_time(t)
+        self.enqueues.insert(self.enqueues.create_node(t, value))
+        self.operations.insert(self.operations.create_node(t, ENQUEUE))
+
+    def delete_enqueue(self, t):
+        '''
+            Remove the enqueue done at time t. IndexError if a later dequeue would then find the
+            queue empty.
+        '''
+        x_node = self.enqueues.find(self.enqueues.root, t)
+        if x_node == self.enqueues.dummy:
+            raise KeyError(t)
+        operations = self.operations
+        operations.delete(operations.find(operations.root, t))
+        if not self.__valid():
+            operations.insert(operations.create_node(t, ENQUEUE))
+            raise IndexError('without the enqueue at time ' + str(t) + ', a dequeue would find the queue empty')
+        self.enqueues.delete(x_node)
+
+    def insert_dequeue(self, t):
+        '''
+            Add a dequeue at time t (in the past). IndexError if the queue is empty at t or if a
+            later dequeue would then find it empty.
+        '''
+        self.__check_time(t)
+        operations = self.operations
+        x_node = operations.create_node(t, DEQUEUE)
+        operations.insert(x_node)
+        if not self.__valid():
+            operations.delete(x_node)
+            raise IndexError('dequeue at time ' + str(t) + ' leaves a dequeue of an empty queue')
+        self.dequeues += 1
+
+    def delete_dequeue(self, t):
+        '''
+            Remove the dequeue done at time t
+        '''
+        x_node = self.operations.find(self.operations.root, t)
+        if x_node == self.operations.dummy or x_node.value != DEQUEUE:
+            raise KeyError(t)
+        self.operations.delete(x_node)
+        self.dequeues -= 1
+
+    def front(self):
+        if self.dequeues == len(self.enqueues):
+            raise IndexError('front of an empty queue')
+        return self.enqueues.select(self.dequeues).value
+
+    def back(self):
+        if self.dequeues == len(self.enqueues):
+            raise IndexError('back of an empty queue')
+        return self.enqueues.maximum(self.enqueues.root).value
+
+
+if __name__ == "__main__":
+    q = PartialRetroactiveQueue()
+
+    # same sequence as main() in partial/partial_retroactive_queue.c
+    q.enqueue(10) # time 100
+    q.enqueue(20) # time 200
+    q.enqueue(30) # time 300
+    q.insert_enqueue(150, 15)
+    q.insert_enqueue(175, 17)
+
+    print('Front = ' + str(q.front()))
+    q.dequeue()
+    q.delete_enqueue(175)
+    print('Front = ' + str(q.front()))
+
+    q.dequeue()
+    print('Front = ' + str(q.front()))
+
+    q.dequeue()
+    q.dequeue()
+    q.enqueue(40) # time 800, after the dequeues at 400..700
+    print('Front = ' + str(q.front()))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules import each other by their plain names, as the benchmarks run them; the packages
+# (retroactive) are imported from the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'rb_tree'))
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import b_tree
+
+
+@pytest.mark.parametrize('order', [4, 6, 64])
+def test_against_dict(order):
+    random.seed(order)
+    tree = b_tree.B_tree(order=order)
+    model = {}
+    for i in range(5000):
+        k = random.randrange(800)
+        r = random.random()
+        if r < 0.5:
+            tree.insert(k, i)
+            model[k] = i
+        elif r < 0.8:
+            if k in model:
+                tree.delete(k)
+                del model[k]
+            else:
+                with pytest.raises(KeyError):
+                    tree.delete(k)
+        else:
+            assert tree.get(k) == model.get(k)
+            assert (k in tree) == (k in model)
+        if i % 500 == 0:
+            tree.validate()
+    tree.validate()
+    assert len(tree) == len(model)
+    assert list(tree) == sorted(model)
+    assert list(reversed(tree)) == sorted(model, reverse=True)
+    assert list(tree.reversed_items()) == sorted(model.items(), reverse=True)
+    assert list(tree.items(100, 300)) == sorted((k, v) for k, v in model.items() if 100 <= k < 300)
+    assert tree.peek_min() == min(model.items())
+    assert tree.peek_max() == max(model.items())
+
+
+def test_missing_keys():
+    tree = b_tree.B_tree(order=4)
+    with pytest.raises(KeyError):
+        tree.delete(1)
+    with pytest.raises(KeyError):
+        tree.pop(1)
+    with pytest.raises(KeyError):
+        tree.peek_min()
+    assert tree.pop(1, None) is None
+    for k in range(50):
+        tree.upsert(k, -k)
+    with pytest.raises(KeyError):
+        tree.delete(50)
+    assert tree.find(50) is None
+    tree.validate()
+    assert len(tree) == 50 and tree.get(49) == -49
+
+
+def test_queue_and_bulk_load():
+    tree = b_tree.B_tree.from_sorted(range(1000), order=8)
+    tree.validate()
+    assert [tree.pop_min() for i in range(10)] == [(k, None) for k in range(10)]
+    assert [tree.pop_max() for i in range(10)] == [(k, None) for k in range(999, 989, -1)]
+    tree.validate()
+    assert len(tree) == 980
+    with pytest.raises(ValueError):
+        b_tree.B_tree.from_sorted([1, 3, 2])
+    with pytest.raises(ValueError):
+        b_tree.B_tree(order=5)
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import compact_rb_tree
+
+
+def test_against_dict():
+    random.seed(11)
+    tree = compact_rb_tree.Rb_tree()
+    model = {}
+    for i in range(5000):
+        k = random.randrange(500)
+        r = random.random()
+        if r < 0.5:
+            tree.upsert(k, i)
+            model[k] = i
+        elif r < 0.8:
+            assert tree.pop(k, None) == model.pop(k, None)
+        else:
+            assert tree.get(k) == model.get(k)
+            assert (k in tree) == (k in model)
+        if i % 500 == 0:
+            tree.validate()
+    tree.validate()
+    assert len(tree) == len(model)
+    assert list(tree) == sorted(model)
+    assert list(tree.items(100, 200)) == sorted((k, v) for k, v in model.items() if 100 <= k < 200)
+    assert list(tree.values(450)) == [model[k] for k in sorted(model) if k >= 450]
+    # deleted slots are reused: the arrays hold at most the keys ever alive at once
+    assert len(tree.key) <= 501
+
+
+def test_missing_keys():
+    tree = compact_rb_tree.Rb_tree()
+    with pytest.raises(KeyError):
+        tree.pop(1)
+    assert tree.pop(1, 'x') == 'x'
+    for k in range(10):
+        tree.upsert(k, str(k))
+    with pytest.raises(KeyError):
+        tree.pop(42)
+    assert tree.find(tree.root, 42) == tree.dummy
+    assert tree.setdefault(42, 'new') == 'new' and tree.setdefault(3) == '3'
+    assert len(tree) == 11
+    tree.validate()
+
+
+def test_node_api_errors():
+    tree = compact_rb_tree.Rb_tree()
+    x_node = tree.create_node(5, 'five')
+    tree.insert(x_node)
+    with pytest.raises(ValueError):
+        tree.insert(x_node)
+    with pytest.raises(ValueError):
+        tree.insert(tree.dummy)
+    with pytest.raises(ValueError):
+        tree.delete(tree.find(tree.root, 6))
+    with pytest.raises(ValueError):
+        tree.free_node(tree.dummy)
+    tree.delete(x_node)
+    assert len(tree) == 0 and tree.root == tree.dummy
+    tree.validate()
+
+
+def test_freed_slots_are_not_reused_twice():
+    tree = compact_rb_tree.Rb_tree()
+    for k in range(10):
+        tree.upsert(k, k)
+    x_node = tree.find(tree.root, 4)
+    tree.delete(x_node)
+    with pytest.raises(ValueError):
+        tree.delete(x_node)
+    with pytest.raises(ValueError):
+        tree.free_node(x_node)
+
+    # a node made but never inserted can be freed once, not deleted
+    y_node = tree.create_node(20)
+    with pytest.raises(ValueError):
+        tree.delete(y_node)
+    tree.free_node(y_node)
+    with pytest.raises(ValueError):
+        tree.free_node(y_node)
+    with pytest.raises(ValueError):
+        tree.insert(y_node)
+    # nodes of the tree are deleted, not freed
+    with pytest.raises(ValueError):
+        tree.free_node(tree.root)
+    with pytest.raises(ValueError):
+        tree.free_node(tree.find(tree.root, 7))
+    tree.validate()
+
+    # each free slot comes back once
+    nodes = [tree.create_node(k) for k in (30, 31, 32)]
+    assert len(set(nodes)) == 3
+    for z_node in nodes:
+        tree.insert(z_node)
+    tree.validate()
+    assert list(tree) == [0, 1, 2, 3, 5, 6, 7, 8, 9, 30, 31, 32]
+
+
+def test_debug_validates_every_update():
+    tree = compact_rb_tree.Rb_tree()
+    tree.debug = True
+    keys = random.Random(2).sample(range(1000), 300)
+    for k in keys:
+        tree.insert(tree.create_node(k))
+    for k in keys[::2]:
+        tree.delete(tree.find(tree.root, k))
+    assert list(tree) == sorted(keys[1::2])
+    tree.color[tree.root] = compact_rb_tree.RED
+    with pytest.raises(AssertionError):
+        tree.validate()
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+import concurrent_tree
+
+
+def in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+@pytest.mark.parametrize('cls', [concurrent_tree.LockedTree, concurrent_tree.SnapshotTree])
+def test_read_your_own_writes(cls):
+    tree = cls(batch_size=1000)
+    for k in range(10):
+        tree.upsert(k, k)
+    tree.commit()
+    tree.upsert(3, 'three')
+    tree.upsert(20, 'twenty')
+    tree.delete(5)
+    tree.delete(99)
+
+    assert tree.get(3) == 'three' and tree.get(20) == 'twenty' and tree.get(5, 'gone') == 'gone'
+    assert 20 in tree and 5 not in tree and 99 not in tree
+    assert len(tree) == 10
+    assert list(tree.items(2, 7)) == [(2, 2), (3, 'three'), (4, 4), (6, 6)]
+    with tree.reading() as t:
+        assert t.get(20) == 'twenty'
+
+
+def test_locked_tree_batches_stay_private():
+    tree = concurrent_tree.LockedTree(batch_size=1000)
+    tree.upsert(1, 'one')
+    tree.delete(2)
+    assert tree.get(1) == 'one'
+    assert in_thread(lambda: tree.get(1)) is None
+    assert in_thread(lambda: len(tree)) == 0
+    tree.commit()
+    assert in_thread(lambda: (tree.get(1), len(tree))) == ('one', 1)
+
+
+def test_read_lock_is_reentrant_with_a_waiting_writer():
+    lock = concurrent_tree.RWLock()
+    wrote = []
+
+    def write():
+        with lock.writing():
+            wrote.append(True)
+
+    with lock.reading():
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not lock.writers:
+            time.sleep(0.001)
+        # a second reader waits behind the writer, this thread does not
+        with lock.reading():
+            assert not wrote
+    writer.join()
+    assert wrote == [True] and lock.active == [] and lock.writers == 0
+
+
+def test_lock_upgrades_raise():
+    lock = concurrent_tree.RWLock()
+    with lock.reading():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.writing():
+        with pytest.raises(RuntimeError):
+            lock.acquire_read()
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.writing():
+        pass
+
+
+@pytest.mark.parametrize('cls', [concurrent_tree.LockedTree, concurrent_tree.SnapshotTree])
+def test_many_readers_and_a_writer_finish(cls):
+    n = 2000
+    tree = cls(batch_size=64)
+    for key in range(n):
+        tree.upsert(key, key)
+    tree.commit()
+    go = threading.Event()
+    stop = threading.Event()
+    errors = []
+    reads = [0] * 16
+
+    def read(i):
+        go.wait()
+        try:
+            while not stop.is_set():
+                for key in range(i, n, 97):
+                    if tree.get(key) not in (key, -key):
+                        errors.append(key)
+                reads[i] += 1
+        except Exception as e:
+            errors.append(e)
+
+    def write():
+        go.wait()
+        k = 0
+        while not stop.is_set():
+            tree.upsert(k % n, -(k % n))
+            k += 1
+        tree.commit()
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(16)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    start = time.time()
+    go.set()
+    time.sleep(0.3)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert time.time() - start < 5
+    assert not errors and any(reads)
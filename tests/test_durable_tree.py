@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+import ll_rb_tree
+import persistent_ll_rb_tree
+import rb_tree
+from durable_tree import DurableTree
+
+
+@pytest.mark.parametrize('engine', [rb_tree.Rb_tree, ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree])
+def test_recovers_after_checkpoints(tmpdir, engine):
+    directory = str(tmpdir.join('tree'))
+    tree = DurableTree(directory, engine=engine, group_size=8, checkpoint_every=50)
+    model = {}
+    for k in range(300):
+        tree.upsert(k % 97, k)
+        model[k % 97] = k
+        if k % 7 == 0:
+            tree.delete(k % 89)
+            model.pop(k % 89, None)
+    tree.close()
+
+    tree = DurableTree(directory, engine=engine)
+    assert list(tree.items()) == sorted(model.items())
+    tree.close()
+
+
+def test_leaves_other_files_alone(tmpdir):
+    directory = str(tmpdir)
+    strays = ['snapshot', 'snapshot.old', 'snapshot.x.rbt', 'wal.notes', 'wal.1.bak', 'notes.tmp',
+              'snapshot.1.rbt.bak']
+    for name in strays:
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write('not ours')
+    tree = DurableTree(directory, group_size=1, checkpoint_every=None)
+    for k in range(10):
+        tree.upsert(k, str(k))
+    tree.checkpoint()
+    tree.upsert(10, '10')
+    tree.checkpoint()
+    tree.close()
+
+    names = sorted(os.listdir(directory))
+    assert names == sorted(strays + ['snapshot.2.rbt', 'wal.2'])
+    tree = DurableTree(directory)
+    assert len(tree) == 11 and tree.get(10) == '10'
+    tree.close()
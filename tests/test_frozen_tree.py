@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import ll_rb_tree
+import persistent_ll_rb_tree
+import rb_tree
+
+numpy = pytest.importorskip('numpy')
+
+TREES = [rb_tree.Rb_tree, ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree]
+
+
+@pytest.mark.parametrize('cls', TREES)
+@pytest.mark.parametrize('layout', ['sorted', 'eytzinger'])
+def test_freeze_follows_writes(cls, layout):
+    random.seed(7)
+    tree = cls.from_sorted(range(0, 2000, 2))
+    model = dict((k, None) for k in range(0, 2000, 2))
+    queries = list(range(-5, 2010))
+    for step in range(5):
+        frozen = tree.freeze(layout)
+        keys = sorted(model)
+        assert frozen.keys.tolist() == keys
+        assert frozen.values.tolist() == [model[k] for k in keys]
+        assert frozen.find_many(queries).tolist() == [keys.index(q) if q in model else -1 for q in queries]
+        for i in range(20 * (step + 1)):
+            k = random.randrange(2000)
+            if random.random() < 0.7:
+                tree.upsert(k, -k)
+                model[k] = -k
+            elif k in model:
+                tree.pop(k)
+                del model[k]
+
+
+@pytest.mark.parametrize('cls', TREES)
+def test_written_keys_are_bounded(cls):
+    tree = cls.from_sorted(range(1000))
+    tree.freeze()
+    few = int(tree.freeze_ratio * 1000) // 2
+    for k in range(few):
+        tree.upsert(k, 1)
+    assert len(tree.written) == few
+    for k in range(1000, 3000):
+        tree.upsert(k, 1)
+        assert tree.written is None or len(tree.written) < tree.freeze_ratio * len(tree)
+    assert tree.written is None
+    assert tree.freeze().keys.tolist() == list(range(3000))
+    assert tree.written == set()
@@ -0,0 +1,64 @@
+import random
+
+import instrumented_ll_rb_tree
+import instrumented_rb_tree
+import ll_rb_tree
+import rb_tree
+
+
+def shape(root, none):
+    # keys and colors in pre-order
+    result = []
+    stack = [root]
+    while stack:
+        h = stack.pop()
+        if h is none or h is None:
+            continue
+        result.append((h.key, h.color))
+        stack.extend((h.right, h.left))
+    return result
+
+
+def test_clrs_counts_the_plain_tree():
+    random.seed(5)
+    keys = random.sample(range(5000), 5000)
+    plain, counted = rb_tree.Rb_tree(), instrumented_rb_tree.Rb_tree()
+    for tree in (plain, counted):
+        for k in keys:
+            tree.upsert(k, None)
+        for k in keys[::2]:
+            tree.pop(k)
+    counted.validate()
+    assert shape(plain.root, plain.dummy) == shape(counted.root, counted.dummy)
+    stats = counted.stats()
+    assert stats['finds'] == len(keys) + len(keys) // 2
+    assert stats['insert_case_3'] > 0 and stats['delete_case_2'] > 0
+    assert stats['left_rotations'] + stats['right_rotations'] >= stats['insert_case_3']
+    assert sum(stats['insert_path_lengths'].values()) == len(keys)
+
+
+def test_llrb_counts_the_loops():
+    random.seed(6)
+    keys = random.sample(range(5000), 5000)
+    plain, counted = ll_rb_tree.Rb_tree(), instrumented_ll_rb_tree.Rb_tree()
+    assert not counted.recursive
+    for tree in (plain, counted):
+        for k in keys:
+            tree.insert(k)
+        for k in keys[::2]:
+            tree.delete(k)
+    counted.validate()
+    assert shape(plain.root, None) == shape(counted.root, None)
+    stats = counted.stats()
+    # the loops call the hooks as the recursion would: same counts either way
+    recursive = instrumented_ll_rb_tree.Rb_tree()
+    recursive.recursive = True
+    for k in keys:
+        recursive.insert(k)
+    for k in keys[::2]:
+        recursive.delete(k)
+    recursive_stats = recursive.stats()
+    for name in ('fix_up_case_1', 'fix_up_case_2', 'fix_up_case_3', 'flips', 'left_rotations',
+                 'right_rotations', 'move_red_left', 'move_red_right'):
+        assert stats[name] == recursive_stats[name] > 0
+    assert sum(stats['insert_path_lengths'].values()) == len(keys)
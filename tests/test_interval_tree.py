@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import interval_tree
+
+
+def build(intervals):
+    tree = interval_tree.Rb_tree()
+    for low, high in intervals:
+        tree.insert(tree.create_node(low, None, high))
+    return tree
+
+
+def random_intervals(rng, n):
+    intervals = []
+    for i in range(n):
+        low = rng.randrange(10000)
+        intervals.append((low, low + rng.choice([0, rng.randrange(20), rng.randrange(3000)])))
+    return intervals
+
+
+def test_queries_against_brute_force():
+    rng = random.Random(3)
+    intervals = random_intervals(rng, 2000)
+    tree = build(intervals)
+    for low, high in intervals[::3]:
+        tree.delete(tree.find_interval(low, high))
+    live = intervals[:]
+    for interval in intervals[::3]:
+        live.remove(interval)
+    tree.validate()
+    assert len(tree) == len(live)
+    assert tree.find_interval(-1, 5) == tree.dummy
+
+    for i in range(200):
+        lo = rng.randrange(-100, 10100)
+        hi = lo + rng.randrange(200)
+        found = [(x_node.key, x_node.high) for x_node in tree.overlap(lo, hi)]
+        assert [low for low, high in found] == sorted(low for low, high in found)
+        assert sorted(found) == sorted((l, h) for l, h in live if l <= hi and h >= lo)
+        assert sorted((x_node.key, x_node.high) for x_node in tree.stab(lo)) == \
+            sorted((l, h) for l, h in live if l <= lo <= h)
+
+
+@pytest.mark.parametrize('n, m', [(1, 20), (20, 1), (300, 300), (1000, 10)])
+@pytest.mark.parametrize('operation', ['union', 'intersection', 'difference'])
+def test_set_operations_keep_max_high(n, m, operation):
+    rng = random.Random(n * m)
+    a = build(random_intervals(rng, n))
+    b = build(random_intervals(rng, m))
+    result = getattr(a, operation)(b)
+    result.validate()
+    lows = [x_node.key for x_node in result.overlap(float('-inf'), float('inf'))]
+    assert lows == sorted(lows)
+
+
+def test_union_keeps_the_interval_of_self():
+    # on equal low endpoints union keeps the node of self, max_high has to follow it
+    tree = build([(5, 100)]).union(build([(k, k) for k in range(20)]))
+    tree.validate()
+    assert len(tree) == 20
+    assert tree.root.max_high == 100
+    assert [(x_node.key, x_node.high) for x_node in tree.stab(50)] == [(5, 100)]
+
+    tree = build([(k, k) for k in range(20)]).union(build([(5, 100)]))
+    tree.validate()
+    assert tree.root.max_high == 19
+    assert list(tree.stab(50)) == []
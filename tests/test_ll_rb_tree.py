@@ -0,0 +1,296 @@
+import random
+
+import pytest
+
+import ll_rb_tree
+import monoid
+import persistent_ll_rb_tree
+
+
+def build(keys, cls=ll_rb_tree.Rb_tree, **options):
+    tree = cls(**options)
+    for k in keys:
+        tree.insert(k, k)
+    return tree
+
+
+def sorted_sizes():
+    # empty, one key, and around the sizes where the shape of a balanced tree changes
+    sizes = set([0, 1])
+    for k in range(1, 9):
+        for n in (2 ** k, 3 * 2 ** k, 3 ** k):
+            sizes.update((n - 1, n, n + 1))
+    return sorted(sizes)
+
+
+@pytest.mark.parametrize('n', sorted_sizes())
+@pytest.mark.parametrize('cls', [ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree])
+@pytest.mark.parametrize('options', [{}, {'monoid': monoid.COUNT}])
+def test_from_sorted(n, cls, options):
+    tree = cls.from_sorted(range(n), **options)
+    tree.validate()
+    assert len(tree) == n
+    assert list(tree) == list(range(n))
+    if 'monoid' in options:
+        assert tree.aggregate() == n and tree.aggregate(1, n - 1) == max(0, n - 2)
+    assert list(reversed(tree)) == list(range(n))[::-1]
+    if n:
+        assert tree.peek_min()[0] == 0 and tree.peek_max()[0] == n - 1
+    tree.insert(n, n)
+    tree.delete(n // 2)
+    tree.validate()
+    assert list(tree) == [k for k in range(n + 1) if k != n // 2]
+
+
+def test_from_sorted_iterator_and_unsorted_keys():
+    tree = ll_rb_tree.Rb_tree.from_sorted(iter(range(0, 40, 3)), order_statistics=True)
+    tree.validate()
+    assert list(tree) == list(range(0, 40, 3))
+    assert tree.select(5) == 15
+    for keys in ([0, 1, 1, 2], [0, 2, 1]):
+        with pytest.raises(ValueError):
+            ll_rb_tree.Rb_tree.from_sorted(keys)
+
+
+@pytest.mark.parametrize('cls', [ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree])
+def test_order_statistics_against_sorted_list(cls):
+    random.seed(6)
+    tree = cls(order_statistics=True)
+    keys = []
+    for i in range(600):
+        # even keys only, so the odd ones are never in the tree
+        k = 2 * random.randrange(200)
+        if k in tree:
+            tree.delete(k)
+            keys.remove(k)
+        else:
+            tree.insert(k, i)
+            keys.append(k)
+        if i % 50:
+            continue
+        keys.sort()
+        tree.validate()
+        for q in range(-3, 403):
+            assert tree.rank(q) == sum(1 for k in keys if k < q)
+        assert [tree.select(r) for r in range(len(keys))] == keys
+        for r in (-1, len(keys), len(keys) + 5):
+            with pytest.raises(IndexError):
+                tree.select(r)
+        for lo, hi in [(-5, 500), (0, 0), (1, 1), (7, 3), (10, 9), (-10, -1), (401, 900)] + \
+                      [(random.randrange(-5, 405), random.randrange(-5, 405)) for j in range(50)]:
+            assert tree.count_range(lo, hi) == sum(1 for k in keys if lo <= k < hi)
+
+
+def test_order_statistics_of_an_empty_tree():
+    tree = ll_rb_tree.Rb_tree(order_statistics=True)
+    assert tree.rank(5) == 0 and tree.count_range(0, 10) == 0
+    with pytest.raises(IndexError):
+        tree.select(0)
+
+
+def bounds(keys):
+    # present and absent keys, both ends and beyond, and open ends
+    return [None, keys[0] - 1, keys[0], keys[0] + 1, keys[len(keys) // 2], keys[-1], keys[-1] + 1, keys[-1] + 5]
+
+
+@pytest.mark.parametrize('cls', [ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree])
+def test_ranges_against_sorted_list(cls):
+    keys = list(range(0, 60, 3))
+    tree = build(keys, cls)
+    for lo in bounds(keys):
+        for hi in bounds(keys):
+            expected = [k for k in keys if (lo is None or lo <= k) and (hi is None or k < hi)]
+            assert list(tree.keys(lo, hi)) == expected
+            assert list(tree.values(lo, hi)) == expected
+            assert list(tree.items(lo, hi)) == [(k, k) for k in expected]
+    assert list(tree) == keys and list(reversed(tree)) == keys[::-1]
+    assert list(tree.reversed_items()) == [(k, k) for k in keys[::-1]]
+    empty = cls()
+    assert list(empty.keys(1, 5)) == [] and list(empty) == [] and list(reversed(empty)) == []
+    assert list(empty.reversed_items()) == []
+
+
+@pytest.mark.parametrize('cls', [ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree])
+def test_cursor_walk(cls):
+    random.seed(8)
+    keys = list(range(0, 60, 3))
+    tree = build(keys, cls)
+    for start in bounds(keys):
+        cursor = tree.cursor(start)
+        # position: index of the key right after the cursor
+        i = len([k for k in keys if start is not None and k < start])
+        for step in range(80):
+            if random.random() < 0.5:
+                if i == len(keys):
+                    with pytest.raises(StopIteration):
+                        cursor.next()
+                else:
+                    assert cursor.next() == keys[i]
+                    i += 1
+            else:
+                if i == 0:
+                    with pytest.raises(StopIteration):
+                        cursor.prev()
+                else:
+                    i -= 1
+                    assert cursor.prev() == keys[i]
+    assert list(tree.cursor(keys[5] + 1)) == keys[6:]
+    assert list(tree.cursor(keys[-1] + 1)) == []
+
+
+def test_cursor_at_both_ends():
+    tree = build([1, 2, 3])
+    cursor = tree.cursor()
+    with pytest.raises(StopIteration):
+        cursor.prev()
+    assert [cursor.next() for i in range(3)] == [1, 2, 3]
+    with pytest.raises(StopIteration):
+        next(cursor)
+    assert [cursor.prev() for i in range(3)] == [3, 2, 1]
+    with pytest.raises(StopIteration):
+        cursor.prev()
+    assert cursor.next() == 1
+    empty = ll_rb_tree.Rb_tree().cursor()
+    for step in (empty.next, empty.prev):
+        with pytest.raises(StopIteration):
+            step()
+
+
+@pytest.mark.parametrize('recursive', [False, True])
+def test_insert_delete_against_dict(recursive):
+    random.seed(1)
+    tree = ll_rb_tree.Rb_tree(monoid=monoid.SUM)
+    tree.recursive = recursive
+    model = {}
+    for i in range(3000):
+        k = random.randrange(300)
+        if random.random() < 0.6:
+            tree.insert(k, i)
+            model[k] = i
+        elif k in model:
+            tree.delete(k)
+            del model[k]
+        else:
+            with pytest.raises(KeyError):
+                tree.delete(k)
+        if i % 100 == 0:
+            tree.validate()
+    tree.validate()
+    assert list(tree.items()) == sorted(model.items())
+    assert len(tree) == len(model)
+    assert tree.aggregate() == sum(model.values())
+
+
+@pytest.mark.parametrize('recursive', [False, True])
+def test_delete_missing_key(recursive):
+    tree = build(range(10))
+    tree.recursive = recursive
+    tree.peek_min()
+    tree.peek_max()
+    for key in (42, -1, 4.5):
+        with pytest.raises(KeyError):
+            tree.delete(key)
+    assert len(tree) == 10
+    assert list(tree) == list(range(10))
+    assert tree.peek_min() == (0, 0) and tree.peek_max() == (9, 9)
+    tree.validate()
+
+    empty = ll_rb_tree.Rb_tree()
+    with pytest.raises(KeyError):
+        empty.delete(0)
+    assert len(empty) == 0
+    assert empty.pop(0, None) is None
+
+
+@pytest.mark.parametrize('recursive', [False, True])
+def test_min_max_queue(recursive):
+    random.seed(2)
+    keys = random.sample(range(1000), 300)
+    tree = build(keys)
+    tree.recursive = recursive
+    expected = sorted(keys)
+    while expected:
+        assert tree.peek_min()[0] == expected[0] and tree.peek_max()[0] == expected[-1]
+        # the caches follow every pop and delete, so the next peeks need no search
+        if random.random() < 0.4:
+            assert tree.pop_min()[0] == expected.pop(0)
+        elif random.random() < 0.6:
+            assert tree.pop_max()[0] == expected.pop()
+        else:
+            tree.delete(expected.pop(random.randrange(len(expected))))
+        tree.validate()
+        if expected:
+            assert tree.min_node is not None and tree.max_node is not None
+    assert len(tree) == 0
+    with pytest.raises(KeyError):
+        tree.pop_min()
+
+
+@pytest.mark.parametrize('cls', [ll_rb_tree.Rb_tree, persistent_ll_rb_tree.Rb_tree])
+@pytest.mark.parametrize('options', [{}, {'monoid': monoid.COUNT}])
+def test_batches_against_dict(cls, options):
+    random.seed(9)
+    tree = cls(**options)
+    model = {}
+    rebuilt = set()
+    for step in range(120):
+        # from a few keys to many times the size of the tree, on both sides of rebuild_ratio
+        m = random.choice([1, 3, 10, 40, 200])
+        batch = [random.randrange(300) for i in range(m)]
+        rebuilt.add(len(batch) >= tree.rebuild_ratio * len(tree))
+        kind = random.random()
+        if kind < 0.45:
+            tree.insert_many(batch)
+            # keys already in the tree keep their value
+            for k in batch:
+                model.setdefault(k, None)
+        elif kind < 0.9:
+            expected = len(set(batch) & set(model))
+            assert tree.delete_many(batch) == expected
+            for k in batch:
+                model.pop(k, None)
+        else:
+            nodes = tree.find_many(batch)
+            for k, node in zip(batch, nodes):
+                if k in model:
+                    assert node.key == k and node.value == model[k]
+                else:
+                    assert node is None
+        if random.random() < 0.3:
+            k = random.randrange(300)
+            tree.upsert(k, step)
+            model[k] = step
+        tree.validate()
+        assert list(tree.items()) == sorted(model.items())
+        assert len(tree) == len(model)
+        if options:
+            assert tree.aggregate() == len(tree)
+    # the persistent tree never rebuilds, that would relink nodes its snapshots share
+    assert rebuilt == (set([False]) if cls.rebuild_ratio == float('inf') else set([False, True]))
+    assert tree.delete_many([]) == 0 and tree.find_many([]) == []
+
+
+def test_batches():
+    tree = build(range(0, 200, 2))
+    tree.insert_many(range(1, 50, 2))
+    tree.validate()
+    multiples = [k for k in tree.keys() if k % 3 == 0]
+    assert tree.delete_many(range(0, 300, 3)) == len(multiples)
+    tree.validate()
+    assert not any(k % 3 == 0 for k in tree.keys())
+    nodes = tree.find_many([1, 2, 3, 999])
+    assert nodes[3] is None and nodes[0].key == 1
+
+
+def test_persistent_snapshots():
+    random.seed(3)
+    tree = build(range(100), persistent_ll_rb_tree.Rb_tree)
+    snapshot = tree.snapshot()
+    for k in random.sample(range(100), 50):
+        tree.delete(k)
+    with pytest.raises(KeyError):
+        tree.delete(1000)
+    tree.validate()
+    snapshot.validate()
+    assert list(snapshot) == list(range(100))
+    assert len(tree) == 50
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import monoid
+import persistent_ll_rb_tree
+
+
+def test_snapshots_keep_their_version():
+    random.seed(8)
+    tree = persistent_ll_rb_tree.Rb_tree(monoid=monoid.SUM)
+    model = {}
+    versions = []
+    for i in range(3000):
+        k = random.randrange(400)
+        if random.random() < 0.6:
+            tree.upsert(k, i)
+            model[k] = i
+        elif k in model:
+            assert tree.pop(k) == model.pop(k)
+        else:
+            with pytest.raises(KeyError):
+                tree.delete(k)
+        if i % 300 == 0:
+            versions.append((tree.snapshot(), dict(model)))
+    tree.validate()
+    assert list(tree.items()) == sorted(model.items())
+    for snapshot, expected in versions:
+        snapshot.validate()
+        assert list(snapshot.items()) == sorted(expected.items())
+        assert snapshot.aggregate() == sum(expected.values())
+        assert len(snapshot) == len(expected)
+
+
+def test_writing_to_a_snapshot():
+    tree = persistent_ll_rb_tree.Rb_tree(order_statistics=True)
+    for k in range(100):
+        tree.insert(k, k)
+    snapshot = tree.snapshot()
+    for k in range(0, 100, 2):
+        snapshot.delete(k)
+    snapshot.upsert(1000, 'new')
+    assert tree.pop_min() == (0, 0) and tree.pop_max() == (99, 99)
+    tree.validate()
+    snapshot.validate()
+    assert list(tree) == list(range(1, 99))
+    assert list(snapshot) == list(range(1, 100, 2)) + [1000]
+    assert snapshot.select(0) == 1 and tree.rank(50) == 49
+    with pytest.raises(KeyError):
+        snapshot.delete(2)
@@ -0,0 +1,319 @@
+import collections
+import random
+
+import pytest
+
+import monoid
+import rb_tree
+
+
+def build(keys, **options):
+    tree = rb_tree.Rb_tree(**options)
+    for k in keys:
+        tree.upsert(k, k)
+    return tree
+
+
+def sorted_sizes():
+    # empty, one key, and around the sizes where the shape of a balanced tree changes
+    sizes = set([0, 1])
+    for k in range(1, 9):
+        for n in (2 ** k, 3 * 2 ** k):
+            sizes.update((n - 1, n, n + 1))
+    return sorted(sizes)
+
+
+@pytest.mark.parametrize('n', sorted_sizes())
+@pytest.mark.parametrize('options', [{}, {'monoid': monoid.COUNT}])
+def test_from_sorted(n, options):
+    tree = rb_tree.Rb_tree.from_sorted(range(n), **options)
+    tree.validate()
+    assert len(tree) == n
+    assert list(tree) == list(range(n))
+    if 'monoid' in options:
+        assert tree.aggregate() == n and tree.aggregate(1, n - 1) == max(0, n - 2)
+    assert list(reversed(tree)) == list(range(n))[::-1]
+    if n:
+        assert tree.peek_min()[0] == 0 and tree.peek_max()[0] == n - 1
+    # the tree built this way takes updates like any other
+    tree.upsert(n, n)
+    tree.pop(n // 2)
+    tree.validate()
+    assert list(tree) == [k for k in range(n + 1) if k != n // 2]
+
+
+def test_from_sorted_iterator_and_equal_keys():
+    keys = [0, 1, 1, 2, 2, 2, 3]
+    tree = rb_tree.Rb_tree.from_sorted(iter(keys), order_statistics=True)
+    tree.validate()
+    assert list(tree) == keys
+    assert tree.count_range(1, 3) == 5
+
+
+def test_order_statistics_against_sorted_list():
+    random.seed(6)
+    tree = rb_tree.Rb_tree(order_statistics=True)
+    keys = []
+    for i in range(600):
+        # even keys only, so the odd ones are never in the tree
+        k = 2 * random.randrange(200)
+        if k in tree:
+            tree.pop(k)
+            keys.remove(k)
+        else:
+            tree.upsert(k, i)
+            keys.append(k)
+        if i % 50:
+            continue
+        keys.sort()
+        tree.validate()
+        for q in range(-3, 403):
+            assert tree.rank(q) == sum(1 for k in keys if k < q)
+        for r in range(len(keys)):
+            assert tree.select(r).key == keys[r]
+        for r in (-1, len(keys), len(keys) + 5):
+            with pytest.raises(IndexError):
+                tree.select(r)
+        for lo, hi in [(-5, 500), (0, 0), (1, 1), (7, 3), (10, 9), (-10, -1), (401, 900)] + \
+                      [(random.randrange(-5, 405), random.randrange(-5, 405)) for j in range(50)]:
+            assert tree.count_range(lo, hi) == sum(1 for k in keys if lo <= k < hi)
+
+
+def test_order_statistics_of_an_empty_tree():
+    tree = rb_tree.Rb_tree(order_statistics=True)
+    assert tree.rank(5) == 0 and tree.count_range(0, 10) == 0
+    with pytest.raises(IndexError):
+        tree.select(0)
+
+
+def bounds(keys):
+    # present and absent keys, both ends and beyond, and open ends
+    return [None, keys[0] - 1, keys[0], keys[0] + 1, keys[len(keys) // 2], keys[-1], keys[-1] + 1, keys[-1] + 5]
+
+
+def test_ranges_against_sorted_list():
+    keys = list(range(0, 60, 3))
+    tree = build(keys)
+    for lo in bounds(keys):
+        for hi in bounds(keys):
+            expected = [k for k in keys if (lo is None or lo <= k) and (hi is None or k < hi)]
+            assert list(tree.keys(lo, hi)) == expected
+            assert list(tree.values(lo, hi)) == expected
+            assert list(tree.items(lo, hi)) == [(k, k) for k in expected]
+    assert list(tree) == keys and list(reversed(tree)) == keys[::-1]
+    assert list(tree.reversed_items()) == [(k, k) for k in keys[::-1]]
+    empty = rb_tree.Rb_tree()
+    assert list(empty.keys(1, 5)) == [] and list(empty) == [] and list(reversed(empty)) == []
+    assert list(empty.reversed_items()) == []
+
+
+def test_cursor_walk():
+    random.seed(8)
+    keys = list(range(0, 60, 3))
+    tree = build(keys)
+    for start in bounds(keys):
+        cursor = tree.cursor(start)
+        # position: index of the key right after the cursor
+        i = len([k for k in keys if start is not None and k < start])
+        for step in range(80):
+            if random.random() < 0.5:
+                if i == len(keys):
+                    with pytest.raises(StopIteration):
+                        cursor.next()
+                else:
+                    assert cursor.next() == keys[i]
+                    i += 1
+            else:
+                if i == 0:
+                    with pytest.raises(StopIteration):
+                        cursor.prev()
+                else:
+                    i -= 1
+                    assert cursor.prev() == keys[i]
+    assert list(tree.cursor(keys[5] + 1)) == keys[6:]
+    assert list(tree.cursor(keys[-1] + 1)) == []
+
+
+def test_cursor_at_both_ends():
+    tree = build([1, 2, 3])
+    cursor = tree.cursor()
+    with pytest.raises(StopIteration):
+        cursor.prev()
+    assert [cursor.next() for i in range(3)] == [1, 2, 3]
+    with pytest.raises(StopIteration):
+        next(cursor)
+    assert [cursor.prev() for i in range(3)] == [3, 2, 1]
+    with pytest.raises(StopIteration):
+        cursor.prev()
+    assert cursor.next() == 1
+    empty = rb_tree.Rb_tree().cursor()
+    for step in (empty.next, empty.prev):
+        with pytest.raises(StopIteration):
+            step()
+
+
+def test_insert_delete_against_dict():
+    random.seed(1)
+    tree = rb_tree.Rb_tree(monoid=monoid.SUM)
+    model = {}
+    for i in range(3000):
+        k = random.randrange(300)
+        if random.random() < 0.6:
+            tree.upsert(k, i)
+            model[k] = i
+        else:
+            assert tree.pop(k, None) == model.pop(k, None)
+        if i % 100 == 0:
+            tree.validate()
+    tree.validate()
+    assert list(tree.items()) == sorted(model.items())
+    assert len(tree) == len(model)
+    assert tree.aggregate() == sum(model.values())
+
+
+def test_missing_keys():
+    tree = build(range(10))
+    assert 42 not in tree
+    assert tree.get(42, 'none') == 'none'
+    with pytest.raises(KeyError):
+        tree.pop(42)
+    assert tree.pop(42, None) is None
+    assert len(tree) == 10
+    tree.validate()
+    empty = rb_tree.Rb_tree()
+    with pytest.raises(KeyError):
+        empty.pop(0)
+    assert len(empty) == 0
+
+
+@pytest.mark.parametrize('options', [{}, {'monoid': monoid.COUNT}])
+def test_batches_against_counter(options):
+    # the CLRS tree keeps equal keys as separate nodes: insert_many adds one node per key and
+    # delete_many removes one node per key, so the model counts the copies of each key
+    random.seed(9)
+    tree = rb_tree.Rb_tree(**options)
+    model = collections.Counter()
+    rebuilt = set()
+    for step in range(120):
+        # from a few keys to many times the size of the tree, on both sides of rebuild_ratio
+        m = random.choice([1, 3, 10, 40, 200])
+        batch = [random.randrange(300) for i in range(m)]
+        rebuilt.add(len(batch) >= tree.rebuild_ratio * len(tree))
+        kind = random.random()
+        if kind < 0.45:
+            tree.insert_many(batch)
+            model.update(batch)
+        elif kind < 0.9:
+            expected = 0
+            for k, count in collections.Counter(batch).items():
+                removed = min(count, model[k])
+                model[k] -= removed
+                expected += removed
+            assert tree.delete_many(batch) == expected
+        else:
+            nodes = tree.find_many(batch)
+            for k, node in zip(batch, nodes):
+                if model[k]:
+                    assert node.key == k
+                else:
+                    assert node == tree.dummy
+        tree.validate()
+        assert list(tree) == sorted(model.elements())
+        assert len(tree) == sum(model.values())
+        if options:
+            assert tree.aggregate() == len(tree)
+    assert rebuilt == set([False, True])
+    assert tree.insert_many([]) is None and tree.delete_many([]) == 0 and tree.find_many([]) == []
+
+
+def test_split_join():
+    tree = build(range(100), order_statistics=True)
+    left, right = tree.split(40)
+    left.validate()
+    right.validate()
+    assert list(left) == list(range(40)) and list(right) == list(range(40, 100))
+    pivot = right.pop_min()
+    joined = rb_tree.Rb_tree.join(left, right.create_node(pivot[0], pivot[1]), right)
+    joined.validate()
+    assert list(joined) == list(range(100))
+
+
+def test_join_independent_trees():
+    left, right = build(range(50)), build(range(51, 60))
+    joined = rb_tree.Rb_tree.join(left, left.create_node(50), right)
+    joined.validate()
+    assert list(joined) == list(range(60))
+    right = joined.sibling()
+    assert right.dummy is joined.dummy
+    for k in range(61, 70):
+        right.upsert(k, k)
+    joined = rb_tree.Rb_tree.join(joined, joined.create_node(60), right)
+    joined.validate()
+    assert list(joined) == list(range(70))
+
+
+@pytest.mark.parametrize('sizes', [(1, 20), (20, 1), (5, 2000), (2000, 5), (300, 400)])
+def test_set_operations_with_monoid(sizes):
+    random.seed(sum(sizes))
+    n, m = sizes
+    a_items = dict((k, random.randrange(100)) for k in random.sample(range(3 * (n + m)), n))
+    b_items = dict((k, random.randrange(100)) for k in random.sample(range(3 * (n + m)), m))
+    for name in ('union', 'intersection', 'difference'):
+        a = rb_tree.Rb_tree(monoid=monoid.SUM)
+        b = rb_tree.Rb_tree(monoid=monoid.SUM)
+        for k, v in a_items.items():
+            a.upsert(k, v)
+        for k, v in b_items.items():
+            b.upsert(k, v)
+        result = getattr(a, name)(b)
+        result.validate()
+        if name == 'union':
+            expected = dict(b_items)
+            expected.update(a_items)
+        elif name == 'intersection':
+            expected = dict((k, v) for k, v in a_items.items() if k in b_items)
+        else:
+            expected = dict((k, v) for k, v in a_items.items() if k not in b_items)
+        assert list(result.items()) == sorted(expected.items())
+        assert len(result) == len(expected)
+        assert result.aggregate() == sum(expected.values())
+        assert len(a) == 0 and len(b) == 0
+
+
+@pytest.mark.parametrize('name', ['union', 'intersection', 'difference'])
+def test_set_operations_of_unknown_sizes(name):
+    # pieces of a split without order_statistics do not know their size: the split and join
+    # recursion runs instead of the finger searches
+    random.seed(4)
+    keys = random.sample(range(2000), 600)
+    a, rest = build(keys).split(1000)
+    b, c = build(random.sample(range(2000), 300)).split(1500)
+    assert not a.n_keys_valid
+    a_keys, b_keys = set(a), set(b)
+    result = getattr(a, name)(b)
+    result.validate()
+    expected = {'union': a_keys | b_keys, 'intersection': a_keys & b_keys, 'difference': a_keys - b_keys}[name]
+    assert list(result) == sorted(expected)
+    assert len(result) == len(expected)
+
+
+def test_union_replaces_aggregate():
+    a = rb_tree.Rb_tree(monoid=monoid.SUM)
+    a.upsert(5, 100)
+    b = rb_tree.Rb_tree(monoid=monoid.SUM)
+    for k in range(20):
+        b.upsert(k, 1)
+    result = a.union(b)
+    result.validate()
+    assert result.aggregate() == 119
+
+
+def test_min_max_queue():
+    random.seed(2)
+    keys = random.sample(range(1000), 200)
+    tree = build(keys)
+    assert tree.peek_min()[0] == min(keys) and tree.peek_max()[0] == max(keys)
+    got = [tree.pop_min()[0] for i in range(100)] + [tree.pop_max()[0] for i in range(100)]
+    assert got == sorted(keys)[:100] + sorted(keys)[100:][::-1]
+    assert len(tree) == 0
+    tree.validate()
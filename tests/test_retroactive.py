@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from retroactive import PartialRetroactiveQueue
+
+
+def replay(operations):
+    # the queue in the present, by running the operations in time order; None if a dequeue
+    # finds it empty
+    queue = []
+    for t in sorted(operations):
+        kind, value = operations[t]
+        if kind == 'enqueue':
+            queue.append(value)
+        elif not queue:
+            return None
+        else:
+            queue.pop(0)
+    return queue
+
+
+def test_against_replay():
+    random.seed(5)
+    q = PartialRetroactiveQueue()
+    operations = {}
+    for step in range(2000):
+        r = random.random()
+        if r < 0.2:
+            operations[q.enqueue(step)] = ('enqueue', step)
+        elif r < 0.3 and len(q):
+            front = q.front()
+            assert q.dequeue() == front
+            operations[q.now] = ('dequeue', None)
+        elif r < 0.7 and q.now:
+            t = random.randrange(1, q.now + 1)
+            kind = random.choice(['enqueue', 'dequeue'])
+            if t in operations:
+                with pytest.raises(ValueError):
+                    q.insert_dequeue(t)
+                continue
+            attempt = dict(operations)
+            attempt[t] = (kind, step if kind == 'enqueue' else None)
+            if replay(attempt) is None:
+                with pytest.raises(IndexError):
+                    q.insert_dequeue(t)
+            else:
+                if kind == 'enqueue':
+                    q.insert_enqueue(t, step)
+                else:
+                    q.insert_dequeue(t)
+                operations = attempt
+        elif operations:
+            t = random.choice(list(operations))
+            kind = operations[t][0]
+            attempt = dict(operations)
+            del attempt[t]
+            if replay(attempt) is None:
+                with pytest.raises(IndexError):
+                    q.delete_enqueue(t)
+            else:
+                getattr(q, 'delete_' + kind)(t)
+                operations = attempt
+        queue = replay(operations)
+        assert len(q) == len(queue)
+        if queue:
+            assert q.front() == queue[0]
+            assert q.back() == queue[-1]
+        else:
+            with pytest.raises(IndexError):
+                q.front()
+    q.enqueues.validate()
+    q.operations.validate()
+
+
+def test_missing_and_mismatched_times():
+    q = PartialRetroactiveQueue()
+    q.enqueue('a')
+    q.enqueue('b')
+    q.dequeue()
+    with pytest.raises(ValueError):
+        q.insert_enqueue(q.now + 1, 'c')
+    with pytest.raises(ValueError):
+        q.insert_dequeue(100)
+    with pytest.raises(KeyError):
+        q.delete_dequeue(100)
+    with pytest.raises(KeyError):
+        q.delete_enqueue(300)
+    with pytest.raises(KeyError):
+        q.delete_dequeue(150)
+    assert q.front() == 'b'
+
+
+def test_delete_enqueue_keeps_dequeues_valid():
+    q = PartialRetroactiveQueue()
+    q.enqueue('a')
+    q.dequeue()
+    with pytest.raises(IndexError):
+        q.delete_enqueue(100)
+    assert len(q) == 0
+    q.insert_enqueue(50, 'z')
+    q.delete_enqueue(100)
+    assert len(q) == 0
+    with pytest.raises(IndexError):
+        q.insert_dequeue(150)
+    q.insert_enqueue(120, 'y')
+    q.insert_dequeue(150)
+    assert len(q) == 0
+    q.delete_dequeue(150)
+    assert q.front() == 'y'
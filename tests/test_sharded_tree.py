@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from sharded_tree import ShardedTree
+
+
+@pytest.fixture(params=[{}, {'order_statistics': True}])
+def sharded(request):
+    # with order_statistics the workers find the median of a split with select
+    tree = ShardedTree(bounds=[300], max_shard_size=150, batch_size=16, **request.param)
+    yield tree
+    tree.close()
+
+
+def test_against_dict(sharded):
+    random.seed(19)
+    model = {}
+    for i in range(2000):
+        k = random.randrange(1000)
+        if random.random() < 0.7:
+            sharded.upsert(k, i)
+            model[k] = i
+        else:
+            sharded.delete(k)
+            model.pop(k, None)
+        if i % 250 == 0:
+            assert sharded.get(k) == model.get(k)
+    assert sharded.n_splits > 0
+    assert len(sharded) == len(model)
+    assert list(sharded.items(chunk_size=7)) == sorted(model.items())
+    assert list(sharded.keys(100, 700)) == sorted(k for k in model if 100 <= k < 700)
+    keys = random.sample(range(1200), 100)
+    assert sharded.get_many(keys) == [model.get(k) for k in keys]
+
+
+def test_missing_keys(sharded):
+    sharded.delete(5)
+    assert len(sharded) == 0
+    sharded.upsert(5, 'five')
+    assert sharded.get(6, 'none') == 'none' and 6 not in sharded and 5 in sharded
+    sharded.delete(5)
+    sharded.delete(5)
+    assert list(sharded) == []
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+import b_tree
+import ll_rb_tree
+import rb_tree
+from sorted_dict import SortedDict
+
+ENGINES = [ll_rb_tree.Rb_tree, rb_tree.Rb_tree, b_tree.B_tree]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_against_dict(engine):
+    random.seed(6)
+    d = SortedDict(engine=engine)
+    model = {}
+    for i in range(3000):
+        k = random.randrange(300)
+        r = random.random()
+        if r < 0.5:
+            d[k] = i
+            model[k] = i
+        elif r < 0.8:
+            if k in model:
+                del d[k]
+                del model[k]
+            else:
+                with pytest.raises(KeyError):
+                    del d[k]
+        else:
+            assert d.get(k) == model.get(k)
+    d.tree.validate()
+    assert d == model
+    assert list(d) == sorted(model)
+    assert list(d.values()) == [model[k] for k in sorted(model)]
+    assert list(reversed(d)) == sorted(model, reverse=True)
+    assert list(d.irange(50, 150)) == sorted(k for k in model if 50 <= k < 150)
+    assert list(d.irange_items(250)) == sorted((k, v) for k, v in model.items() if k >= 250)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_missing_keys(engine):
+    d = SortedDict({3: 'c', 1: 'a'}, engine=engine)
+    with pytest.raises(KeyError):
+        d[2]
+    with pytest.raises(KeyError):
+        d.pop(2)
+    assert d.pop(2, None) is None
+    assert d.setdefault(2, 'b') == 'b' and d.setdefault(1, 'z') == 'a'
+    assert list(d.items()) == [(1, 'a'), (2, 'b'), (3, 'c')]
+    d.clear()
+    assert len(d) == 0 and list(d) == []
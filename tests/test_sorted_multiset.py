@@ -0,0 +1,62 @@
+import collections
+import random
+
+import pytest
+
+import b_tree
+import ll_rb_tree
+import rb_tree
+from sorted_multiset import SortedMultiset
+
+
+@pytest.mark.parametrize('engine', [ll_rb_tree.Rb_tree, rb_tree.Rb_tree, b_tree.B_tree])
+def test_against_counter(engine):
+    random.seed(21)
+    s = SortedMultiset(engine=engine)
+    model = collections.Counter()
+    for i in range(3000):
+        k = random.randrange(100)
+        n = random.randrange(1, 4)
+        if random.random() < 0.6:
+            s.add(k, n)
+            model[k] += n
+        else:
+            s.discard(k, n)
+            model[k] -= min(n, model[k])
+            if not model[k]:
+                del model[k]
+        assert s.count(k) == model[k]
+    s.tree.validate()
+    assert len(s) == sum(model.values())
+    assert s.distinct() == len(model)
+    assert list(s) == sorted(model.elements())
+    assert list(reversed(s)) == sorted(model.elements(), reverse=True)
+    assert list(s.irange(20, 40)) == sorted(k for k in model.elements() if 20 <= k < 40)
+    assert list(s.items(90)) == sorted((k, n) for k, n in model.items() if k >= 90)
+
+
+def test_missing_keys_and_counts():
+    s = SortedMultiset(['b', 'a', 'b'])
+    s.discard('z')
+    assert s.count('z') == 0 and 'z' not in s
+    s.discard('b', 5)
+    assert list(s) == ['a'] and len(s) == 1
+    with pytest.raises(ValueError):
+        s.add('a', 0)
+    with pytest.raises(ValueError):
+        s.discard('a', -1)
+    s.update({'c': 2})
+    assert list(s) == ['a', 'c', 'c']
+    s.clear()
+    assert len(s) == 0 and s.distinct() == 0
+
+
+@pytest.mark.parametrize('engine', [ll_rb_tree.Rb_tree, rb_tree.Rb_tree, b_tree.B_tree])
+def test_reversed_walks_the_counts(engine):
+    s = SortedMultiset({'a': 2, 'b': 1, 'c': 3}, engine=engine)
+
+    def get(key, default=None):
+        raise AssertionError('a lookup of ' + repr(key))
+    # one walk over the (key, count) pairs, no search per key
+    s.tree.get = get
+    assert list(reversed(s)) == ['c', 'c', 'c', 'b', 'a', 'a']
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+import ll_rb_tree
+import monoid
+import rb_tree
+
+TREES = [rb_tree.Rb_tree, ll_rb_tree.Rb_tree]
+
+
+@pytest.mark.parametrize('keys', [list(range(500)), [i * 0.5 for i in range(300)],
+                                  ['k%04d' % i for i in range(300)], [(i, 'x') for i in range(100)], []])
+@pytest.mark.parametrize('writer', TREES)
+@pytest.mark.parametrize('reader', TREES)
+def test_dump_load(tmpdir, keys, writer, reader):
+    random.seed(15)
+    tree = writer()
+    for key in random.sample(keys, len(keys)):
+        tree.upsert(key, [key])
+    for key in keys[::3]:
+        tree.pop(key)
+    path = str(tmpdir.join('tree.rbt'))
+    tree.dump(path)
+
+    loaded = reader.load(path, monoid=monoid.COUNT)
+    loaded.validate()
+    expected = [(key, [key]) for key in sorted(keys) if key not in keys[::3]]
+    assert list(loaded.items()) == expected
+    assert loaded.aggregate() == len(expected)
+    # the loaded tree takes writes like any other
+    for key in keys[::3]:
+        loaded.upsert(key, None)
+    loaded.validate()
+    assert len(loaded) == len(keys)
+
+    with reader.load(path, mmap=True) as mapped:
+        assert len(mapped) == len(expected)
+        assert list(mapped.items()) == expected
+        for key in keys[:20]:
+            assert mapped.get(key, 'missing') == ([key] if key not in keys[::3] else 'missing')